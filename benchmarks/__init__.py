@@ -0,0 +1,14 @@
+"""
+Standalone benchmarks. Run from the project root, e.g.
+
+    python -m benchmarks.extraction resumes/
+"""
+import os
+import django
+
+def setup(settings_module='smartinterviewer_ai.settings'):
+    """
+    Configure Django before importing anything from `func`.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
@@ -0,0 +1,133 @@
+"""
+Measures assisted (speculative) decoding against plain generation.
+
+For each target ('questions' -> phi-2, 'analyzer' -> OpenChat-3.5) the same
+prompts are decoded with and without the draft model:
+
+* speed: greedy decoding, tokens/sec of both modes and the speedup;
+* exactness: greedy outputs must be identical token for token;
+* distribution: with the production sampling settings, the total variation
+  distance between the token frequencies of plain and assisted samples is
+  reported next to the distance between two plain runs (the noise floor).
+  Assisted sampling preserves the distribution when the two are comparable.
+
+    python -m benchmarks.assisted --target questions --draft microsoft/phi-1_5
+"""
+import argparse
+import json
+import time
+from collections import Counter
+from . import setup
+
+SAMPLING = {
+    'questions': dict(do_sample=True, temperature=0.7, top_p=0.95, repetition_penalty=1.15),
+    'analyzer':  dict(do_sample=True, temperature=0.7),
+}
+
+def _prompts(target, n):
+    from .fakes import FAKE_SKILLS, fake_transcribe
+    if target == 'questions':
+        from func.parser import build_prompt
+        return [build_prompt({
+            "name": f"Candidate {i}", "role": ["Backend Developer"],
+            "skills": FAKE_SKILLS[i % 3:i % 3 + 5], "experience": ["3 years building web services"],
+            "education": ["B.Tech Computer Science"],
+        }) for i in range(n)]
+    from func.analyzer import curate_prompt
+    return [curate_prompt(fake_transcribe(f"answer-{i}"), "Tell me about a project you are proud of.")
+            for i in range(n)]
+
+def _backend(target, draft):
+    """
+    (tokenizer, model, assisted generate kwargs) of a target, with `draft` as its draft model.
+    """
+    if target == 'questions':
+        from func import parser as module
+        tokenizer, model = module._load_generator()
+    else:
+        from func import analyzer as module
+        tokenizer, model = module._load_model()
+    module._assistant_id = draft or module._assistant_id
+    module._assistant_kwargs = None
+    assisted = module._load_assistant()
+    if not assisted:
+        raise SystemExit(f"no usable draft model for '{target}': pass --draft or set it in settings "
+                         "(it must share the target's tokenizer)")
+    return tokenizer, model, assisted
+
+def _generate(model, tokenizer, prompt, max_new_tokens, **kwargs):
+    inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+    start = time.perf_counter()
+    outputs = model.generate(**inputs, max_new_tokens=max_new_tokens,
+                             pad_token_id=tokenizer.eos_token_id, **kwargs)
+    elapsed = time.perf_counter() - start
+    return outputs[0, inputs["input_ids"].shape[-1]:].tolist(), elapsed
+
+def _total_variation(a, b):
+    total_a, total_b = sum(a.values()) or 1, sum(b.values()) or 1
+    return 0.5 * sum(abs(a[t] / total_a - b[t] / total_b) for t in set(a) | set(b))
+
+def run(target, draft=None, n_prompts=4, samples=8, max_new_tokens=128):
+    import torch
+    tokenizer, model, assisted = _backend(target, draft)
+    prompts = _prompts(target, n_prompts)
+    _generate(model, tokenizer, prompts[0], 8)   # warm-up
+    _generate(model, tokenizer, prompts[0], 8, **assisted)
+
+    plain_tokens = assisted_tokens = 0
+    plain_seconds = assisted_seconds = 0.0
+    identical = 0
+    for prompt in prompts:
+        plain, seconds = _generate(model, tokenizer, prompt, max_new_tokens, do_sample=False)
+        plain_tokens += len(plain)
+        plain_seconds += seconds
+        fast, seconds = _generate(model, tokenizer, prompt, max_new_tokens, do_sample=False, **assisted)
+        assisted_tokens += len(fast)
+        assisted_seconds += seconds
+        identical += plain == fast
+
+    plain_a, plain_b, sampled = Counter(), Counter(), Counter()
+    for i, prompt in enumerate(prompts):
+        for s in range(samples):
+            seed = i * samples + s
+            torch.manual_seed(seed)
+            plain_a.update(_generate(model, tokenizer, prompt, max_new_tokens, **SAMPLING[target])[0])
+            torch.manual_seed(seed + 10_000)
+            plain_b.update(_generate(model, tokenizer, prompt, max_new_tokens, **SAMPLING[target])[0])
+            torch.manual_seed(seed + 20_000)
+            sampled.update(_generate(model, tokenizer, prompt, max_new_tokens,
+                                     **SAMPLING[target], **assisted)[0])
+
+    plain_rate = plain_tokens / plain_seconds if plain_seconds else None
+    assisted_rate = assisted_tokens / assisted_seconds if assisted_seconds else None
+    return {
+        'target':                 target,
+        'draft':                  getattr(assisted['assistant_model'], 'name_or_path', draft),
+        'prompts':                n_prompts,
+        'plain_tokens_per_sec':   round(plain_rate, 2) if plain_rate else None,
+        'assisted_tokens_per_sec': round(assisted_rate, 2) if assisted_rate else None,
+        'speedup':                round(assisted_rate / plain_rate, 2) if plain_rate and assisted_rate else None,
+        'greedy_identical':       f"{identical}/{n_prompts}",
+        'tv_plain_vs_assisted':   round(_total_variation(plain_a, sampled), 4),
+        'tv_plain_vs_plain':      round(_total_variation(plain_a, plain_b), 4),
+    }
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    cli.add_argument('--target', choices=sorted(SAMPLING), default='questions')
+    cli.add_argument('--draft', help='draft model id (defaults to the one in settings)')
+    cli.add_argument('--prompts', type=int, default=4)
+    cli.add_argument('--samples', type=int, default=8, help='sampled generations per prompt and mode')
+    cli.add_argument('--max-new-tokens', type=int, default=128)
+    cli.add_argument('--output', help='write results as JSON to this file')
+    args = cli.parse_args()
+
+    setup()
+    payload = json.dumps(run(args.target, args.draft, args.prompts, args.samples, args.max_new_tokens), indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(payload)
+    print(payload)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Compares resume text-extraction backends on a folder of sample resumes.
+
+For every file and backend it reports the median extraction time and the
+NER entity recall against pdfminer's default full-layout extraction (the
+previous behaviour of `text_extractor`).
+
+    python -m benchmarks.extraction resumes/ --repeat 5 --output extraction.json
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from . import setup
+
+def _timed(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings)
+
+def run(folder, repeat=3):
+    from pdfminer.high_level import extract_text
+    from func.extractor import SUPPORTED_EXTENSIONS, available_pdf_backends, extract_resume_text
+    from func.parser import identifier
+
+    results = []
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        if not name.lower().endswith(SUPPORTED_EXTENSIONS):
+            continue
+        if name.lower().endswith('.pdf'):
+            reference, ref_time = _timed(lambda: extract_text(path), repeat)
+            backends = available_pdf_backends()
+        else:
+            reference, ref_time = _timed(lambda: extract_resume_text(path), repeat)
+            backends = [None]
+        ref_entities = set(identifier(reference))
+        row = {'file': name, 'reference_seconds': round(ref_time, 4),
+               'reference_entities': len(ref_entities), 'backends': {}}
+        for backend in backends:
+            text, seconds = _timed(lambda: extract_resume_text(path, backend=backend), repeat)
+            found = set(identifier(text))
+            recall = len(found & ref_entities) / len(ref_entities) if ref_entities else 1.0
+            row['backends'][backend or 'native'] = {
+                'seconds':  round(seconds, 4),
+                'speedup':  round(ref_time / seconds, 2) if seconds else None,
+                'entities': len(found),
+                'recall':   round(recall, 3),
+            }
+        results.append(row)
+    return results
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    cli.add_argument('folder', nargs='?', default='resumes')
+    cli.add_argument('--repeat', type=int, default=3)
+    cli.add_argument('--output', help='write results as JSON to this file')
+    args = cli.parse_args()
+
+    setup()
+    results = run(args.folder, args.repeat)
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(payload)
+    print(payload)
+
+if __name__ == '__main__':
+    main()
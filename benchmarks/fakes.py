@@ -0,0 +1,110 @@
+"""
+Deterministic stand-ins for the model backends so benchmarks run offline
+on CPU. Outputs depend only on their inputs, never on random sampling.
+"""
+import hashlib
+import numpy as np
+
+FAKE_SKILLS = ["Python", "Django", "PostgreSQL", "Docker", "Kubernetes", "React", "AWS", "Celery"]
+
+_TOPICS = [
+    "design a rate limiter", "debug a memory leak", "migrate a database schema",
+    "review a pull request", "handle a production incident", "scale a read-heavy API",
+    "mentor a junior engineer", "choose between SQL and NoSQL", "test an async task queue",
+    "estimate a project deadline", "resolve a team conflict", "profile a slow endpoint",
+]
+
+def _digest(*parts):
+    return int(hashlib.sha256("|".join(parts).encode()).hexdigest(), 16)
+
+def fake_generate_questions(prompt, max_new_tokens=512):
+    seed = _digest(prompt)
+    lines = [prompt, ""]
+    for i in range(10):
+        topic = _TOPICS[(seed + i * 7) % len(_TOPICS)]
+        lines.append(f"{i + 1}. How would you {topic} in your last role?")
+    return "\n".join(lines)
+
+def fake_transcribe(audio_path):
+    seed = _digest(str(audio_path))
+    segments, t = [], 0.0
+    for i in range(4 + seed % 4):
+        length = 2.0 + (seed >> i) % 5
+        words = " ".join(_TOPICS[(seed + i) % len(_TOPICS)].split() * 2)
+        segments.append(f"[{t:.2f} - {t + length:.2f}] I would {words}")
+        t += length + 0.5
+    return segments
+
+def fake_transcribe_batch(audio_paths):
+    return [fake_transcribe(path) for path in audio_paths]
+
+def fake_load_pcm(audio_path, seconds=20, sample_rate=16000):
+    """
+    Speech-like bursts separated by silence, seeded by the path.
+    """
+    rng = np.random.default_rng(_digest(str(audio_path)) % (2 ** 32))
+    pcm = np.zeros(seconds * sample_rate, dtype=np.float32)
+    for start in range(0, seconds - 1, 3):
+        burst = slice(start * sample_rate, int((start + 2) * sample_rate))
+        pcm[burst] = rng.normal(0, 0.1, burst.stop - burst.start).astype(np.float32)
+    return pcm
+
+def fake_analyze(segments, question, keep_state=False):
+    seed = _digest(question, *segments)
+    return {
+        "tone": "confident",
+        "speed": "moderate",
+        "fluency": "clear",
+        "relevance": round(0.4 + (seed % 60) / 100, 2),
+    }
+
+class FakeTokenizer:
+    """
+    Whitespace tokenizer with the encode/decode calls the prompt builders use.
+    """
+    def __init__(self):
+        self._vocab = {}
+        self._words = []
+
+    def encode(self, text, add_special_tokens=False):
+        ids = []
+        for word in text.split():
+            if word not in self._vocab:
+                self._vocab[word] = len(self._words)
+                self._words.append(word)
+            ids.append(self._vocab[word])
+        return ids
+
+    def decode(self, ids, **kwargs):
+        return " ".join(self._words[i] for i in ids)
+
+def fake_ner_pipeline():
+    import spacy
+    nlp = spacy.blank("en")
+    ruler = nlp.add_pipe("entity_ruler")
+    ruler.add_patterns([{"label": "Skills", "pattern": skill} for skill in FAKE_SKILLS])
+    return nlp
+
+def install():
+    """
+    Swap every model entry point for its fake. Call after django.setup().
+    """
+    from func import analyzer, parser, tasks, transcriber
+    parser.nlp = fake_ner_pipeline()
+    parser.ner_max_tokens = None
+    parser.generate_questions = fake_generate_questions
+    tokenizer = FakeTokenizer()
+    parser._load_prompt_tokenizer = analyzer._load_tokenizer = lambda: tokenizer
+    transcriber.transcribe = tasks.transcribe = fake_transcribe
+    transcriber.transcribe_batch = tasks.transcribe_batch = fake_transcribe_batch
+    transcriber.load_pcm = tasks.load_pcm = fake_load_pcm
+    analyzer.analyze = tasks.analyze = fake_analyze
+
+def sample_resume_text(i=0):
+    skills = ", ".join(FAKE_SKILLS[i % 3:i % 3 + 5])
+    return (
+        f"Candidate {i}\nBackend Developer\n"
+        f"Skills: {skills}\n"
+        "Experience: 3 years building web services\n"
+        "Education: B.Tech Computer Science\n"
+    )
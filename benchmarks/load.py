@@ -0,0 +1,121 @@
+"""
+Synthetic load driver: N concurrent candidates walk the real URL routes
+(signup -> auth -> resume upload -> start -> next/answer loop -> analysis
+-> PDF) against a throwaway SQLite database with fake model backends.
+
+    python -m benchmarks.load --candidates 20 --concurrency 8
+"""
+import argparse
+import json
+import statistics
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from . import setup
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(round(q * (len(ordered) - 1))), len(ordered) - 1)]
+
+def _summarize(samples):
+    return {
+        'count':  len(samples),
+        'p50_ms': round(_percentile(samples, 0.50) * 1000, 2),
+        'p95_ms': round(_percentile(samples, 0.95) * 1000, 2),
+        'max_ms': round(max(samples) * 1000, 2),
+    }
+
+def _candidate(i, timings):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.db import connections
+    from django.test import Client
+    from django.urls import reverse
+    from .fakes import sample_resume_text
+
+    def call(client, route, method, path, **kwargs):
+        start = time.perf_counter()
+        response = getattr(client, method)(path, **kwargs)
+        timings[route].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{route} returned {response.status_code}: {response.content[:200]!r}")
+        return response
+
+    username, password = f"candidate{i}", "bench-password-123"
+    try:
+        client = Client()
+        call(client, 'signup', 'post', reverse('signup'),
+             data={'username': username, 'email': f'{username}@example.com', 'password': password},
+             content_type='application/json')
+        token = call(client, 'auth', 'post', reverse('token_obtain_pair'),
+                     data={'username': username, 'password': password},
+                     content_type='application/json').json()['access']
+
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        resume = SimpleUploadedFile('resume.txt', sample_resume_text(i).encode())
+        session_id = call(client, 'resume_upload', 'post', reverse('resume-upload'),
+                          data={'resume_file': resume}).json()['session_id']
+        call(client, 'start', 'post', reverse('start-session', args=[session_id]))
+
+        answered = 0
+        while True:
+            response = call(client, 'next', 'get', reverse('next-question', args=[session_id]))
+            if response.status_code == 204:
+                break
+            audio = SimpleUploadedFile('answer.wav', f'{username}-{answered}'.encode())
+            call(client, 'answer', 'post', reverse('submit-answer', args=[response.json()['id']]),
+                 data={'audio_file': audio})
+            answered += 1
+
+        call(client, 'analysis', 'get', reverse('session-analysis', args=[session_id]))
+        call(client, 'pdf', 'get', reverse('session-pdf', args=[session_id]))
+        return answered
+    finally:
+        connections.close_all()
+
+def run(candidates=10, concurrency=4):
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from .fakes import install
+
+    install()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    timings = defaultdict(list)
+    errors = []
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(_candidate, i, timings) for i in range(candidates)]
+        answered = 0
+        for future in futures:
+            try:
+                answered += future.result()
+            except Exception as err:
+                errors.append(str(err))
+        wall = time.perf_counter() - start
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    return {
+        'candidates':          candidates,
+        'concurrency':         concurrency,
+        'wall_seconds':        round(wall, 3),
+        'candidates_per_sec':  round(candidates / wall, 3),
+        'answers_per_sec':     round(answered / wall, 3),
+        'errors':              errors,
+        'routes':              {route: _summarize(samples) for route, samples in timings.items()},
+        'total_request_ms':    round(statistics.fsum(sum(timings.values(), [])) * 1000, 2),
+    }
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    cli.add_argument('--candidates', type=int, default=10)
+    cli.add_argument('--concurrency', type=int, default=4)
+    args = cli.parse_args()
+
+    setup('benchmarks.settings')
+    print(json.dumps(run(args.candidates, args.concurrency), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Microbenchmarks for the CPU-side hot paths of the interview pipeline,
+run against the fake model backends.
+
+    python -m benchmarks.micro --number 200
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import timeit
+from . import setup
+
+def _bench(fn, number, repeat=5):
+    runs = timeit.repeat(fn, number=number, repeat=repeat)
+    per_call = [r / number for r in runs]
+    return {
+        'median_us': round(statistics.median(per_call) * 1e6, 2),
+        'min_us':    round(min(per_call) * 1e6, 2),
+        'calls':     number * repeat,
+    }
+
+def _fake_report(n_questions=10):
+    from django.utils import timezone
+    from .fakes import fake_analyze, fake_generate_questions, fake_transcribe
+    from func.parser import parse_questions_from_output
+    questions = parse_questions_from_output(fake_generate_questions("report"))[-n_questions:]
+    detailed = []
+    for i, text in enumerate(questions):
+        segments = fake_transcribe(f"answer-{i}")
+        detailed.append({
+            "question_id": str(i), "question_text": text, "answer_id": str(i),
+            "transcript": " ".join(s.split("]")[-1].strip() for s in segments),
+            "tone_score": None, "pace_wpm": 120.0, "fluency_score": None,
+            "relevance_score": fake_analyze(segments, text)["relevance"],
+        })
+    return {
+        'session_id': 'benchmark', 'role': 'Software Development Engineer',
+        'started_at': timezone.now(), 'ended_at': None, 'questions': detailed,
+        'overall_score': statistics.mean(q["relevance_score"] for q in detailed),
+        'suggestions': ["Great job! Keep it up."],
+    }
+
+def run(number=100):
+    from .fakes import fake_generate_questions, fake_transcribe, install, sample_resume_text
+    install()
+    from func.analyzer import curate_prompt, respone_wps
+    from func.parser import build_prompt, parse_questions_from_output, parse_resume_file
+    from func.views import render_report_pdf
+    from django.template.loader import render_to_string
+
+    workdir = tempfile.mkdtemp(prefix='bench-micro-')
+    resume_path = os.path.join(workdir, 'resume.txt')
+    with open(resume_path, 'w') as fh:
+        fh.write(sample_resume_text() * 20)
+
+    resume_data = parse_resume_file(resume_path)
+    output = fake_generate_questions(build_prompt(resume_data))
+    segments = fake_transcribe('answer') * 10
+    report = _fake_report()
+
+    return {
+        'parse_resume_file':           _bench(lambda: parse_resume_file(resume_path), number),
+        'build_prompt':                _bench(lambda: build_prompt(resume_data), number * 10),
+        'parse_questions_from_output': _bench(lambda: parse_questions_from_output(output), number * 10),
+        'respone_wps':                 _bench(lambda: respone_wps(segments), number * 10),
+        'curate_prompt':               _bench(lambda: curate_prompt(segments, 'Tell me about yourself'), number * 10),
+        'report_html':                 _bench(lambda: render_to_string('report_template.html', {'report': report}), number),
+        'report_pdf':                  _bench(lambda: render_report_pdf(report), max(number // 20, 1), repeat=3),
+    }
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    cli.add_argument('--number', type=int, default=100)
+    args = cli.parse_args()
+
+    setup('benchmarks.settings')
+    print(json.dumps(run(args.number), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Compares resume NER pipeline variants on accuracy and throughput.
+
+Each variant ('full', 'fast', 'distilled') is scored per label against
+gold annotations -- a DocBin passed with --gold, or otherwise the full
+model's own predictions over the sample resumes -- and timed in docs/sec.
+
+    python -m benchmarks.ner resumes/ --gold dev.spacy --output ner.json
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from . import setup
+
+def _spans(doc_or_ents, labels):
+    return {(ent.start_char, ent.end_char, ent.label_) for ent in doc_or_ents if ent.label_ in labels}
+
+def _score(gold, predicted, labels):
+    tp, fp, fn = Counter(), Counter(), Counter()
+    for g, p in zip(gold, predicted):
+        for span in g & p:
+            tp[span[2]] += 1
+        for span in p - g:
+            fp[span[2]] += 1
+        for span in g - p:
+            fn[span[2]] += 1
+    scores = {}
+    for label in sorted(labels):
+        precision = tp[label] / (tp[label] + fp[label]) if tp[label] + fp[label] else 0.0
+        recall = tp[label] / (tp[label] + fn[label]) if tp[label] + fn[label] else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        scores[label] = {'p': round(precision, 3), 'r': round(recall, 3), 'f1': round(f1, 3),
+                         'support': tp[label] + fn[label]}
+    return scores
+
+def run(folder, gold_path=None):
+    from django.conf import settings
+    from func.extractor import SUPPORTED_EXTENSIONS
+    from func.parser import NER_LABELS, load_ner_pipeline, text_extractor, truncate_tokens
+
+    full = load_ner_pipeline('full')
+    if gold_path:
+        from spacy.tokens import DocBin
+        gold_docs = list(DocBin().from_disk(gold_path).get_docs(full.vocab))
+        texts = [doc.text for doc in gold_docs]
+        gold = [_spans(doc.ents, NER_LABELS) for doc in gold_docs]
+    else:
+        texts = [text_extractor(os.path.join(folder, name))
+                 for name in sorted(os.listdir(folder))
+                 if name.lower().endswith(SUPPORTED_EXTENSIONS)]
+        gold = [_spans(doc.ents, NER_LABELS) for doc in full.pipe(texts)]
+
+    budget = settings.RESUME_NER_MAX_TOKENS
+    variants = [('full', full, None), ('fast', load_ner_pipeline('fast'), budget)]
+    if os.path.isdir(settings.RESUME_NER_DISTILLED_DIR):
+        variants.append(('distilled', load_ner_pipeline('distilled'), budget))
+
+    results = {}
+    for name, pipeline, max_tokens in variants:
+        inputs = [truncate_tokens(pipeline, text, max_tokens) for text in texts]
+        start = time.perf_counter()
+        docs = list(pipeline.pipe(inputs))
+        elapsed = time.perf_counter() - start
+        predicted = [_spans(doc.ents, NER_LABELS) for doc in docs]
+        results[name] = {
+            'max_tokens':   max_tokens,
+            'docs_per_sec': round(len(docs) / elapsed, 2) if elapsed else None,
+            'labels':       _score(gold, predicted, NER_LABELS),
+        }
+    return results
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    cli.add_argument('folder', nargs='?', default='resumes')
+    cli.add_argument('--gold', help='DocBin with reference annotations')
+    cli.add_argument('--output', help='write results as JSON to this file')
+    args = cli.parse_args()
+
+    setup()
+    payload = json.dumps(run(args.folder, args.gold), indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(payload)
+    print(payload)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Runs the microbenchmarks and the load driver and saves the results as
+JSON, tagged with the current commit, for comparison between revisions.
+
+    python -m benchmarks.run --output bench/HEAD.json --compare bench/main.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import time
+from . import setup
+
+def _commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current, baseline):
+    """
+    Ratios current/baseline for microbenchmark medians and route p95s
+    (above 1.0 means slower).
+    """
+    ratios = {}
+    for name, result in current['micro'].items():
+        old = baseline.get('micro', {}).get(name)
+        if old and old['median_us']:
+            ratios[f'micro.{name}'] = round(result['median_us'] / old['median_us'], 3)
+    for route, result in current['load']['routes'].items():
+        old = baseline.get('load', {}).get('routes', {}).get(route)
+        if old and old['p95_ms']:
+            ratios[f'load.{route}.p95'] = round(result['p95_ms'] / old['p95_ms'], 3)
+    return ratios
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    cli.add_argument('--number', type=int, default=100, help='microbenchmark calls per repeat')
+    cli.add_argument('--candidates', type=int, default=10)
+    cli.add_argument('--concurrency', type=int, default=4)
+    cli.add_argument('--output', help='where to save the results (default bench/<commit>.json)')
+    cli.add_argument('--compare', help='previous results to compare against')
+    args = cli.parse_args()
+
+    setup('benchmarks.settings')
+    from . import load, micro
+
+    commit = _commit()
+    results = {
+        'commit':    commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'micro':     micro.run(args.number),
+        'load':      load.run(args.candidates, args.concurrency),
+    }
+    if args.compare:
+        with open(args.compare) as fh:
+            results['compare'] = compare(results, json.load(fh))
+
+    output = args.output or os.path.join('bench', f'{commit or "local"}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as fh:
+        json.dump(results, fh, indent=2, default=str)
+    print(json.dumps(results.get('compare', results), indent=2, default=str))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""
+Settings for offline benchmark runs: SQLite instead of MySQL, in-process
+cache, Celery tasks executed eagerly and media written to a scratch folder.
+"""
+import tempfile
+from smartinterviewer_ai.settings import *  # noqa: F401,F403
+
+SCRATCH_DIR = Path(tempfile.mkdtemp(prefix='smartinterviewer-bench-'))
+
+DATABASES = {
+    'default': {
+        'ENGINE':  'django.db.backends.sqlite3',
+        'NAME':    SCRATCH_DIR / 'bench.sqlite3',
+        'OPTIONS': {'timeout': 30},
+        'TEST':    {'NAME': SCRATCH_DIR / 'bench-test.sqlite3'},
+    }
+}
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_TASK_EAGER_PROPAGATES = True
+
+MEDIA_ROOT = SCRATCH_DIR / 'media'
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+PIPELINE_METRICS_ENABLED = False
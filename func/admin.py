@@ -1,14 +1,63 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from .routing import is_pinned, pin_primary, reads_from_replica
+from . import search
 from .models import (
     Profile,
     Resume,
+    Skill,
+    Cohort,
     InterviewSession,
     Question,
     Answer,
     AnswerAnalysis,
     Notification,
+    DailyRollup,
+    RetentionRun,
 )
 
+class ReplicaListAdmin(admin.ModelAdmin):
+    """
+    Change lists read from the replica unless this admin just saved something;
+    POSTs (bulk actions, list edits) stay on the primary.
+    """
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET' or is_pinned(request.user.id):
+            return super().changelist_view(request, extra_context)
+        with reads_from_replica():
+            response = super().changelist_view(request, extra_context)
+            if hasattr(response, 'render'):
+                response.render()   # template queries run inside the replica block
+            return response
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        pin_primary(request.user.id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        pin_primary(request.user.id)
+
+
+class IndexedSearchAdmin(ReplicaListAdmin):
+    """
+    The change list search box uses func.search instead of LIKE '%term%'
+    scans over the text column; results keep the list's filters and order.
+    Only the `search_limit` best matches are listed, with a warning when
+    there may be more.
+    """
+    search_kind  = None
+    search_limit = 500
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        ranked = search.search(search_term, self.search_kind, limit=self.search_limit)
+        if len(ranked) >= self.search_limit:
+            messages.warning(request, f"Only the {self.search_limit} best matches are listed; "
+                                      "refine the search to see others.")
+        return queryset.filter(pk__in=[pk for pk, _ in ranked]), False
+
+
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
     list_display  = ['user', 'preferred_role', 'difficulty', 'category']
@@ -16,37 +65,52 @@ class ProfileAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'user__email']
 
 
+@admin.register(Skill)
+class SkillAdmin(admin.ModelAdmin):
+    list_display  = ['id', 'name']
+    search_fields = ['name']
+
+
 @admin.register(Resume)
-class ResumeAdmin(admin.ModelAdmin):
-    list_display  = ['id', 'user', 'resume_file', 'created_at', 'updated_at']
-    list_filter   = ['user__profile__preferred_role']
-    search_fields = ['user__username', 'resume_file']
+class ResumeAdmin(ReplicaListAdmin):
+    list_display       = ['id', 'user', 'resume_file', 'created_at', 'updated_at']
+    list_filter        = ['user__profile__preferred_role']
+    search_fields      = ['user__username', 'resume_file', 'skills__name']
+    autocomplete_fields = ['skills']
+
+
+@admin.register(Cohort)
+class CohortAdmin(admin.ModelAdmin):
+    list_display  = ['id', 'name', 'created_by', 'created_at']
+    search_fields = ['name']
 
 
 @admin.register(InterviewSession)
-class InterviewSessionAdmin(admin.ModelAdmin):
-    list_display   = ['id', 'user', 'started_at', 'ended_at']
-    list_filter    = ['user__profile__preferred_role']
+class InterviewSessionAdmin(ReplicaListAdmin):
+    list_display   = ['id', 'user', 'cohort', 'started_at', 'ended_at']
+    list_filter    = ['user__profile__preferred_role', 'cohort']
     date_hierarchy = 'started_at'
     search_fields  = ['user__username']
 
 
 @admin.register(Question)
-class QuestionAdmin(admin.ModelAdmin):
+class QuestionAdmin(IndexedSearchAdmin):
     list_display  = ['id', 'session', 'text', 'created_at']
     list_filter   = ['session__user__profile__preferred_role']
     search_fields = ['text']
+    search_kind   = 'question'
 
 
 @admin.register(Answer)
-class AnswerAdmin(admin.ModelAdmin):
-    list_display  = ['id', 'question', 'responded_at']
-    list_filter   = ['question__session__user__profile__preferred_role']
+class AnswerAdmin(IndexedSearchAdmin):
+    list_display  = ['id', 'question', 'responded_at', 'audio_tier']
+    list_filter   = ['question__session__user__profile__preferred_role', 'audio_tier']
     search_fields = ['transcript']
+    search_kind   = 'answer'
 
 
 @admin.register(AnswerAnalysis)
-class AnswerAnalysisAdmin(admin.ModelAdmin):
+class AnswerAnalysisAdmin(ReplicaListAdmin):
     list_display  = [
         'answer',
         'tone_score',
@@ -57,12 +121,42 @@ class AnswerAnalysisAdmin(admin.ModelAdmin):
         'pause_frequency',
         'speech_rate_consistency',
     ]
-    list_filter   = ['tone_score', 'relevance_score']
+    # Score distributions live in DailyRollupAdmin; filtering floats here scans the table
+    list_select_related     = ['answer']
+    show_full_result_count  = False
     search_fields = ['answer__id']
 
 
 @admin.register(Notification)
-class NotificationAdmin(admin.ModelAdmin):
+class NotificationAdmin(ReplicaListAdmin):
     list_display  = ['id', 'user', 'session', 'message', 'read', 'created_at']
     list_filter   = ['read', 'user__profile__preferred_role']
     search_fields = ['message', 'user__username']
+
+
+@admin.register(DailyRollup)
+class DailyRollupAdmin(ReplicaListAdmin):
+    list_display   = [
+        'day', 'role', 'difficulty', 'category', 'sessions', 'completion_rate',
+        'answers', 'avg_relevance', 'p50_relevance', 'p90_relevance', 'avg_pace_wpm', 'avg_pause_duration',
+    ]
+    list_filter    = ['role', 'difficulty', 'category']
+    date_hierarchy = 'day'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(RetentionRun)
+class RetentionRunAdmin(admin.ModelAdmin):
+    list_display   = ['started_at', 'finished_at', 'transcoded', 'archived', 'purged', 'failed', 'bytes_reclaimed']
+    date_hierarchy = 'started_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,158 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import Answer, AnswerAnalysis, DailyRollup, InterviewSession, Watermark
+
+_WATERMARK = 'analytics-rollups'
+
+_PROFILE = 'user__profile__'
+_SESSION_PROFILE = 'answer__question__session__user__profile__'
+
+def _day_bounds(day):
+    """
+    Aware [start, end) datetimes of a local calendar day, so filters stay index-friendly.
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+def _mean(values):
+    return round(float(np.mean(values)), 4) if values else None
+
+def _percentile(values, q):
+    return round(float(np.percentile(values, q)), 4) if values else None
+
+def touched_days(since):
+    """
+    Local days whose sessions gained sessions, answers or analyses after `since`.
+    """
+    starts = set(
+        InterviewSession.objects.filter(started_at__gte=since)
+        .values_list('started_at', flat=True).distinct()
+    )
+    starts |= set(
+        Answer.objects.filter(responded_at__gte=since)
+        .values_list('question__session__started_at', flat=True).distinct()
+    )
+    starts |= set(
+        AnswerAnalysis.objects.filter(updated_at__gte=since)
+        .values_list('answer__question__session__started_at', flat=True).distinct()
+    )
+    return {timezone.localdate(ts) for ts in starts}
+
+def rebuild_day(day):
+    """
+    Recomputes every rollup row of one day from the raw tables.
+    """
+    start, end = _day_bounds(day)
+    groups = defaultdict(lambda: {'sessions': 0, 'completed': 0, 'relevance': [], 'pace': [],
+                                  'pause': [], 'pause_freq': [], 'answers': 0})
+
+    sessions = (
+        InterviewSession.objects.filter(started_at__gte=start, started_at__lt=end)
+        .values('id', f'{_PROFILE}preferred_role', f'{_PROFILE}difficulty', f'{_PROFILE}category')
+        .annotate(
+            n_questions=Count('questions', distinct=True),
+            n_answered=Count('questions', filter=Q(questions__answers__isnull=False), distinct=True),
+        )
+    )
+    for row in sessions:
+        key = (row[f'{_PROFILE}preferred_role'], row[f'{_PROFILE}difficulty'], row[f'{_PROFILE}category'])
+        groups[key]['sessions'] += 1
+        if row['n_questions'] and row['n_answered'] >= row['n_questions']:
+            groups[key]['completed'] += 1
+
+    analyses = AnswerAnalysis.objects.filter(
+        answer__question__session__started_at__gte=start,
+        answer__question__session__started_at__lt=end,
+    ).values_list(
+        f'{_SESSION_PROFILE}preferred_role', f'{_SESSION_PROFILE}difficulty', f'{_SESSION_PROFILE}category',
+        'relevance_score', 'pace_wpm', 'average_pause_duration', 'pause_frequency',
+    )
+    for role, difficulty, category, relevance, pace, pause, pause_freq in analyses:
+        group = groups[(role, difficulty, category)]
+        group['answers'] += 1
+        for name, value in (('relevance', relevance), ('pace', pace), ('pause', pause), ('pause_freq', pause_freq)):
+            if value is not None:
+                group[name].append(value)
+
+    with transaction.atomic():
+        kept = []
+        for (role, difficulty, category), g in groups.items():
+            if role is None:
+                continue  # users without a profile
+            rollup, _ = DailyRollup.objects.update_or_create(
+                day=day, role=role, difficulty=difficulty, category=category,
+                defaults={
+                    'sessions':            g['sessions'],
+                    'completed_sessions':  g['completed'],
+                    'completion_rate':     round(g['completed'] / g['sessions'], 4) if g['sessions'] else 0.0,
+                    'answers':             g['answers'],
+                    'avg_relevance':       _mean(g['relevance']),
+                    'p50_relevance':       _percentile(g['relevance'], 50),
+                    'p90_relevance':       _percentile(g['relevance'], 90),
+                    'avg_pace_wpm':        _mean(g['pace']),
+                    'avg_pause_duration':  _mean(g['pause']),
+                    'avg_pause_frequency': _mean(g['pause_freq']),
+                },
+            )
+            kept.append(rollup.pk)
+        DailyRollup.objects.filter(day=day).exclude(pk__in=kept).delete()
+
+def refresh_rollups(full=False):
+    """
+    Rebuilds the rollups of days touched since the last run (all days when
+    `full` or on the first run). Returns the list of rebuilt days.
+    """
+    now = timezone.now()
+    watermark = None if full else (
+        Watermark.objects.filter(name=_WATERMARK).values_list('value', flat=True).first())
+    if watermark is None:
+        first = InterviewSession.objects.order_by('started_at').values_list('started_at', flat=True).first()
+        if first is None:
+            return []
+        days = set()
+        day, last = timezone.localdate(first), timezone.localdate(now)
+        while day <= last:
+            days.add(day)
+            day += timedelta(days=1)
+    else:
+        days = touched_days(watermark)
+    for day in sorted(days):
+        rebuild_day(day)
+    # Rows written while this ran are picked up next time
+    Watermark.objects.update_or_create(name=_WATERMARK, defaults={'value': now})
+    return sorted(days)
+
+def summarize(rollups):
+    """
+    Combines rollup rows (e.g. a date range) into one weighted summary per role.
+    """
+    summary = defaultdict(lambda: {'sessions': 0, 'completed_sessions': 0, 'answers': 0,
+                                   '_relevance': 0.0, '_pace': 0.0, '_pause': 0.0, '_weight': 0})
+    for r in rollups:
+        s = summary[r.role]
+        s['sessions'] += r.sessions
+        s['completed_sessions'] += r.completed_sessions
+        s['answers'] += r.answers
+        if r.avg_relevance is not None and r.answers:
+            s['_relevance'] += r.avg_relevance * r.answers
+            s['_pace'] += (r.avg_pace_wpm or 0.0) * r.answers
+            s['_pause'] += (r.avg_pause_duration or 0.0) * r.answers
+            s['_weight'] += r.answers
+    result = []
+    for role, s in sorted(summary.items()):
+        weight = s.pop('_weight')
+        result.append({
+            'role':               role,
+            'sessions':           s['sessions'],
+            'completed_sessions': s['completed_sessions'],
+            'completion_rate':    round(s['completed_sessions'] / s['sessions'], 4) if s['sessions'] else 0.0,
+            'answers':            s['answers'],
+            'avg_relevance':      round(s['_relevance'] / weight, 4) if weight else None,
+            'avg_pace_wpm':       round(s['_pace'] / weight, 2) if weight else None,
+            'avg_pause_duration': round(s['_pause'] / weight, 3) if weight else None,
+        })
+    return result
@@ -1,26 +1,62 @@
 import re
 import ast
+import time
 import torch
+from django.conf import settings
 from transformers import AutoTokenizer, AutoModelForCausalLM
+from .prompting import bucket_length, fit_text, load_assistant, record_prompt, strip_timestamps
+from . import metrics
 
 # Initializing identifiers for lazy load
 _model_id       = "openchat/openchat-3.5-1210"
 _tokenizer      = None
 _analyzer_model = None
 
+# Optional draft model for assisted generation (ANALYZER_ASSISTANT_MODEL).
+# Only same-vocabulary drafts are used (see load_assistant); they leave the
+# output distribution unchanged, so MODEL_VERSION stays the same.
+_assistant_id     = getattr(settings, 'ANALYZER_ASSISTANT_MODEL', None)
+_assistant_kwargs = None
+
+# Stored on every AnswerAnalysis; bump PROMPT_VERSION whenever curate_prompt changes
+MODEL_VERSION   = _model_id
+PROMPT_VERSION  = "v2"
+
+# Prompt + generated ids and KV cache of the last analysis, kept for a follow-up
+_last_state     = None
+
+def _load_tokenizer():
+    """
+    Lazily load only the OpenChat tokenizer, enough to budget prompts.
+    """
+    global _tokenizer
+    if _tokenizer is None:
+        _tokenizer = AutoTokenizer.from_pretrained(_model_id)
+    return _tokenizer
+
 def _load_model():
     """
     Lazily load the OpenChat model & tokenizer on first use.
     """
-    global _tokenizer, _analyzer_model
-    if _tokenizer is None or _analyzer_model is None:
-        _tokenizer = AutoTokenizer.from_pretrained(_model_id)
+    global _analyzer_model
+    tokenizer = _load_tokenizer()
+    if _analyzer_model is None:
         _analyzer_model = AutoModelForCausalLM.from_pretrained(
             _model_id,
             torch_dtype=torch.float16,
             device_map="auto"
         )
-    return _tokenizer, _analyzer_model
+    return tokenizer, _analyzer_model
+
+def _load_assistant():
+    """
+    Lazily load the draft model for assisted generation, if one is configured.
+    Returns generate() kwargs; empty when assisted decoding is off.
+    """
+    global _assistant_kwargs
+    if _assistant_kwargs is None:
+        _assistant_kwargs = load_assistant(_assistant_id, _load_tokenizer()) if _assistant_id else {}
+    return _assistant_kwargs
 
 def respone_wps(segments: list[str]) -> tuple[list[str], float]:
     """
@@ -45,15 +81,19 @@ def respone_wps(segments: list[str]) -> tuple[list[str], float]:
 def curate_prompt(segments: list[str], question: str) -> str:
     """
     Builds the LLM prompt from timestamped segments and the question.
+    Timestamps are only used for the measured speed; the answer text is
+    cut to ANALYZER_ANSWER_TOKEN_BUDGET tokens.
     """
-    formatted_response, wps = respone_wps(segments)
+    _, wps = respone_wps(segments)
+    budget = getattr(settings, 'ANALYZER_ANSWER_TOKEN_BUDGET', 768)
+    formatted_response = fit_text(_load_tokenizer(), strip_timestamps(segments), budget, stage='analyze')
 
     prompt = f"""You are an expert behavioral interviewer. Carefully analyze ONLY the candidate's response shown between the === delimiters. Do NOT analyze this prompt or give general advice.
 
 Interview Question:
 "{question}"
 
-Candidate's Timestamped Response:
+Candidate's Response:
 ===
 {formatted_response}
 ===
@@ -78,22 +118,108 @@ Return ONLY this JSON object — no explanation, no formatting, no repetition.
 """
     return prompt
 
-def analyze(segments: list[str], question: str) -> dict:
+def analyze(segments: list[str], question: str, keep_state: bool = False) -> dict:
     """
     Analyzes interviewee's response via the loaded LLM.
     Returns a dict: {"tone":..., "speed":..., "fluency":..., "relevance":...}
+    With `keep_state`, the generated ids and KV cache are kept so that
+    generate_follow_up() can continue from them without a second prefill.
     """
+    global _last_state
     tokenizer, analyzer_model = _load_model()
     prompt = curate_prompt(segments, question)
-    inputs = tokenizer(prompt, return_tensors="pt").to("cuda")
+    inputs = tokenizer(prompt, return_tensors="pt").to(analyzer_model.device)
+    record_prompt('analyze', inputs["input_ids"].shape[-1])
+    start = time.perf_counter()
     outputs = analyzer_model.generate(
         **inputs,
         max_new_tokens=300,
         do_sample=True,
-        temperature=0.7
+        temperature=0.7,
+        return_dict_in_generate=True,
+        **_load_assistant(),
+    )
+    elapsed = time.perf_counter() - start
+    sequences = outputs.sequences
+    metrics.observe('analyze', elapsed)
+    metrics.record_tokens('analyze', sequences.shape[-1] - inputs["input_ids"].shape[-1], elapsed)
+    _last_state = None
+    if keep_state:
+        _last_state = {
+            "key": (question, tuple(segments)),
+            "sequences": sequences,
+            "past_key_values": getattr(outputs, "past_key_values", None),
+        }
+    raw_output = tokenizer.decode(sequences[0], skip_special_tokens=True)
+    return parse_analysis(raw_output)
+
+def discard_state():
+    """
+    Drops the KV cache kept by analyze(keep_state=True) when no follow-up uses it.
+    """
+    global _last_state
+    _last_state = None
+
+def _follow_up_instruction(relevance) -> str:
+    score = f" It was scored {relevance} for relevance." if relevance is not None else ""
+    return (
+        f"\n\nNow act as the interviewer again.{score} Ask ONE short follow-up question "
+        "that probes the vaguest or weakest part of the candidate's answer above. "
+        "Return only the question.\nFollow-up question:"
     )
-    raw_output = tokenizer.decode(outputs[0], skip_special_tokens=True)
 
+def generate_follow_up(segments: list[str], question: str, relevance=None,
+                       max_new_tokens: int = 48, max_time: float = None):
+    """
+    Generates one short follow-up question for the answer just analyzed.
+    Continues from the KV cache kept by analyze(keep_state=True) when it
+    belongs to the same answer, otherwise prefills the analysis prompt.
+    Returns the question text, or None if nothing usable was produced in time.
+    """
+    global _last_state
+    tokenizer, analyzer_model = _load_model()
+    state, _last_state = _last_state, None
+    suffix = tokenizer(_follow_up_instruction(relevance), return_tensors="pt",
+                       add_special_tokens=False).input_ids.to(analyzer_model.device)
+    generate_kwargs = dict(max_new_tokens=max_new_tokens, do_sample=False)
+    if max_time:
+        generate_kwargs["max_time"] = max_time
+
+    start = time.perf_counter()
+    outputs = None
+    if state and state["key"] == (question, tuple(segments)) and state["past_key_values"] is not None:
+        input_ids = torch.cat([state["sequences"], suffix], dim=-1)
+        try:
+            outputs = analyzer_model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                past_key_values=state["past_key_values"],
+                **generate_kwargs,
+            )
+        except (TypeError, ValueError, RuntimeError):
+            outputs = None  # cache layout not reusable by this transformers version
+    if outputs is None:
+        prompt_ids = tokenizer(curate_prompt(segments, question), return_tensors="pt").input_ids
+        input_ids = torch.cat([prompt_ids.to(analyzer_model.device), suffix], dim=-1)
+        outputs = analyzer_model.generate(
+            input_ids=input_ids,
+            attention_mask=torch.ones_like(input_ids),
+            **generate_kwargs,
+            **_load_assistant(),
+        )
+    elapsed = time.perf_counter() - start
+    new_tokens = outputs[0, input_ids.shape[-1]:]
+    metrics.observe('follow_up', elapsed)
+    metrics.record_tokens('follow_up', new_tokens.shape[-1], elapsed)
+
+    text = tokenizer.decode(new_tokens, skip_special_tokens=True).strip()
+    match = re.search(r"[^\n?]{10,}\?", text)
+    return match.group(0).strip(" \"'-") if match else None
+
+def parse_analysis(raw_output: str) -> dict:
+    """
+    Extracts the last analysis JSON object from raw model output.
+    """
     matches = re.findall(
         r"\{\s*\"tone\":.*?\"relevance\":\s*[\d.]+\s*\}",
         raw_output,
@@ -102,3 +228,33 @@ def analyze(segments: list[str], question: str) -> dict:
     if matches:
         return ast.literal_eval(matches[-1])
     return {"Error": "Execution failed, retry"}
+
+def analyze_batch(items: list[tuple[list[str], str]]) -> list[dict]:
+    """
+    Analyzes several (segments, question) pairs in one padded generate call.
+    Returns one result dict per item, in order.
+    Assisted generation handles one sequence at a time, so it is not used here.
+    """
+    tokenizer, analyzer_model = _load_model()
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    prompts = [curate_prompt(segments, question) for segments, question in items]
+    lengths = [len(ids) for ids in tokenizer(prompts).input_ids]
+    for length in lengths:
+        record_prompt('analyze_batch', length)
+    # Padded to a length bucket so batches share a few input shapes
+    inputs = tokenizer(prompts, return_tensors="pt", padding="max_length",
+                       max_length=bucket_length(max(lengths))).to(analyzer_model.device)
+    start = time.perf_counter()
+    outputs = analyzer_model.generate(
+        **inputs,
+        max_new_tokens=300,
+        do_sample=True,
+        temperature=0.7,
+        pad_token_id=tokenizer.pad_token_id,
+    )
+    elapsed = time.perf_counter() - start
+    metrics.observe('analyze_batch', elapsed)
+    metrics.record_tokens('analyze_batch', (outputs.shape[-1] - inputs["input_ids"].shape[-1]) * len(items), elapsed)
+    return [parse_analysis(raw) for raw in tokenizer.batch_decode(outputs, skip_special_tokens=True)]
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .models import Profile
+
+_PRINCIPAL_KEY = 'principal:{}'   # user id -> {field: value} of the user and its profile, no password
+
+def principal_key(user_id):
+    return _PRINCIPAL_KEY.format(user_id)
+
+def invalidate_principal(user_id):
+    cache.delete(principal_key(user_id))
+
+def _fields(model):
+    return [f.attname for f in model._meta.concrete_fields if not f.is_relation and f.name != 'password']
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that takes the user, with its profile, from the
+    shared cache. A miss costs one query (user joined with profile) and is
+    cached for PRINCIPAL_CACHE_SECONDS; saving or deleting a user or profile
+    drops the entry, so only the token itself is checked per request.
+    Only plain field values are cached, never the password hash: the user
+    is rebuilt from them with the password deferred (loaded on access).
+    """
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = principal_key(user_id)
+        row = cache.get(key)
+        if row is None:
+            row = self._load(user_id)
+            cache.set(key, row, timeout=getattr(settings, 'PRINCIPAL_CACHE_SECONDS', 60))
+
+        user_fields, profile_fields = _fields(self.user_model), _fields(Profile)
+        user = self.user_model.from_db(None, user_fields, [row[f] for f in user_fields])
+        user.profile = Profile.from_db(None, profile_fields, [row['profile__' + f] for f in profile_fields])
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+    def _load(self, user_id):
+        user_fields, profile_fields = _fields(self.user_model), ['profile__' + f for f in _fields(Profile)]
+        users = self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+        row = users.values(*user_fields, *profile_fields).first()
+        if row is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if row['profile__id'] is None:   # legacy user created before profiles
+            Profile.objects.get_or_create(user_id=row['id'])
+            row = users.values(*user_fields, *profile_fields).first()
+        return row
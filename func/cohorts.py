@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from .models import Cohort, InterviewSession, Notification, Profile, Resume
+from . import scheduler
+
+User = get_user_model()
+
+def create_cohort(name, recruiter, candidates, files):
+    """
+    Creates users, profiles, resumes and interview sessions for a cohort
+    in one transaction using bulk inserts, then queues question generation
+    in the bulk priority class once the rows are committed.
+
+    `candidates` are validated CohortCandidateSerializer dicts; `files`
+    maps upload field names to resume files.
+    Returns (cohort, [(username, session_id), ...]).
+    """
+    from .tasks import generate_session_questions
+
+    with transaction.atomic():
+        cohort = Cohort.objects.create(name=name, created_by=recruiter)
+
+        usernames = [c['username'] for c in candidates]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        new_users = []
+        for c in candidates:
+            if c['username'] in existing:
+                continue
+            user = User(username=c['username'], email=c['email'])
+            user.set_unusable_password()  # candidates set one through password reset
+            new_users.append(user)
+        # bulk_create skips the post_save receivers, so profiles are inserted here too;
+        # users are re-read because MySQL does not return bulk-inserted primary keys
+        User.objects.bulk_create(new_users)
+        users = {u.username: u for u in User.objects.filter(username__in=usernames)}
+        created = {u.username for u in new_users}
+        Profile.objects.bulk_create([
+            Profile(user=users[c['username']], preferred_role=c['preferred_role'],
+                    difficulty=c['difficulty'], category=c['category'])
+            for c in candidates if c['username'] in created
+        ])
+
+        resumes, sessions = [], []
+        for i, c in enumerate(candidates):
+            user = users[c['username']]
+            upload = files[c.get('resume') or f'resume_{i}']
+            resume = Resume(user=user)
+            resume.resume_file.save(upload.name, upload, save=False)
+            resumes.append(resume)
+            sessions.append(InterviewSession(user=user, cohort=cohort))
+        Resume.objects.bulk_create(resumes)
+        InterviewSession.objects.bulk_create(sessions)
+        Notification.objects.bulk_create([
+            Notification(user=s.user, session=s, message=f"You have been invited to interview: {name}.")
+            for s in sessions
+        ])
+
+        session_ids = [str(s.id) for s in sessions]
+        transaction.on_commit(lambda: [
+            scheduler.dispatch(generate_session_questions, args=[session_id],
+                               user_id=recruiter.id, klass=scheduler.BULK)
+            for session_id in session_ids
+        ])
+    return cohort, [(s.user.username, s.id) for s in sessions]
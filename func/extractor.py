@@ -0,0 +1,174 @@
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from xml.etree import ElementTree
+from django.conf import settings
+from pdfminer.high_level import extract_text
+from pdfminer.layout import LAParams
+
+# Optional native PDF backends, preferred over pdfminer when installed
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+
+# Line grouping only: boxes_flow=None skips pdfminer's costly box ordering pass
+_FAST_LAPARAMS = LAParams(boxes_flow=None, detect_vertical=False, all_texts=False)
+
+_DOCX_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+# Page-parallel extraction pool, created on first use and kept for the process
+_pool = None
+_pool_lock = threading.Lock()
+
+def available_pdf_backends():
+    """
+    PDF backends usable in this environment, fastest first.
+    """
+    backends = []
+    if pdfium is not None:
+        backends.append('pdfium')
+    if fitz is not None:
+        backends.append('pymupdf')
+    backends.append('pdfminer')
+    return backends
+
+def _resolve_backend(backend=None):
+    backend = backend or getattr(settings, 'RESUME_PDF_BACKEND', 'auto')
+    if backend == 'auto':
+        return available_pdf_backends()[0]
+    if backend not in available_pdf_backends():
+        raise ValueError(f"PDF backend '{backend}' is not available")
+    return backend
+
+def _page_count(backend, path):
+    if backend == 'pdfium':
+        pdf = pdfium.PdfDocument(path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    if backend == 'pymupdf':
+        with fitz.open(path) as doc:
+            return doc.page_count
+    return None  # pdfminer stops on its own via maxpages
+
+def _extract_pages(backend, path, page_numbers):
+    """
+    Extracts the given pages with one backend. Runs in worker processes,
+    so each call opens its own document handle.
+    """
+    if backend == 'pdfium':
+        pdf = pdfium.PdfDocument(path)
+        try:
+            texts = []
+            for i in page_numbers:
+                page = pdf[i]
+                textpage = page.get_textpage()
+                try:
+                    texts.append(textpage.get_text_range())
+                finally:
+                    textpage.close()
+                    page.close()
+            return "\n".join(texts)
+        finally:
+            pdf.close()
+    if backend == 'pymupdf':
+        with fitz.open(path) as doc:
+            return "\n".join(doc[i].get_text() for i in page_numbers)
+    return extract_text(path, page_numbers=page_numbers, laparams=_FAST_LAPARAMS)
+
+def _chunks(pages, n):
+    size = -(-len(pages) // n)
+    return [pages[i:i + size] for i in range(0, len(pages), size)]
+
+def _get_pool(workers):
+    """
+    The long-lived extraction pool. Workers are spawned, not forked, so
+    they do not inherit the web or Celery process's model state.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+def _drop_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def pdf_text(path, backend=None, max_pages=None, workers=None):
+    """
+    Extracts text from the first `max_pages` pages of a PDF. Documents of
+    at least RESUME_PARALLEL_MIN_PAGES pages are split into contiguous page
+    ranges over a long-lived pool when RESUME_EXTRACT_WORKERS > 1; typical
+    resumes are extracted in-process, where that is cheaper.
+    """
+    backend = _resolve_backend(backend)
+    max_pages = max_pages or getattr(settings, 'RESUME_MAX_PAGES', 5)
+    workers = workers or getattr(settings, 'RESUME_EXTRACT_WORKERS', 1)
+
+    total = _page_count(backend, path)
+    if total is None:
+        # pdfminer cannot count pages cheaply; parse sequentially up to the cap
+        return extract_text(path, maxpages=max_pages, laparams=_FAST_LAPARAMS)
+    pages = list(range(min(total, max_pages)))
+    min_parallel = getattr(settings, 'RESUME_PARALLEL_MIN_PAGES', 8)
+    if workers <= 1 or len(pages) < min_parallel:
+        return _extract_pages(backend, path, pages)
+
+    chunks = _chunks(pages, workers)
+    try:
+        parts = _get_pool(workers).map(_extract_pages, [backend] * len(chunks), [path] * len(chunks), chunks)
+        return "\n".join(parts)
+    except (AssertionError, OSError, BrokenProcessPool):
+        # Daemonic processes (e.g. Celery prefork children) cannot start a pool
+        _drop_pool()
+        return _extract_pages(backend, path, pages)
+
+def docx_text(path):
+    """
+    Extracts paragraph text from a .docx without external dependencies.
+    """
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read('word/document.xml'))
+    paragraphs = []
+    for para in root.iter(f'{_DOCX_NS}p'):
+        parts = []
+        for node in para.iter():
+            if node.tag == f'{_DOCX_NS}t' and node.text:
+                parts.append(node.text)
+            elif node.tag in (f'{_DOCX_NS}tab', f'{_DOCX_NS}br'):
+                parts.append(' ')
+        if parts:
+            paragraphs.append("".join(parts))
+    return "\n".join(paragraphs)
+
+def plain_text(path):
+    with open(path, encoding='utf-8', errors='replace') as fh:
+        return fh.read()
+
+def extract_resume_text(path, backend=None, max_pages=None):
+    """
+    Extracts raw text from a resume in any supported format (.pdf, .docx, .txt).
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.pdf':
+        return pdf_text(path, backend=backend, max_pages=max_pages)
+    if ext == '.docx':
+        return docx_text(path)
+    if ext == '.txt':
+        return plain_text(path)
+    raise ValueError(f"Unsupported resume format: {ext}")
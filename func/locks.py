@@ -0,0 +1,33 @@
+import time
+import uuid
+from contextlib import contextmanager
+from django.core.cache import cache
+
+def acquire(key, timeout, blocking=True, poll=0.01):
+    """
+    Takes a lock in the shared cache; returns the owner token, or None when
+    not `blocking` and the lock is held. The lock expires after `timeout`
+    seconds so a killed holder cannot keep it.
+    """
+    token = uuid.uuid4().hex
+    while not cache.add(key, token, timeout=timeout):
+        if not blocking:
+            return None
+        time.sleep(poll)
+    return token
+
+def release(key, token):
+    """
+    Releases the lock only if `token` still owns it: after expiring, the
+    lock may have been taken by someone else and must not be deleted.
+    """
+    if token is not None and cache.get(key) == token:
+        cache.delete(key)
+
+@contextmanager
+def cache_lock(key, timeout=5):
+    token = acquire(key, timeout)
+    try:
+        yield
+    finally:
+        release(key, token)
@@ -0,0 +1,71 @@
+import os
+import random
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Distil model-best into a CPU-friendly tok2vec NER pipeline. "
+        "Resumes are labelled by the transformer teacher and a student "
+        "with the same labels is trained on them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', nargs='?', default=str(settings.RESUME_DIR),
+                            help='folder of resumes (.pdf, .docx, .txt) to label')
+        parser.add_argument('--output', default=str(Path(settings.RESUME_NER_DISTILLED_DIR).parent),
+                            help='training directory; the student lands in <output>/model-best')
+        parser.add_argument('--dev-split', type=float, default=0.2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-train', action='store_true',
+                            help='only write the corpus and config')
+
+    def handle(self, *args, **opts):
+        from spacy.cli.init_config import init_config
+        from spacy.cli.train import train
+        from spacy.tokens import DocBin
+        from func.extractor import SUPPORTED_EXTENSIONS
+        from func.parser import NER_LABELS, load_ner_pipeline, text_extractor
+
+        source = opts['source']
+        if not os.path.isdir(source):
+            raise CommandError(f"{source} is not a directory")
+        files = sorted(f for f in os.listdir(source) if f.lower().endswith(SUPPORTED_EXTENSIONS))
+        if len(files) < 2:
+            raise CommandError("Need at least two resumes to build train and dev sets")
+
+        teacher = load_ner_pipeline('full')
+        docs = []
+        for name in files:
+            text = text_extractor(os.path.join(source, name))
+            if not text.strip():
+                continue
+            doc = teacher(text)
+            doc.ents = [ent for ent in doc.ents if ent.label_ in NER_LABELS]
+            docs.append(doc)
+        self.stdout.write(f"Labelled {len(docs)} resumes with the teacher")
+
+        random.Random(opts['seed']).shuffle(docs)
+        n_dev = max(1, int(len(docs) * opts['dev_split']))
+        output = Path(opts['output'])
+        corpus = output / 'corpus'
+        corpus.mkdir(parents=True, exist_ok=True)
+        # The DocBin keeps the teacher's tokens plus only the entity annotations (no
+        # tags or parses); training aligns the student's tokenization to those tokens
+        DocBin(docs=docs[n_dev:], attrs=['ENT_IOB', 'ENT_TYPE']).to_disk(corpus / 'train.spacy')
+        DocBin(docs=docs[:n_dev], attrs=['ENT_IOB', 'ENT_TYPE']).to_disk(corpus / 'dev.spacy')
+
+        config = init_config(lang='en', pipeline=['ner'], optimize='efficiency', gpu=False)
+        config_path = output / 'config.cfg'
+        config.to_disk(config_path)
+        self.stdout.write(f"Wrote corpus and config to {output}")
+
+        if opts['no_train']:
+            return
+        train(config_path, output, overrides={
+            'paths.train': str(corpus / 'train.spacy'),
+            'paths.dev':   str(corpus / 'dev.spacy'),
+        })
+        self.stdout.write(self.style.SUCCESS(f"Student pipeline saved to {output / 'model-best'}"))
@@ -0,0 +1,143 @@
+import json
+import os
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from func.models import Answer, AnswerAnalysis
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-run LLM analysis over stored transcripts in large batches. "
+        "Answers are never re-transcribed and nothing goes through the "
+        "Celery queues; progress is checkpointed so a run can be resumed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='only answers given on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--until', help='only answers given before this date (YYYY-MM-DD)')
+        parser.add_argument('--role', help="candidate's preferred role, e.g. SDE")
+        parser.add_argument('--model-version',
+                            help='only answers analysed by this model version (default: any stale version)')
+        parser.add_argument('--all', action='store_true',
+                            help='re-analyse even answers already at the current model/prompt version')
+        parser.add_argument('--batch-size', type=int, default=16, help='answers per generate call')
+        parser.add_argument('--chunk-size', type=int, default=512, help='answers fetched and written per round')
+        parser.add_argument('--limit', type=int, help='stop after this many answers')
+        parser.add_argument('--checkpoint', default='reanalyze.checkpoint.json')
+        parser.add_argument('--resume', action='store_true', help='continue after the last checkpoint')
+        parser.add_argument('--dry-run', action='store_true', help='only count matching answers')
+
+    def _date(self, value, name):
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError(f"--{name} must be YYYY-MM-DD")
+        return timezone.make_aware(datetime.combine(parsed, datetime.min.time()))
+
+    def _queryset(self, opts):
+        from func.analyzer import MODEL_VERSION, PROMPT_VERSION
+
+        qs = Answer.objects.filter(Q(segments__isnull=False) | Q(transcript__isnull=False)).exclude(transcript='')
+        if opts['since']:
+            qs = qs.filter(responded_at__gte=self._date(opts['since'], 'since'))
+        if opts['until']:
+            qs = qs.filter(responded_at__lt=self._date(opts['until'], 'until'))
+        if opts['role']:
+            qs = qs.filter(question__session__user__profile__preferred_role=opts['role'])
+        if opts['model_version']:
+            qs = qs.filter(analysis__model_version=opts['model_version'])
+        elif not opts['all']:
+            current = Q(analysis__model_version=MODEL_VERSION, analysis__prompt_version=PROMPT_VERSION)
+            qs = qs.exclude(current)
+        return qs.select_related('question', 'analysis').order_by('responded_at', 'id')
+
+    def _after(self, qs, state):
+        """Answers ordered after the last checkpointed one"""
+        if not state['last_id']:
+            return qs
+        last_at = parse_datetime(state['last_responded_at'])
+        return qs.filter(Q(responded_at__gt=last_at) | Q(responded_at=last_at, id__gt=state['last_id']))
+
+    def _load_checkpoint(self, path):
+        if not os.path.exists(path):
+            raise CommandError(f"No checkpoint at {path}")
+        with open(path) as fh:
+            return json.load(fh)
+
+    def _save_checkpoint(self, path, state):
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump(state, fh)
+        os.replace(tmp, path)
+
+    def handle(self, *args, **opts):
+        qs = self._queryset(opts)
+        state = {'last_responded_at': None, 'last_id': None, 'done': 0, 'failed': 0}
+        if opts['resume']:
+            state = self._load_checkpoint(opts['checkpoint'])
+
+        if opts['dry_run']:
+            self.stdout.write(f"{self._after(qs, state).count()} answers would be re-analysed")
+            return
+
+        from func.analyzer import MODEL_VERSION, PROMPT_VERSION, analyze_batch
+
+        remaining = opts['limit']
+        while remaining is None or remaining > 0:
+            size = opts['chunk_size'] if remaining is None else min(opts['chunk_size'], remaining)
+            chunk = list(self._after(qs, state)[:size])
+            if not chunk:
+                break
+
+            # Answers of similar length are batched together so they pad to one bucket
+            by_length = sorted(chunk, key=lambda a: len(a.transcript or ''))
+            results = []
+            for i in range(0, len(by_length), opts['batch_size']):
+                batch = by_length[i:i + opts['batch_size']]
+                # Answers stored before segments were kept only have plain text;
+                # they are analysed without timing (speaking speed reads as 0)
+                items = [(a.segments or [f"[0.0 - 0.0] {a.transcript}"], a.question.text) for a in batch]
+                results.extend(zip(batch, analyze_batch(items)))
+
+            now = timezone.now()
+            to_update, to_create = [], []
+            for answer, metrics in results:
+                if 'relevance' not in metrics:
+                    state['failed'] += 1
+                    continue
+                analysis = getattr(answer, 'analysis', None)
+                if analysis is None:
+                    to_create.append(AnswerAnalysis(
+                        answer=answer,
+                        relevance_score=metrics['relevance'],
+                        model_version=MODEL_VERSION,
+                        prompt_version=PROMPT_VERSION,
+                    ))
+                else:
+                    analysis.relevance_score = metrics['relevance']
+                    analysis.model_version = MODEL_VERSION
+                    analysis.prompt_version = PROMPT_VERSION
+                    analysis.updated_at = now  # bulk_update skips auto_now
+                    to_update.append(analysis)
+            AnswerAnalysis.objects.bulk_update(
+                to_update, ['relevance_score', 'model_version', 'prompt_version', 'updated_at']
+            )
+            AnswerAnalysis.objects.bulk_create(to_create)
+
+            state['done'] += len(to_update) + len(to_create)
+            state['last_responded_at'] = chunk[-1].responded_at.isoformat()
+            state['last_id'] = str(chunk[-1].id)
+            self._save_checkpoint(opts['checkpoint'], state)
+            if remaining is not None:
+                remaining -= len(chunk)
+            self.stdout.write(f"{state['done']} re-analysed, {state['failed']} failed")
+
+        if state['done']:
+            # Peer sketches cannot take back the old scores; recompute them from the table
+            from func.percentiles import rebuild
+            self.stdout.write(f"Rebuilt {rebuild()} peer score sketches")
+        self.stdout.write(self.style.SUCCESS(
+            f"Finished: {state['done']} re-analysed, {state['failed']} failed"
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from func.models import ScoreSketch
+from func.percentiles import TDigest, rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the peer score sketches, or rebuild them from every stored "
+        "analysis with --rebuild (needed once for analyses made before "
+        "sketches existed; new ones are added as they land and `reanalyze` "
+        "rebuilds after changing scores)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='recompute all sketches from AnswerAnalysis')
+
+    def handle(self, *args, **opts):
+        if opts['rebuild']:
+            self.stdout.write(f"Rebuilt {rebuild()} sketches")
+        self.stdout.write(f"{'role':<10} {'diff':<4} {'category':<12} {'metric':<16} {'count':>8} "
+                          f"{'p10':>9} {'p50':>9} {'p90':>9}")
+        for s in ScoreSketch.objects.order_by('role', 'difficulty', 'category', 'metric'):
+            digest = TDigest.from_dict(s.digest)
+            p10, p50, p90 = (digest.quantile(q) for q in (0.1, 0.5, 0.9))
+            self.stdout.write(f"{s.role:<10} {s.difficulty:<4} {s.category:<12} {s.metric:<16} {s.count:>8} "
+                              f"{p10:>9.3f} {p50:>9.3f} {p90:>9.3f}")
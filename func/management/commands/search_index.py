@@ -0,0 +1,36 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from func import search
+from func.models import SearchPosting
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the transcript and question search index. New and edited "
+        "answers and questions are indexed as they are saved; this fills the "
+        "index for existing rows, or rebuilds it from scratch with --rebuild."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=['answer', 'question'], action='append',
+                            help='index only this kind (repeatable; default both)')
+        parser.add_argument('--since', help='only rows answered/asked on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--rebuild', action='store_true', help='drop the existing postings first')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def _since(self, value):
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError("--since must be YYYY-MM-DD")
+        return timezone.make_aware(datetime.combine(parsed, datetime.min.time()))
+
+    def handle(self, *args, **opts):
+        kinds = opts['kind'] or ['answer', 'question']
+        since = self._since(opts['since']) if opts['since'] else None
+        for kind in kinds:
+            if opts['rebuild']:
+                SearchPosting.objects.filter(kind=kind).delete()
+            count = search.rebuild(kind, batch_size=opts['batch_size'], since=since)
+            self.stdout.write(f"Indexed {count} {kind}s")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from func.worker import collect_memory
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the memory of running Celery worker processes as they last "
+        "reported it. PSS splits shared pages between processes, so the PSS "
+        "total is the real footprint when models are shared across children."
+    )
+
+    def handle(self, *args, **opts):
+        reports = collect_memory()
+        if not reports:
+            self.stdout.write("No worker has reported its memory yet")
+            return
+        mib = lambda n: f"{n / 2 ** 20:,.0f}"
+        self.stdout.write(f"{'pid':>8} {'rss MiB':>10} {'pss MiB':>10} {'shared MiB':>11} {'private MiB':>12}")
+        for r in reports:
+            self.stdout.write(f"{r['pid']:>8} {mib(r['rss']):>10} {mib(r['pss']):>10} "
+                              f"{mib(r['shared']):>11} {mib(r['private']):>12}")
+        self.stdout.write(f"{'total':>8} {mib(sum(r['rss'] for r in reports)):>10} "
+                          f"{mib(sum(r['pss'] for r in reports)):>10}")
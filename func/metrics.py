@@ -0,0 +1,191 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+from .locks import cache_lock
+
+logger = logging.getLogger('func.metrics')
+
+ENABLED = getattr(settings, 'PIPELINE_METRICS_ENABLED', False)
+
+# Histogram definitions: name -> (help text, upper bucket bounds)
+HISTOGRAMS = {
+    'pipeline_stage_seconds': (
+        "Latency of interview pipeline stages",
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+    ),
+    'pipeline_tokens_per_second': (
+        "Generation throughput of model stages",
+        (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+    ),
+    'pipeline_prompt_tokens': (
+        "Prompt length in tokens of model stages",
+        (64, 128, 256, 512, 768, 1024, 1536, 2048, 4096),
+    ),
+}
+COUNTERS = {
+    'pipeline_tokens_total': "Tokens produced by model stages",
+    'pipeline_prompt_truncations_total': "Prompt fields cut to their token budget",
+}
+
+_lock       = threading.Lock()
+_histograms = {}   # (name, stage) -> {"buckets": [...], "sum": float, "count": int}
+_counters   = {}   # (name, stage) -> float
+_last_push  = 0.0
+
+# Each process publishes its cumulative snapshot under its own key
+_PROCESSES_KEY      = 'metrics:processes'
+_PROCESSES_LOCK_KEY = 'metrics:processes:lock'
+_process_pid        = None
+_process_key        = None
+
+def _own_key():
+    """
+    This process's snapshot key. A forked child (prefork Celery workers)
+    inherits the parent's key and series; it starts its own instead, so
+    children never overwrite each other's cumulative snapshots.
+    """
+    global _process_pid, _process_key, _last_push
+    pid = os.getpid()
+    if pid != _process_pid:
+        with _lock:
+            if _process_pid is not None:
+                _histograms.clear()
+                _counters.clear()
+                _last_push = 0.0
+            _process_pid = pid
+            _process_key = f'metrics:process:{pid}:{uuid.uuid4().hex}'
+    return _process_key
+
+def observe(stage, value, name='pipeline_stage_seconds'):
+    """
+    Records one observation for a stage histogram.
+    """
+    if not ENABLED:
+        return
+    _own_key()
+    bounds = HISTOGRAMS[name][1]
+    with _lock:
+        series = _histograms.setdefault(
+            (name, stage), {"buckets": [0] * (len(bounds) + 1), "sum": 0.0, "count": 0}
+        )
+        series["buckets"][bisect.bisect_left(bounds, value)] += 1
+        series["sum"] += value
+        series["count"] += 1
+    logger.info(json.dumps({"metric": name, "stage": stage, "value": round(value, 6)}))
+    _maybe_push()
+
+def record_tokens(stage, tokens, seconds):
+    """
+    Records token count and tokens/sec for a model stage.
+    """
+    if not ENABLED:
+        return
+    _own_key()
+    with _lock:
+        _counters[('pipeline_tokens_total', stage)] = _counters.get(('pipeline_tokens_total', stage), 0) + tokens
+    if seconds > 0:
+        observe(stage, tokens / seconds, name='pipeline_tokens_per_second')
+
+def record_truncation(stage):
+    if not ENABLED:
+        return
+    _own_key()
+    with _lock:
+        key = ('pipeline_prompt_truncations_total', stage)
+        _counters[key] = _counters.get(key, 0) + 1
+
+@contextmanager
+def timed(stage):
+    """
+    Times the enclosed block as a pipeline stage.
+    """
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+def snapshot():
+    with _lock:
+        return {
+            "histograms": {f"{n}|{s}": dict(v, buckets=list(v["buckets"])) for (n, s), v in _histograms.items()},
+            "counters":   {f"{n}|{s}": v for (n, s), v in _counters.items()},
+        }
+
+def push():
+    """
+    Publishes this process's snapshot to the shared cache so the web
+    endpoint can aggregate metrics recorded in Celery workers.
+    """
+    global _last_push
+    if not ENABLED:
+        return
+    key = _own_key()
+    _last_push = time.monotonic()
+    cache.set(key, snapshot(), timeout=86400)
+    if key not in (cache.get(_PROCESSES_KEY) or []):
+        with cache_lock(_PROCESSES_LOCK_KEY):
+            processes = cache.get(_PROCESSES_KEY) or []
+            if key not in processes:
+                cache.set(_PROCESSES_KEY, processes + [key], timeout=None)
+
+def _maybe_push():
+    if time.monotonic() - _last_push >= getattr(settings, 'PIPELINE_METRICS_PUSH_INTERVAL', 5):
+        push()
+
+def collect():
+    """
+    Sums the snapshots of every process that has published one.
+    """
+    push()
+    histograms, counters = {}, {}
+    processes = cache.get(_PROCESSES_KEY) or []
+    snapshots = cache.get_many(processes)
+    for snap in snapshots.values():
+        for key, series in snap["histograms"].items():
+            merged = histograms.setdefault(key, {"buckets": [0] * len(series["buckets"]), "sum": 0.0, "count": 0})
+            merged["buckets"] = [a + b for a, b in zip(merged["buckets"], series["buckets"])]
+            merged["sum"] += series["sum"]
+            merged["count"] += series["count"]
+        for key, value in snap["counters"].items():
+            counters[key] = counters.get(key, 0) + value
+    # Forget processes whose snapshot has expired
+    if len(snapshots) != len(processes):
+        with cache_lock(_PROCESSES_LOCK_KEY):
+            current = cache.get(_PROCESSES_KEY) or []
+            expired = set(processes) - set(snapshots)
+            cache.set(_PROCESSES_KEY, [k for k in current if k not in expired], timeout=None)
+    return histograms, counters
+
+def render_prometheus():
+    """
+    Renders the aggregated metrics in Prometheus text exposition format.
+    """
+    histograms, counters = collect()
+    lines = []
+    for name, (help_text, bounds) in HISTOGRAMS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for key in sorted(k for k in histograms if k.split("|")[0] == name):
+            stage = key.split("|", 1)[1]
+            series = histograms[key]
+            cumulative = 0
+            for bound, count in zip(list(bounds) + ["+Inf"], series["buckets"]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {series["sum"]}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {series["count"]}')
+    for name, help_text in COUNTERS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for key in sorted(k for k in counters if k.split("|")[0] == name):
+            lines.append(f'{name}{{stage="{key.split("|", 1)[1]}"}} {counters[key]}')
+    return "\n".join(lines) + "\n"
@@ -1,8 +1,8 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 import uuid
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 
 # Create your models here.
 class Profile(models.Model):
@@ -33,36 +33,91 @@ class Profile(models.Model):
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_user_profile(sender, instance, created, **kwargs):
-    """Create a Profile when a new User is created"""
+    """Create a Profile when a new User is created, or a legacy one without it is saved"""
     if created:
         Profile.objects.create(user=instance)
-
-
-@receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def save_user_profile(sender, instance, **kwargs):
-    """Save the Profile when User is saved (if profile exists)"""
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
     else:
         Profile.objects.get_or_create(user=instance)
 
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidate_user_principal(sender, instance, **kwargs):
+    """Drop the cached authentication principal of a changed user"""
+    from .authentication import invalidate_principal  # Import here to keep simplejwt out of model loading
+    invalidate_principal(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def invalidate_profile_principal(sender, instance, **kwargs):
+    """Drop the cached authentication principal when its profile changes"""
+    from .authentication import invalidate_principal
+    invalidate_principal(instance.user_id)
+
+class Skill(models.Model):
+    name=models.CharField(max_length=100, unique=True)
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def normalize(name):
+        return " ".join(name.split()).casefold()[:100]
+
 class Resume(models.Model):
     user=models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='resumes')
     resume_file=models.FileField(upload_to='resumes/')
     created_at=models.DateTimeField(auto_now_add=True)
     updated_at=models.DateTimeField(auto_now=True)
-    parsed_text=models.TextField(blank=True, null=True)
+    parsed_data=models.JSONField(blank=True, null=True)
+    skills=models.ManyToManyField(Skill, blank=True, related_name='resumes')
+    class Meta:
+        indexes = [models.Index(fields=['user', '-created_at'])]
     def __str__(self):
         return f"{self.user.username} - Resume {self.id}"
-    
+
+    def set_parsed_data(self, data):
+        """Store the structured resume and sync its rows in the skill table"""
+        names = {Skill.normalize(s) for s in data.get('skills', []) if s.strip()}
+        with transaction.atomic():
+            self.parsed_data = data
+            self.save(update_fields=['parsed_data', 'updated_at'])
+            Skill.objects.bulk_create([Skill(name=n) for n in names], ignore_conflicts=True)
+            self.skills.set(Skill.objects.filter(name__in=names))
+
+class Cohort(models.Model):
+    """A batch of candidates invited together by a recruiter"""
+    name=models.CharField(max_length=200)
+    created_by=models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='cohorts')
+    created_at=models.DateTimeField(auto_now_add=True)
+    def __str__(self):
+        return f"Cohort {self.name}"
+
 class InterviewSession(models.Model):
     id=models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user=models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='interview_sessions')
+    cohort=models.ForeignKey(Cohort, on_delete=models.SET_NULL, null=True, blank=True, related_name='sessions')
+    adaptive=models.BooleanField(default=False)  # insert follow-ups generated from answers
     started_at=models.DateTimeField(auto_now_add=True)
     ended_at=models.DateTimeField(blank=True, null=True)
     def __str__(self):
         return f"Session {self.id} for {self.user.username} started at {self.started_at}"
 
+    def next_question(self):
+        """
+        The next unanswered question: a follow-up of the question answered
+        last if one is ready, else the oldest unasked original. Follow-ups of
+        earlier answers are stale once the candidate moved on and are skipped.
+        """
+        pending = self.questions.exclude(answers__isnull=False)
+        last = (
+            Answer.objects.filter(question__session=self).order_by('-responded_at')
+            .values_list('question_id', flat=True).first()
+        )
+        if last is not None:
+            follow_up = pending.filter(follow_up_of_id=last).order_by('created_at').first()
+            if follow_up is not None:
+                return follow_up
+        return pending.filter(follow_up_of__isnull=True).order_by('created_at').first()
+
 class Question(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     session = models.ForeignKey(
@@ -71,6 +126,13 @@ class Question(models.Model):
         related_name='questions'
     )
     text = models.TextField()
+    follow_up_of = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='follow_ups'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -83,8 +145,17 @@ class Answer(models.Model):
         on_delete=models.CASCADE,
         related_name='answers'
     )
+    AUDIO_TIERS = [
+        ('raw', 'Original upload'),
+        ('opus', 'Compressed (Opus)'),
+        ('archived', 'In an archive bundle'),
+        ('purged', 'Purged'),
+    ]
     audio_file = models.FileField(upload_to='answers/', blank=True, null=True)
+    audio_tier = models.CharField(max_length=10, choices=AUDIO_TIERS, default='raw', db_index=True)
+    audio_archive = models.CharField(max_length=255, blank=True, default='')  # bundle holding the recording
     transcript = models.TextField(blank=True, null=True)
+    segments = models.JSONField(blank=True, null=True)  # timestamped "[start - end] text" lines
     responded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -99,7 +170,10 @@ class AnswerAnalysis(models.Model):
     average_pause_duration  = models.FloatField(null=True, blank=True)
     pause_frequency         = models.IntegerField(null=True, blank=True)
     speech_rate_consistency = models.FloatField(null=True, blank=True)
+    model_version           = models.CharField(max_length=100, blank=True, db_index=True)
+    prompt_version          = models.CharField(max_length=20, blank=True)
     created_at              = models.DateTimeField(auto_now_add=True)
+    updated_at              = models.DateTimeField(auto_now=True, db_index=True)
     def __str__(self):
         return f"Analysis for Answer {self.answer.id}"
     
@@ -110,4 +184,85 @@ class Notification(models.Model):
     read= models.BooleanField(default=False)
     created_at= models.DateTimeField(auto_now_add=True)
     def __str__(self):
-        return f"Notif for {self.user.username}: {self.message[:20]}"
\ No newline at end of file
+        return f"Notif for {self.user.username}: {self.message[:20]}"
+
+class DailyRollup(models.Model):
+    """Per-day interview aggregates by role, difficulty and category (day = session start)"""
+    day                 = models.DateField()
+    role                = models.CharField(max_length=20, choices=Profile.ROLES)
+    difficulty          = models.CharField(max_length=1, choices=Profile.DIFFICULTY_CHOICES)
+    category            = models.CharField(max_length=20, choices=Profile.CATEGORY_CHOICES)
+    sessions            = models.PositiveIntegerField(default=0)
+    completed_sessions  = models.PositiveIntegerField(default=0)
+    completion_rate     = models.FloatField(default=0.0)
+    answers             = models.PositiveIntegerField(default=0)
+    avg_relevance       = models.FloatField(null=True, blank=True)
+    p50_relevance       = models.FloatField(null=True, blank=True)
+    p90_relevance       = models.FloatField(null=True, blank=True)
+    avg_pace_wpm        = models.FloatField(null=True, blank=True)
+    avg_pause_duration  = models.FloatField(null=True, blank=True)
+    avg_pause_frequency = models.FloatField(null=True, blank=True)
+    updated_at          = models.DateTimeField(auto_now=True)
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'role', 'difficulty', 'category'], name='unique_daily_rollup'),
+        ]
+        indexes = [models.Index(fields=['role', 'day'])]
+    def __str__(self):
+        return f"{self.day} {self.role}/{self.difficulty}/{self.category}"
+
+class Watermark(models.Model):
+    """Progress marker of an incremental job (e.g. analytics rollups), kept across cache flushes"""
+    name  = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+    def __str__(self):
+        return f"{self.name} @ {self.value}"
+
+class ScoreSketch(models.Model):
+    """Streaming quantile sketch (t-digest) of one answer metric for a role/difficulty/category peer group"""
+    role       = models.CharField(max_length=20, choices=Profile.ROLES)
+    difficulty = models.CharField(max_length=1, choices=Profile.DIFFICULTY_CHOICES)
+    category   = models.CharField(max_length=20, choices=Profile.CATEGORY_CHOICES)
+    metric     = models.CharField(max_length=20)     # func.percentiles.METRICS key
+    count      = models.PositiveIntegerField(default=0)
+    digest     = models.JSONField(default=dict)      # TDigest.to_dict()
+    updated_at = models.DateTimeField(auto_now=True)
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['role', 'difficulty', 'category', 'metric'], name='unique_score_sketch'),
+        ]
+    def __str__(self):
+        return f"{self.metric} sketch for {self.role}/{self.difficulty}/{self.category} ({self.count})"
+
+class SearchPosting(models.Model):
+    """Inverted index entry: one term of one answer transcript or question text (func.search)"""
+    KINDS = [
+        ('answer', 'Answer transcript'),
+        ('question', 'Question text'),
+    ]
+    term       = models.CharField(max_length=40)
+    kind       = models.CharField(max_length=8, choices=KINDS)
+    object_id  = models.UUIDField()
+    weight     = models.FloatField()                              # BM25 term-frequency part
+    role       = models.CharField(max_length=20, blank=True, default='')  # candidate's preferred role
+    created_at = models.DateTimeField()                           # answered / asked at
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id', 'term'], name='unique_search_posting'),
+        ]
+        indexes = [models.Index(fields=['kind', 'term', 'role', 'created_at'])]
+    def __str__(self):
+        return f"{self.kind}:{self.term} -> {self.object_id}"
+
+
+class RetentionRun(models.Model):
+    """One pass of the audio retention engine (func.retention) and what it reclaimed"""
+    started_at      = models.DateTimeField(auto_now_add=True)
+    finished_at     = models.DateTimeField(null=True, blank=True)
+    transcoded      = models.PositiveIntegerField(default=0)
+    archived        = models.PositiveIntegerField(default=0)
+    purged          = models.PositiveIntegerField(default=0)
+    failed          = models.PositiveIntegerField(default=0)
+    bytes_reclaimed = models.BigIntegerField(default=0)
+    def __str__(self):
+        return f"Retention run {self.started_at:%Y-%m-%d %H:%M}: {self.bytes_reclaimed} bytes"
@@ -1,38 +1,79 @@
+import logging
 import os
-from pdfminer.high_level import extract_text
 import spacy
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from transformers import AutoTokenizer, AutoModelForCausalLM
 import torch
 from django.conf import settings
 import re
+import time
+import zlib
+import numpy as np
+from .extractor import extract_resume_text, SUPPORTED_EXTENSIONS
+from .prompting import fit_items, load_assistant, record_prompt
+from . import metrics
+
+logger = logging.getLogger('func.parser')
 
 model_path  = str(settings.MODEL_DIR)         
 folder_path  = str(settings.RESUME_DIR)
-try:
-    nlp = spacy.load(model_path)
-except Exception as err:
-    print(f"Unable to load the model: {err}")
-    nlp = spacy.blank("en")  
 
-# Extract raw text from a PDF
+NER_LABELS = {
+    "Name", "Designation", "Skills", "Companies worked at",
+    "Degree", "College Name", "Graduation Year"
+}
+
+# Load the resume NER pipeline for a parsing mode: 'full' and 'fast' both run
+# model-best (transformer + ner, nothing to disable), 'fast' only truncates the
+# text; 'distilled' loads the tok2vec student built by `manage.py distill_ner`
+# and falls back to model-best if it cannot be loaded
+def load_ner_pipeline(mode=None):
+    mode = mode or getattr(settings, 'RESUME_NER_MODE', 'full')
+    if mode == 'distilled':
+        try:
+            return spacy.load(str(settings.RESUME_NER_DISTILLED_DIR))
+        except Exception:
+            logger.exception("Cannot load the distilled NER model from %s; falling back to %s",
+                              settings.RESUME_NER_DISTILLED_DIR, model_path)
+    try:
+        return spacy.load(model_path)
+    except Exception:
+        logger.exception("Cannot load the NER model from %s; resumes will yield no entities", model_path)
+        return spacy.blank("en")
+
+ner_mode = getattr(settings, 'RESUME_NER_MODE', 'full')
+ner_max_tokens = None if ner_mode == 'full' else settings.RESUME_NER_MAX_TOKENS
+nlp = load_ner_pipeline(ner_mode)
+
+# Cut text to the first `max_tokens` tokens (tokenizer only, no model pass)
+def truncate_tokens(pipeline, text, max_tokens):
+    if not max_tokens:
+        return text
+    tokens = pipeline.make_doc(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return text[:tokens[max_tokens].idx]
+
+# Extract raw text from a resume (.pdf, .docx or .txt)
 def text_extractor(pdf_path):
     try:
-        return extract_text(pdf_path)
+        with metrics.timed('parse'):
+            return extract_resume_text(pdf_path)
     except Exception as err:
         print(f"Error reading {pdf_path}: {err}")
         return ""
 
 # Use spaCy model to identify structured entities in resume text
-def identifier(text):
-    doc = nlp(text)
+def identifier(text, pipeline=None, max_tokens=None):
+    if pipeline is None:
+        pipeline = nlp
+        max_tokens = ner_max_tokens
+    with metrics.timed('ner'):
+        doc = pipeline(truncate_tokens(pipeline, text, max_tokens))
     return [
         (ent.text.replace("\n", " ").strip(), ent.label_)
         for ent in doc.ents
-        if ent.label_ in {
-            "Name", "Designation", "Skills", "Companies worked at",
-            "Degree", "College Name", "Graduation Year"
-        }
+        if ent.label_ in NER_LABELS
     ]
 
 # Format identified entities into a structured dictionary
@@ -42,13 +83,11 @@ def format_resume_data(parsed_data):
         grouped[label].add(value)
 
     resume_data = {
-        "name": ", ".join(grouped.get("Name", [])),
-        "role": ", ".join(grouped.get("Designation", [])),
-        "skills": ", ".join(grouped.get("Skills", [])),
-        "experience": ", ".join(grouped.get("Companies worked at", [])),
-        "education": ", ".join(
-            list(grouped.get("Degree", [])) + list(grouped.get("College Name", []))
-        )
+        "name": ", ".join(sorted(grouped.get("Name", []))),
+        "role": sorted(grouped.get("Designation", [])),
+        "skills": sorted(grouped.get("Skills", [])),
+        "experience": sorted(grouped.get("Companies worked at", [])),
+        "education": sorted(grouped.get("Degree", [])) + sorted(grouped.get("College Name", [])),
     }
 
     return resume_data
@@ -58,17 +97,17 @@ def parse_resume_file(file_path):
     """
     Parse resume from a file path. Can handle both folder path and direct file path.
     """
-    if os.path.isfile(file_path) and file_path.lower().endswith('.pdf'):
+    if os.path.isfile(file_path) and file_path.lower().endswith(SUPPORTED_EXTENSIONS):
         # Direct file path
         text = text_extractor(file_path)
         raw_entities = identifier(text)
         structured_data = format_resume_data(raw_entities)
         return structured_data
     elif os.path.isdir(file_path):
-        # Folder path - find first PDF
+        # Folder path - find first supported resume
         pdf_file = None
-        for file in os.listdir(file_path):
-            if file.lower().endswith('.pdf'):
+        for file in sorted(os.listdir(file_path)):
+            if file.lower().endswith(SUPPORTED_EXTENSIONS):
                 pdf_file = file
                 break
         if not pdf_file:
@@ -85,16 +124,62 @@ def parse_resume_file(file_path):
 def parser(folder_path):
     return parse_resume_file(folder_path)
 
-model_id = "microsoft/phi-2"
-tokenizer = AutoTokenizer.from_pretrained(model_id)
-model = AutoModelForCausalLM.from_pretrained(
-    model_id,
-    device_map="auto",
-    torch_dtype=torch.float16
-)
+# Initializing identifiers for lazy load of the question generator
+model_id   = "microsoft/phi-2"
+_tokenizer = None
+_model     = None
+
+# Optional draft model for assisted generation (QUESTION_ASSISTANT_MODEL)
+_assistant_id     = getattr(settings, 'QUESTION_ASSISTANT_MODEL', None)
+_assistant_kwargs = None
+
+def _load_prompt_tokenizer():
+    """
+    Lazily load only the phi-2 tokenizer, enough to budget prompts.
+    """
+    global _tokenizer
+    if _tokenizer is None:
+        _tokenizer = AutoTokenizer.from_pretrained(model_id)
+    return _tokenizer
+
+def _load_generator():
+    """
+    Lazily load phi-2 & tokenizer on first use.
+    """
+    global _model
+    tokenizer = _load_prompt_tokenizer()
+    if _model is None:
+        _model = AutoModelForCausalLM.from_pretrained(
+            model_id,
+            device_map="auto",
+            torch_dtype=torch.float16
+        )
+    return tokenizer, _model
+
+def _load_assistant():
+    """
+    Lazily load the draft model for assisted generation, if one is configured.
+    Returns generate() kwargs; empty when assisted decoding is off.
+    """
+    global _assistant_kwargs
+    if _assistant_kwargs is None:
+        _assistant_kwargs = load_assistant(_assistant_id, _load_prompt_tokenizer()) if _assistant_id else {}
+    return _assistant_kwargs
+
+# Render a list-valued resume field for the prompt
+# and cut it to its PROMPT_FIELD_TOKEN_BUDGETS entry
+def _field(resume_data, key, tokenizer):
+    value = resume_data.get(key)
+    if not value:
+        return "Not specified"
+    budget = getattr(settings, 'PROMPT_FIELD_TOKEN_BUDGETS', {}).get(key)
+    if budget is None:
+        return ", ".join(value) if isinstance(value, list) else value
+    return fit_items(tokenizer, value, budget, stage='generate')
 
 # Create a prompt using resume and job info to generate questions
-def build_prompt(resume_data, job_role="Software Engineer"):
+def build_prompt(resume_data, job_role="Software Engineer", count=10, accepted=()):
+    tokenizer = _load_prompt_tokenizer()
     example = """
 Example Resume:
 Name: Arjun Singh
@@ -112,32 +197,39 @@ Interview Questions:
 
     current = f"""
 Resume:
-Name: {resume_data.get("name", "Not specified")}
-Role: {resume_data.get("role", "Not specified")}
-Skills: {resume_data.get("skills", "Not specified")}
-Experience: {resume_data.get("experience", "Not specified")}
-Education: {resume_data.get("education", "Not specified")}
+Name: {_field(resume_data, "name", tokenizer)}
+Role: {_field(resume_data, "role", tokenizer)}
+Skills: {_field(resume_data, "skills", tokenizer)}
+Experience: {_field(resume_data, "experience", tokenizer)}
+Education: {_field(resume_data, "education", tokenizer)}
 
 Instructions:
-Generate 10 smart, in-depth interview questions that mix technical and HR-style probing, based on the resume and given job role {job_role}.
+Generate {count} smart, in-depth interview questions that mix technical and HR-style probing, based on the resume and given job role {job_role}.
 
 Questions:
-1.
 """
-
-    return current.strip()
+    # Questions already kept are listed so the model continues the numbering
+    kept = "".join(f"{i}. {q}\n" for i, q in enumerate(accepted, start=1))
+    return current.strip() + "\n" + kept + f"{len(accepted) + 1}."
 
 # Run the LLM to generate interview questions from the prompt
-def generate_questions(prompt):
+def generate_questions(prompt, max_new_tokens=512):
+    tokenizer, model = _load_generator()
     inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+    record_prompt('generate', inputs["input_ids"].shape[-1])
+    start = time.perf_counter()
     outputs = model.generate(
         **inputs,
-        max_new_tokens=512,
+        max_new_tokens=max_new_tokens,
         do_sample=True,
         temperature=0.7,
         top_p=0.95,
         repetition_penalty=1.15,
+        **_load_assistant(),
     )
+    elapsed = time.perf_counter() - start
+    metrics.observe('generate', elapsed)
+    metrics.record_tokens('generate', outputs.shape[-1] - inputs["input_ids"].shape[-1], elapsed)
     return tokenizer.decode(outputs[0], skip_special_tokens=True)
 
 # Parse questions from LLM output
@@ -166,33 +258,170 @@ def parse_questions_from_output(output):
     
     return [q for q in questions if q]  # Filter out empty questions
 
+# Questions from the prompt example; generated echoes of these are dropped
+EXAMPLE_QUESTIONS = [
+    "How do you ensure database migrations are safe and backward-compatible in production?",
+    "Why have you switched companies every year?",
+    "Can you explain the difference between Docker volume and bind mount?",
+    "Have you handled live incident debugging? How?",
+    "Explain your job role at Swiggy?",
+]
+
+_MINHASH_PERMUTATIONS = 64
+_MINHASH_PRIME = (1 << 61) - 1
+_minhash_rng = np.random.RandomState(20240601)   # fixed seed: same text, same signature
+_minhash_a = _minhash_rng.randint(1, 1 << 31, size=_MINHASH_PERMUTATIONS).astype(np.uint64)
+_minhash_b = _minhash_rng.randint(0, 1 << 31, size=_MINHASH_PERMUTATIONS).astype(np.uint64)
+_bank_signatures = OrderedDict()   # question id -> signature, per process (LRU)
+
+_IMPERATIVE = re.compile(r"^(explain|describe|tell|walk|give|share|discuss|talk|list|compare|outline)\b", re.I)
+_ARTIFACT = re.compile(r"\b(resume|name|skills|experience|education|instructions|answer)\s*:", re.I)
+
+def _shingles(text):
+    words = re.findall(r"[a-z0-9+#]+", text.lower())
+    if len(words) < 2:
+        return set(words)
+    return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+# MinHash signature over word bigrams; (a == b).mean() estimates their Jaccard similarity
+def minhash(text):
+    hashes = np.array([zlib.crc32(s.encode()) for s in _shingles(text)] or [0], dtype=np.uint64)
+    # (a * x + b) mod p for every permutation and shingle; values stay below 2**63
+    permuted = (_minhash_a[:, None] * hashes[None, :] + _minhash_b[:, None]) % np.uint64(_MINHASH_PRIME)
+    return permuted.min(axis=1)
+
+def is_usable_question(text):
+    """
+    Rejects truncated, too short or too long items, prompt artifacts and
+    lines that are not questions or interview prompts.
+    """
+    text = text.strip()
+    if not (15 <= len(text) <= 300) or len(text.split()) < 4:
+        return False
+    if _ARTIFACT.search(text):
+        return False
+    if text.endswith("?"):
+        return True
+    return text.endswith(".") and bool(_IMPERATIVE.match(text))
+
+def _bank_matrix(session):
+    """
+    Signatures of recent questions asked for the same role in other sessions.
+    """
+    from .models import Question
+    size = getattr(settings, 'QUESTION_BANK_SIZE', 2000)
+    bank = Question.objects.exclude(session=session).order_by('-created_at')
+    profile = getattr(session.user, 'profile', None)
+    if profile is not None:
+        bank = bank.filter(session__user__profile__preferred_role=profile.preferred_role)
+    rows = []
+    for question_id, text in bank.values_list('id', 'text')[:size]:
+        if question_id in _bank_signatures:
+            _bank_signatures.move_to_end(question_id)
+        else:
+            _bank_signatures[question_id] = minhash(text)
+        rows.append(_bank_signatures[question_id])
+    # Bounded: banks of every role fit, older questions are forgotten
+    limit = getattr(settings, 'QUESTION_BANK_CACHE_SIZE', 12000)
+    while len(_bank_signatures) > limit:
+        _bank_signatures.popitem(last=False)
+    return np.stack(rows) if rows else np.zeros((0, _MINHASH_PERMUTATIONS), dtype=np.uint64)
+
+_examples = None
+
+def _example_matrix():
+    # Signatures of the prompt's own examples, which the model tends to echo
+    global _examples
+    if _examples is None:
+        _examples = np.stack([minhash(q) for q in EXAMPLE_QUESTIONS])
+    return _examples
+
+def _fallback_questions(role):
+    """
+    Generic questions on the role's baseline requirements, used only when
+    generation cannot fill a session.
+    """
+    from .scoring import ROLE_REQUIREMENTS
+    requirements = ROLE_REQUIREMENTS.get(role) or ROLE_REQUIREMENTS['SDE']
+    return ([f"Describe a project where you relied on {r}." for r in requirements]
+            + [f"What mistakes do people commonly make with {r}?" for r in requirements])
+
+def filter_questions(candidates, accepted, bank, threshold=None, examples=None):
+    """
+    Splits generated candidates into (kept, seen_before). Unusable items,
+    echoes of the prompt `examples` and near-duplicates of `accepted` or of
+    each other are dropped; items that only repeat the bank (questions of
+    other sessions) go to `seen_before` as a last-resort fill.
+    `accepted` is extended in place with the kept texts.
+    """
+    threshold = threshold if threshold is not None else getattr(settings, 'QUESTION_DEDUP_THRESHOLD', 0.5)
+    examples = _example_matrix() if examples is None else examples
+    signatures = [minhash(q) for q in accepted]
+    kept, seen_before = [], []
+    for text in candidates:
+        text = text.strip()
+        if not is_usable_question(text):
+            continue
+        signature = minhash(text)
+        if any((signature == other).mean() >= threshold for other in signatures):
+            continue
+        signatures.append(signature)
+        if len(examples) and (examples == signature).mean(axis=1).max() >= threshold:
+            continue
+        if len(bank) and (bank == signature).mean(axis=1).max() >= threshold:
+            seen_before.append(text)
+            continue
+        kept.append(text)
+        accepted.append(text)
+    return kept, seen_before
+
 # Main execution function for generating questions from session and resume
-def execute(session, resume_file_path):
+def execute(session, resume_file_path, resume_data=None, count=10):
     """
     Generate questions for an interview session based on resume.
     Creates Question objects linked to the session.
+    Pass the stored `resume_data` to skip re-parsing the file.
+    Generated questions are filtered, and only the missing number is
+    regenerated, up to QUESTION_MAX_REGENERATIONS times. A session still
+    short after that is filled with questions other sessions were asked,
+    then with generic questions on the role's requirements (logged), so it
+    always gets `count`. Returns the number of questions created.
     """
     from .models import Question  # Import here to avoid circular imports
     
     # Parse resume
-    resume_data = parse_resume_file(resume_file_path)
+    if resume_data is None:
+        resume_data = parse_resume_file(resume_file_path)
     
     # Get job role from user profile
     job_role = session.user.profile.get_preferred_role_display() if hasattr(session.user, 'profile') else "Software Engineer"
     
-    # Build prompt and generate questions
-    prompt = build_prompt(resume_data, job_role)
-    output = generate_questions(prompt)
-    
-    # Parse questions from output
-    question_texts = parse_questions_from_output(output)
+    bank = _bank_matrix(session)
+    accepted, seen_before = [], []
+    attempts = 1 + getattr(settings, 'QUESTION_MAX_REGENERATIONS', 3)
+    for _ in range(attempts):
+        missing = count - len(accepted)
+        if missing <= 0:
+            break
+        # Budget for the missing questions only, not a full 512-token run
+        prompt = build_prompt(resume_data, job_role, count=count, accepted=accepted)
+        output = generate_questions(prompt, max_new_tokens=min(512, 40 * missing + 32))
+        _, repeats = filter_questions(parse_questions_from_output(output), accepted, bank)
+        seen_before.extend(repeats)
+    # Questions asked in other sessions beat leaving the session short
+    accepted.extend(seen_before[:max(count - len(accepted), 0)])
+    if len(accepted) < count:
+        logger.warning("Session %s got %d of %d questions after %d generations; adding generic ones",
+                       session.id, len(accepted), count, attempts)
+        role = session.user.profile.preferred_role if hasattr(session.user, 'profile') else 'SDE'
+        accepted.extend([q for q in _fallback_questions(role) if q not in accepted][:count - len(accepted)])
+    accepted = accepted[:count]
     
     # Create Question objects
-    for question_text in question_texts[:10]:  # Limit to 10 questions
-        if question_text:  # Only create if text is not empty
-            Question.objects.create(
-                session=session,
-                text=question_text
-            )
+    for question_text in accepted:
+        Question.objects.create(
+            session=session,
+            text=question_text
+        )
     
-    return len(question_texts)
\ No newline at end of file
+    return len(accepted)
@@ -0,0 +1,201 @@
+import bisect
+import math
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import AnswerAnalysis, ScoreSketch, Watermark
+
+# Sketched metric -> AnswerAnalysis field
+METRICS = {
+    'relevance':       'relevance_score',
+    'pace':            'pace_wpm',
+    'pause':           'average_pause_duration',
+    'pause_frequency': 'pause_frequency',
+}
+
+_BUFFER_SIZE = 32   # values added before the buffer is merged into the centroids
+_REBUILT = 'score-sketches'   # Watermark: time of the last rebuild(), its row the sketches' lock
+
+class TDigest:
+    """
+    Merging t-digest (Dunning & Ertl): at most about `compression`
+    weighted centroids, smallest at the tails, answering rank and quantile
+    queries with small error where it matters most. Values are buffered and merged in
+    batches, so adding one is amortised constant time.
+    """
+    def __init__(self, compression=100, centroids=(), buffer=(), min=None, max=None):
+        self.compression = compression
+        self.centroids = [list(c) for c in centroids]   # sorted [mean, weight]
+        self.buffer = list(buffer)
+        self.min, self.max = min, max
+
+    @classmethod
+    def from_dict(cls, data, compression=100):
+        return cls(data.get('compression', compression), data.get('c', ()), data.get('b', ()),
+                   data.get('min'), data.get('max'))
+
+    def to_dict(self):
+        return {'compression': self.compression, 'min': self.min, 'max': self.max, 'b': self.buffer,
+                'c': [[round(m, 6), w] for m, w in self.centroids]}
+
+    @property
+    def count(self):
+        return sum(w for _, w in self.centroids) + len(self.buffer)
+
+    def add(self, value):
+        value = float(value)
+        self.buffer.append(value)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self.buffer) >= _BUFFER_SIZE:
+            self.compress()
+
+    def _k(self, q):
+        # Scale function k1: centroids near q=0 and q=1 stay small
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def compress(self):
+        if not self.buffer:
+            return
+        points = sorted(self.centroids + [[x, 1] for x in self.buffer])
+        self.buffer = []
+        total = sum(w for _, w in points)
+        merged, left = [], 0
+        mean, weight = points[0]
+        for m, w in points[1:]:
+            if self._k((left + weight + w) / total) - self._k(left / total) <= 1:
+                weight += w
+                mean += (m - mean) * w / weight
+            else:
+                merged.append([mean, weight])
+                left += weight
+                mean, weight = m, w
+        merged.append([mean, weight])
+        self.centroids = merged
+
+    def _knots(self):
+        """
+        (cumulative weight, value) points between which ranks are interpolated:
+        each centroid's mean sits at the middle of its weight.
+        """
+        self.compress()
+        knots, seen = [(0.0, self.min)], 0
+        for mean, weight in self.centroids:
+            knots.append((seen + weight / 2, mean))
+            seen += weight
+        knots.append((float(seen), self.max))
+        return knots, seen
+
+    def cdf(self, value):
+        """
+        Fraction of the added values below `value` (None when empty).
+        """
+        knots, total = self._knots()
+        if not total:
+            return None
+        if value <= self.min:
+            return 0.0
+        if value >= self.max:
+            return 1.0
+        values = [v for _, v in knots]
+        i = bisect.bisect_right(values, value)
+        (p0, v0), (p1, v1) = knots[i - 1], knots[i]
+        return (p0 + (p1 - p0) * (value - v0) / (v1 - v0 if v1 > v0 else 1)) / total
+
+    def quantile(self, q):
+        knots, total = self._knots()
+        if not total:
+            return None
+        target = min(max(q, 0.0), 1.0) * total
+        positions = [p for p, _ in knots]
+        i = min(max(bisect.bisect_left(positions, target), 1), len(knots) - 1)
+        (p0, v0), (p1, v1) = knots[i - 1], knots[i]
+        return v0 + (v1 - v0) * ((target - p0) / (p1 - p0) if p1 > p0 else 0)
+
+def _group(profile):
+    return {'role': profile.preferred_role, 'difficulty': profile.difficulty, 'category': profile.category}
+
+def lock():
+    """
+    Serialises sketch updates with rebuild(). Call it inside the transaction
+    that saves an analysis, before saving it: a rebuild then sees either
+    both the analysis and its record() or neither.
+    """
+    Watermark.objects.select_for_update().get_or_create(name=_REBUILT, defaults={'value': timezone.now()})
+
+def record(analysis, profile):
+    """
+    Adds one new analysis to its peer group's sketches. Rows are locked in
+    metric order so concurrent workers serialise instead of deadlocking.
+    Only first analyses are recorded: a re-analysis changes values the
+    sketch cannot take back, so `reanalyze` rebuilds the sketches instead.
+    """
+    if profile is None:
+        return
+    compression = getattr(settings, 'SCORE_SKETCH_COMPRESSION', 100)
+    with transaction.atomic():
+        for metric in sorted(METRICS):
+            value = getattr(analysis, METRICS[metric])
+            if value is None:
+                continue
+            sketch, _ = ScoreSketch.objects.select_for_update().get_or_create(metric=metric, **_group(profile))
+            digest = TDigest.from_dict(sketch.digest, compression)
+            digest.add(value)
+            sketch.digest = digest.to_dict()
+            sketch.count += 1
+            sketch.save(update_fields=['digest', 'count', 'updated_at'])
+
+def _add_rows(digests, analyses, compression):
+    prefix = 'answer__question__session__user__profile__'
+    rows = analyses.filter(**{f'{prefix}isnull': False}).values_list(
+        f'{prefix}preferred_role', f'{prefix}difficulty', f'{prefix}category', *METRICS.values())
+    for role, difficulty, category, *values in rows.iterator(chunk_size=5000):
+        for metric, value in zip(METRICS, values):
+            if value is not None:
+                digests.setdefault((role, difficulty, category, metric), TDigest(compression)).add(value)
+
+def rebuild():
+    """
+    Recomputes every sketch from the AnswerAnalysis table; returns the number
+    of sketches. The table is read without locks; analyses saved meanwhile
+    are added under lock() right before the sketches are swapped, so no
+    concurrent record() is lost or counted twice.
+    """
+    compression = getattr(settings, 'SCORE_SKETCH_COMPRESSION', 100)
+    started = timezone.now()
+    digests = {}
+    _add_rows(digests, AnswerAnalysis.objects.filter(updated_at__lt=started), compression)
+    with transaction.atomic():
+        lock()
+        _add_rows(digests, AnswerAnalysis.objects.filter(updated_at__gte=started), compression)
+        sketches = []
+        for (role, difficulty, category, metric), digest in digests.items():
+            digest.compress()
+            sketches.append(ScoreSketch(role=role, difficulty=difficulty, category=category, metric=metric,
+                                        count=digest.count, digest=digest.to_dict()))
+        ScoreSketch.objects.all().delete()
+        ScoreSketch.objects.bulk_create(sketches)
+        Watermark.objects.filter(name=_REBUILT).update(value=started)
+    return len(digests)
+
+def peer_digests(profile):
+    """
+    {metric: TDigest} of the profile's peer group, for metrics with at
+    least SCORE_BENCHMARK_MIN_SAMPLES values. One indexed query.
+    """
+    if profile is None:
+        return {}
+    minimum = getattr(settings, 'SCORE_BENCHMARK_MIN_SAMPLES', 50)
+    sketches = ScoreSketch.objects.filter(count__gte=minimum, **_group(profile))
+    return {s.metric: TDigest.from_dict(s.digest) for s in sketches}
+
+def percentile_ranks(digests, values):
+    """
+    Percentile rank (0-100) of each metric value among peers; None without peer data.
+    """
+    ranks = {}
+    for metric, value in values.items():
+        digest = digests.get(metric)
+        rank = digest.cdf(value) if digest is not None and value is not None else None
+        ranks[metric] = round(rank * 100, 1) if rank is not None else None
+    return ranks
@@ -0,0 +1,87 @@
+import re
+import logging
+from django.conf import settings
+from . import metrics
+
+logger = logging.getLogger('func.prompting')
+
+_TIMESTAMP = re.compile(r"^\s*\[\d+(?:\.\d+)?\s*-\s*\d+(?:\.\d+)?\]\s*")
+
+def count_tokens(tokenizer, text):
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+def fit_text(tokenizer, text, budget, stage=None):
+    """
+    Cuts `text` to `budget` tokens, keeping the beginning and the end
+    (two thirds / one third) around a "[...]" marker.
+    """
+    ids = tokenizer.encode(text, add_special_tokens=False)
+    if len(ids) <= budget:
+        return text
+    if stage:
+        metrics.record_truncation(stage)
+    head = (budget * 2) // 3
+    tail = budget - head
+    return (tokenizer.decode(ids[:head]).rstrip() + " [...] "
+            + tokenizer.decode(ids[len(ids) - tail:]).lstrip())
+
+def fit_items(tokenizer, items, budget, stage=None):
+    """
+    Comma-joins list items until `budget` tokens are used; the rest is
+    summarised as "(+N more)".
+    """
+    if isinstance(items, str):
+        items = [items]
+    kept, used = [], 0
+    for i, item in enumerate(items):
+        cost = count_tokens(tokenizer, item) + 1   # the separator
+        if used + cost > budget:
+            if stage:
+                metrics.record_truncation(stage)
+            if not kept:
+                return fit_text(tokenizer, item, budget)
+            return ", ".join(kept) + f" (+{len(items) - i} more)"
+        kept.append(item)
+        used += cost
+    return ", ".join(kept)
+
+def strip_timestamps(segments):
+    """
+    Answer text without the "[start - end]" prefixes the model does not need.
+    """
+    return " ".join(_TIMESTAMP.sub("", s).strip() for s in segments if s.strip())
+
+def bucket_length(n_tokens):
+    """
+    Smallest PROMPT_LENGTH_BUCKETS bound holding `n_tokens` (or `n_tokens`
+    itself past the largest), so padded batches reuse a few shapes.
+    """
+    for bound in getattr(settings, 'PROMPT_LENGTH_BUCKETS', ()):
+        if n_tokens <= bound:
+            return bound
+    return n_tokens
+
+def record_prompt(stage, n_tokens):
+    """
+    Prompt length statistics per stage, exported with the pipeline metrics.
+    """
+    metrics.observe(stage, n_tokens, name='pipeline_prompt_tokens')
+
+def load_assistant(draft_id, tokenizer):
+    """
+    Loads the draft model `draft_id` for assisted generation with a target
+    model using `tokenizer`. Returns generate() kwargs with the draft, or {}
+    when its vocabulary differs: only same-vocabulary drafts keep sampled
+    output distributed as without one (speculative sampling), universal
+    assisted decoding across tokenizers does not.
+    """
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    if AutoTokenizer.from_pretrained(draft_id).get_vocab() != tokenizer.get_vocab():
+        logger.warning("Assisted generation off: draft %s does not share the target's vocabulary", draft_id)
+        return {}
+    return {"assistant_model": AutoModelForCausalLM.from_pretrained(
+        draft_id,
+        device_map="auto",
+        torch_dtype=torch.float16
+    )}
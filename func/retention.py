@@ -0,0 +1,225 @@
+import logging
+import os
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import uuid
+from datetime import timedelta
+from itertools import groupby
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models import Max
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+from .locks import acquire, release
+from .models import Answer, RetentionRun
+from .storage import is_local, local_copy
+from .transcriber import pcm_cache_path
+
+logger = logging.getLogger('func.retention')
+
+ARCHIVE_PREFIX = 'archives/answers/'
+_LOCK_KEY = 'retention:lock'
+
+def _size(name):
+    return default_storage.size(name) if default_storage.exists(name) else 0
+
+def _drop_local_files(name):
+    """
+    Removes what was derived from a stored file on this node: the decoded
+    PCM cache and, with remote storage, the scratch copy. Returns bytes freed.
+    """
+    if is_local():
+        paths = [pcm_cache_path(default_storage.path(name))]
+    else:
+        scratch = os.path.join(settings.MEDIA_SCRATCH_DIR, name)
+        paths = [scratch, pcm_cache_path(scratch)]
+    freed = 0
+    for path in paths:
+        try:
+            freed += os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return freed
+
+def _delete(name):
+    size = _size(name)
+    default_storage.delete(name)
+    return size + _drop_local_files(name)
+
+def _stored(tiers):
+    """
+    Answers with a loose recording file in one of `tiers`.
+    """
+    return Answer.objects.filter(audio_tier__in=tiers).exclude(audio_file__isnull=True).exclude(audio_file='')
+
+def _analysed(tiers):
+    """
+    Answers whose recording is in one of `tiers` and is no longer needed by
+    the pipeline: transcribed and analysed.
+    """
+    return _stored(tiers).filter(analysis__isnull=False)
+
+def transcode(answer):
+    """
+    Re-encodes a recording as low-bitrate mono Opus and deletes the
+    original. A file that would not shrink (already compressed) is kept.
+    Returns the bytes reclaimed.
+    """
+    old = answer.audio_file.name
+    src = local_copy(answer.audio_file)
+    fd, out = tempfile.mkstemp(suffix='.opus')
+    os.close(fd)
+    try:
+        subprocess.run(
+            ['ffmpeg', '-nostdin', '-loglevel', 'error', '-y', '-i', src, '-vn', '-ac', '1',
+             '-c:a', 'libopus', '-b:a', getattr(settings, 'RETENTION_OPUS_BITRATE', '24k'),
+             '-application', 'voip', out],
+            check=True, capture_output=True,
+        )
+        if os.path.getsize(out) >= os.path.getsize(src):
+            Answer.objects.filter(pk=answer.pk).update(audio_tier='opus')
+            return 0
+        with open(out, 'rb') as fh:
+            new = default_storage.save(os.path.splitext(old)[0] + '.opus', File(fh))
+    finally:
+        os.remove(out)
+    # Swap only if the answer still points at the file that was encoded
+    if not Answer.objects.filter(pk=answer.pk, audio_file=old).update(audio_file=new, audio_tier='opus'):
+        default_storage.delete(new)
+        return 0
+    return _delete(old) - _size(new)
+
+def archive(answers, day):
+    """
+    Moves the recordings of one day into a single tar.gz bundle in storage
+    (members named "<answer id><ext>") and deletes the loose files.
+    Returns the bytes reclaimed.
+    """
+    bundle = f"{ARCHIVE_PREFIX}{day:%Y/%m/%d}-{uuid.uuid4().hex[:8]}.tar.gz"
+    fd, tmp = tempfile.mkstemp(suffix='.tar.gz')
+    os.close(fd)
+    try:
+        with tarfile.open(tmp, 'w:gz') as tar:
+            for answer in answers:
+                ext = os.path.splitext(answer.audio_file.name)[1]
+                tar.add(local_copy(answer.audio_file), arcname=f"{answer.id}{ext}")
+        with open(tmp, 'rb') as fh:
+            bundle = default_storage.save(bundle, File(fh))
+    finally:
+        os.remove(tmp)
+    reclaimed = -_size(bundle)
+    for answer in answers:
+        old = answer.audio_file.name
+        if Answer.objects.filter(pk=answer.pk, audio_file=old).update(
+                audio_file=None, audio_tier='archived', audio_archive=bundle):
+            reclaimed += _delete(old)
+    return reclaimed
+
+def recording_path(answer):
+    """
+    A local path of the answer's recording, extracted from its bundle into
+    MEDIA_SCRATCH_DIR when archived; None once purged or if the bundle
+    lacks it.
+    """
+    if answer.audio_tier != 'archived':
+        return local_copy(answer.audio_file) if answer.audio_file else None
+    bundle = FieldFile(answer, Answer._meta.get_field('audio_file'), answer.audio_archive)
+    with tarfile.open(local_copy(bundle), 'r:gz') as tar:
+        member = next((m for m in tar.getmembers() if os.path.splitext(m.name)[0] == str(answer.id)), None)
+        if member is None:
+            logger.error("Bundle %s has no recording of answer %s", answer.audio_archive, answer.pk)
+            return None
+        path = os.path.join(settings.MEDIA_SCRATCH_DIR, 'restored', member.name)
+        if os.path.exists(path):
+            os.utime(path)  # most recently used
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        part = f"{path}.{os.getpid()}.part"
+        with tar.extractfile(member) as src, open(part, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        os.replace(part, path)
+    return path
+
+def purge(cutoff, limit):
+    """
+    Deletes the recordings of answers given before `cutoff`: whole bundles
+    once their newest answer is past it, then loose files, analysed or not
+    (an upload that never got through the pipeline is not kept forever).
+    Transcripts, segments and analyses stay. Returns (answers purged,
+    bytes reclaimed).
+    """
+    purged = reclaimed = 0
+    bundles = list(
+        Answer.objects.filter(audio_tier='archived').values('audio_archive')
+        .annotate(newest=Max('responded_at')).filter(newest__lt=cutoff)
+        .values_list('audio_archive', flat=True)[:limit]
+    )
+    for bundle in bundles:
+        reclaimed += _delete(bundle)
+        purged += Answer.objects.filter(audio_archive=bundle).update(audio_tier='purged', audio_archive='')
+    for answer in _stored(['raw', 'opus']).filter(responded_at__lt=cutoff).only('id', 'audio_file')[:limit]:
+        name = answer.audio_file.name
+        if Answer.objects.filter(pk=answer.pk, audio_file=name).update(audio_file=None, audio_tier='purged'):
+            reclaimed += _delete(name)
+            purged += 1
+    return purged, reclaimed
+
+def run(now=None):
+    """
+    One retention pass (Celery beat), each step capped at
+    RETENTION_BATCH_SIZE answers: transcode analysed recordings to Opus,
+    archive old ones into daily bundles, purge expired ones. A failed
+    answer is logged and retried on the next pass. Returns the
+    RetentionRun, or None while another pass holds the lock.
+    """
+    token = acquire(_LOCK_KEY, getattr(settings, 'RETENTION_LOCK_SECONDS', 3600), blocking=False)
+    if token is None:
+        return None
+    try:
+        return _run(now or timezone.now())
+    finally:
+        release(_LOCK_KEY, token)
+
+def _run(now):
+    limit = getattr(settings, 'RETENTION_BATCH_SIZE', 500)
+    transcode_days = getattr(settings, 'RETENTION_TRANSCODE_AFTER_DAYS', 1)
+    archive_days = getattr(settings, 'RETENTION_ARCHIVE_AFTER_DAYS', 90)
+    purge_days = getattr(settings, 'RETENTION_PURGE_AFTER_DAYS', None)
+    record = RetentionRun.objects.create()
+
+    if transcode_days is not None:
+        due = _analysed(['raw']).filter(responded_at__lt=now - timedelta(days=transcode_days))
+        for answer in due.order_by('responded_at')[:limit]:
+            try:
+                record.bytes_reclaimed += transcode(answer)
+                record.transcoded += 1
+            except Exception:
+                logger.exception("Transcoding the recording of answer %s failed", answer.pk)
+                record.failed += 1
+
+    if archive_days is not None:
+        due = _analysed(['raw', 'opus']).filter(responded_at__lt=now - timedelta(days=archive_days))
+        answers = list(due.order_by('responded_at')[:limit])
+        for day, group in groupby(answers, key=lambda a: timezone.localdate(a.responded_at)):
+            group = list(group)
+            try:
+                record.bytes_reclaimed += archive(group, day)
+                record.archived += len(group)
+            except Exception:
+                logger.exception("Archiving %d recordings of %s failed", len(group), day)
+                record.failed += len(group)
+
+    if purge_days is not None:
+        purged, reclaimed = purge(now - timedelta(days=purge_days), limit)
+        record.purged += purged
+        record.bytes_reclaimed += reclaimed
+
+    record.finished_at = timezone.now()
+    record.save()
+    logger.info("Retention: %d transcoded, %d archived, %d purged, %d failed, %d bytes reclaimed",
+                record.transcoded, record.archived, record.purged, record.failed, record.bytes_reclaimed)
+    return record
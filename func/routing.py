@@ -0,0 +1,59 @@
+import contextvars
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+
+REPLICA = 'replica'
+_PIN_KEY = 'db:pin:{}'   # user id -> recently wrote; read from the primary
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+class ReplicaRouter:
+    """
+    Reads go to the replica only inside reads_from_replica(); everything
+    else, all writes and all migrations use the primary (`default`).
+    """
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_configured():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True   # same data on both aliases
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == 'default'
+
+def use_replica():
+    """
+    Routes reads of the current context to the replica; returns the token for release().
+    """
+    return _use_replica.set(True)
+
+def release(token):
+    _use_replica.reset(token)
+
+@contextmanager
+def reads_from_replica():
+    token = use_replica()
+    try:
+        yield
+    finally:
+        release(token)
+
+def pin_primary(user_id):
+    """
+    Read-your-writes: the user's reads stay on the primary for
+    REPLICA_PIN_SECONDS, longer than the replica is expected to lag.
+    """
+    if user_id is not None:
+        cache.set(_PIN_KEY.format(user_id), 1, timeout=getattr(settings, 'REPLICA_PIN_SECONDS', 10))
+
+def is_pinned(user_id):
+    return user_id is not None and cache.get(_PIN_KEY.format(user_id)) is not None
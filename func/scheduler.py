@@ -0,0 +1,126 @@
+import math
+from celery.utils import uuid as task_uuid
+from django.conf import settings
+from django.core.cache import cache
+
+# Priority classes. Redis priorities run 0 (first) .. 9 (last); each class
+# owns a queue and a band of priorities that per-user fairness moves within.
+INTERACTIVE = 'interactive'
+BULK        = 'bulk'
+CLASSES = {
+    INTERACTIVE: {'queue': 'celery', 'priority': 0, 'max_priority': 4},
+    BULK:        {'queue': 'bulk',   'priority': 5, 'max_priority': 9},
+}
+
+_TASK_KEY     = 'sched:task:{}'           # task id -> (class, user id)
+_PENDING_KEY  = 'sched:pending:{}:{}'     # (class, user id) -> queued or running tasks
+_SERVICE_KEY  = 'sched:service:{}'        # class -> EWMA task duration in seconds
+_DEPTH_KEY    = 'sched:depth:{}'          # queue -> cached broker message count
+_RUNNING_KEY  = 'sched:running:{}'        # class -> tasks currently executing
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+def _incr(key, delta=1):
+    """
+    Counter update. Counters expire SCHEDULER_COUNTER_TTL_SECONDS after the
+    last change, so counts left behind by a killed or recycled worker (its
+    task_postrun never ran) heal on their own instead of sticking forever.
+    """
+    ttl = _setting('SCHEDULER_COUNTER_TTL_SECONDS', 3600)
+    try:
+        value = cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, timeout=ttl)
+        value = cache.incr(key, delta)
+    if value < 0:   # decremented after the counter expired
+        cache.set(key, 0, timeout=ttl)
+        return 0
+    cache.touch(key, ttl)
+    return value
+
+def dispatch(task, args=(), kwargs=None, user_id=None, klass=INTERACTIVE):
+    """
+    Queues a task in its priority class. A user with more work pending than
+    SCHEDULER_FAIR_SHARE gets each extra task one step later in the class
+    band, so a single heavy user cannot starve everyone else.
+    """
+    spec = CLASSES[klass]
+    priority = spec['priority']
+    if user_id is not None:
+        pending = _incr(_PENDING_KEY.format(klass, user_id))
+        excess = max(pending - _setting('SCHEDULER_FAIR_SHARE', 2), 0)
+        priority = min(priority + excess, spec['max_priority'])
+    # Registered before queueing so even an eager or instant run finds it
+    task_id = task_uuid()
+    cache.set(_TASK_KEY.format(task_id), (klass, user_id), timeout=86400)
+    return task.apply_async(args=args, kwargs=kwargs or {}, queue=spec['queue'],
+                            priority=priority, task_id=task_id)
+
+def task_started(task_id):
+    entry = cache.get(_TASK_KEY.format(task_id))
+    if entry:
+        _incr(_RUNNING_KEY.format(entry[0]))
+
+def task_finished(task_id, duration):
+    """
+    Updates the per-class service time and releases the user's pending slot.
+    """
+    key = _TASK_KEY.format(task_id)
+    entry = cache.get(key)
+    if not entry:
+        return
+    klass, user_id = entry
+    _incr(_RUNNING_KEY.format(klass), -1)
+    if user_id is not None:
+        _incr(_PENDING_KEY.format(klass, user_id), -1)
+    alpha = 0.2
+    previous = cache.get(_SERVICE_KEY.format(klass))
+    ewma = duration if previous is None else alpha * duration + (1 - alpha) * previous
+    cache.set(_SERVICE_KEY.format(klass), ewma, timeout=None)
+    cache.delete(key)
+
+def queue_depth(queue):
+    """
+    Messages waiting in a broker queue, cached briefly to keep admission cheap.
+    """
+    key = _DEPTH_KEY.format(queue)
+    depth = cache.get(key)
+    if depth is None:
+        from smartinterviewer_ai.celery import app
+        if app.conf.task_always_eager:
+            return 0  # tasks run inline, nothing ever queues
+        try:
+            with app.connection_for_read() as conn:
+                depth = conn.default_channel.queue_declare(queue=queue, passive=True).message_count
+        except Exception:
+            depth = 0  # queue not declared yet
+        cache.set(key, depth, timeout=_setting('SCHEDULER_DEPTH_CACHE_SECONDS', 2))
+    return depth
+
+def estimated_wait(klass=INTERACTIVE):
+    """
+    Seconds a task submitted now is expected to wait before it starts.
+    Interactive work only queues behind interactive work; bulk work waits
+    for everything ahead of it.
+    """
+    slots = max(_setting('SCHEDULER_WORKER_SLOTS', 1), 1)
+    service = cache.get(_SERVICE_KEY.format(klass)) or _setting('SCHEDULER_DEFAULT_SERVICE_SECONDS', 30)
+    ahead = queue_depth(CLASSES[klass]['queue'])
+    if klass == BULK:
+        ahead += queue_depth(CLASSES[INTERACTIVE]['queue'])
+    running = sum(max(cache.get(_RUNNING_KEY.format(k)) or 0, 0) for k in CLASSES)
+    if running >= slots:
+        ahead += 0.5  # on average a running task is half done
+    return round(ahead * service / slots, 1)
+
+def admit():
+    """
+    Admission control for new sessions. Returns (admitted, estimated_wait);
+    callers reject with Retry-After when not admitted.
+    """
+    wait = estimated_wait(INTERACTIVE)
+    return wait <= _setting('SCHEDULER_INTERACTIVE_SLO_SECONDS', 60), wait
+
+def retry_after(wait):
+    return max(int(math.ceil(wait - _setting('SCHEDULER_INTERACTIVE_SLO_SECONDS', 60))), 5)
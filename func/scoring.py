@@ -0,0 +1,160 @@
+import hashlib
+import re
+from collections import OrderedDict
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+# Baseline requirement sets per Profile.ROLES key; a job description adds to these
+ROLE_REQUIREMENTS = {
+    'SDE':    ["data structures and algorithms", "Python", "Java", "REST APIs", "SQL databases",
+               "version control with Git", "system design", "unit testing"],
+    'QA':     ["test automation", "Selenium", "manual testing", "bug tracking", "regression testing",
+               "API testing", "test planning"],
+    'PM':     ["project planning", "agile and scrum", "stakeholder management", "product roadmaps",
+               "risk management", "budgeting"],
+    'HR':     ["recruitment", "employee relations", "onboarding", "payroll", "HR policies",
+               "talent acquisition"],
+    'UI/UX':  ["Figma", "user research", "wireframing", "prototyping", "usability testing",
+               "design systems"],
+    'DevOps': ["Docker", "Kubernetes", "CI/CD pipelines", "AWS", "infrastructure as code",
+               "monitoring and alerting", "Linux administration"],
+}
+
+# Initializing identifiers for lazy load
+_embedder_id   = getattr(settings, 'FIT_EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+_embedder      = None
+_local_vectors = OrderedDict()   # text -> unit vector, per process (LRU)
+
+def _load_embedder():
+    """
+    Lazily load the sentence-embedding model on first use.
+    """
+    global _embedder
+    if _embedder is None:
+        from sentence_transformers import SentenceTransformer
+        _embedder = SentenceTransformer(_embedder_id, device='cpu')
+    return _embedder
+
+def _cache_key(text):
+    digest = hashlib.sha1(f"{_embedder_id}|{text}".encode()).hexdigest()
+    return f"fit-emb:{digest}"
+
+def embed_texts(texts):
+    """
+    Unit-normalised embeddings for `texts`, shape (len(texts), dim).
+    Looks in the process-local store, then the shared cache, and encodes
+    only what is missing in a single batch.
+    """
+    unique = list(dict.fromkeys(texts))
+    for text in unique:
+        if text in _local_vectors:
+            _local_vectors.move_to_end(text)
+    missing = [t for t in unique if t not in _local_vectors]
+    if missing:
+        cached = cache.get_many([_cache_key(t) for t in missing])
+        for text in missing:
+            blob = cached.get(_cache_key(text))
+            if blob is not None:
+                _local_vectors[text] = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+        to_encode = [t for t in missing if t not in _local_vectors]
+        if to_encode:
+            vectors = _load_embedder().encode(to_encode, batch_size=64, normalize_embeddings=True)
+            timeout = getattr(settings, 'FIT_EMBEDDING_CACHE_TIMEOUT', 30 * 86400)
+            cache.set_many(
+                {_cache_key(t): v.astype(np.float16).tobytes() for t, v in zip(to_encode, vectors)},
+                timeout=timeout,
+            )
+            for text, vector in zip(to_encode, vectors):
+                _local_vectors[text] = np.asarray(vector, dtype=np.float32)
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    stacked = np.stack([_local_vectors[t] for t in texts])
+    # Bounded after stacking, so this call's own texts are never evicted mid-way
+    limit = getattr(settings, 'FIT_EMBEDDING_LOCAL_CACHE_SIZE', 50000)
+    while len(_local_vectors) > limit:
+        _local_vectors.popitem(last=False)
+    return stacked
+
+def resume_items(parsed_data):
+    """
+    Skill and experience phrases of a parsed resume used for matching.
+    """
+    if not parsed_data or 'error' in parsed_data:
+        return []
+    items = []
+    for key in ("skills", "role", "experience"):
+        value = parsed_data.get(key) or []
+        if isinstance(value, str):
+            value = value.split(",")
+        items.extend(v.strip() for v in value if v.strip())
+    return list(dict.fromkeys(items))
+
+def role_requirements(role, job_description=None):
+    """
+    Requirement phrases for a role, extended with short phrases from a job description.
+    """
+    requirements = list(ROLE_REQUIREMENTS.get(role, []))
+    if job_description:
+        for phrase in re.split(r"[\n,;•]|\.\s", job_description):
+            phrase = phrase.strip(" -*\t.")
+            if 2 <= len(phrase) <= 80:
+                requirements.append(phrase)
+    return list(dict.fromkeys(requirements))
+
+def score_pool(candidate_items, requirements):
+    """
+    Fit scores for a pool of candidates in one matrix product.
+
+    `candidate_items` is a list (one entry per candidate) of phrase lists.
+    Returns (scores, best, sims, spans): scores has one value per candidate
+    in [0, 1], best[r, c] is candidate c's best similarity for requirement r,
+    sims is the requirement x phrase matrix and spans[c] the (start, end)
+    columns holding candidate c's phrases.
+    """
+    n = len(candidate_items)
+    flat, spans = [], []
+    for items in candidate_items:
+        spans.append((len(flat), len(flat) + len(items)))
+        flat.extend(items)
+    scores = np.zeros(n, dtype=np.float32)
+    best = np.zeros((len(requirements), n), dtype=np.float32)
+    if not flat or not requirements:
+        return scores, best, np.zeros((len(requirements), 0), dtype=np.float32), spans
+
+    sims = embed_texts(requirements) @ embed_texts(flat).T   # (requirements, phrases)
+    present = np.array([c for c, (lo, hi) in enumerate(spans) if hi > lo])
+    starts = np.array([spans[c][0] for c in present])
+    best[:, present] = np.maximum.reduceat(sims, starts, axis=1)
+    scores = np.clip(best, 0, 1).mean(axis=0)
+    return scores, best, sims, spans
+
+def rank_resumes(resumes, role, job_description=None, limit=50):
+    """
+    Ranks resumes by fit for a role. Returns explainable result dicts, best first.
+    """
+    requirements = role_requirements(role, job_description)
+    candidate_items = [resume_items(r.parsed_data) for r in resumes]
+    scores, best, sims, spans = score_pool(candidate_items, requirements)
+
+    order = np.argsort(-scores, kind='stable')[:limit]
+    ranked = []
+    for c in order:
+        resume = resumes[c]
+        lo, hi = spans[c]
+        matches = []
+        if hi > lo:
+            # Explanations only for the returned candidates
+            for r, req in enumerate(requirements):
+                matched = candidate_items[c][int(sims[r, lo:hi].argmax())]
+                matches.append({"requirement": req, "matched": matched,
+                                "similarity": round(float(best[r, c]), 3)})
+            matches.sort(key=lambda m: m["similarity"], reverse=True)
+        ranked.append({
+            "resume_id": resume.id,
+            "user_id":   resume.user_id,
+            "username":  resume.user.username,
+            "score":     round(float(scores[c]), 4),
+            "top_matches": matches[:5],
+        })
+    return ranked
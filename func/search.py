@@ -0,0 +1,162 @@
+import math
+import re
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from .models import Answer, Question, SearchPosting
+
+# BM25 parameters; document lengths are normalised against a typical length per kind
+_K1 = 1.2
+_B = 0.75
+_TYPICAL_TERMS = {'answer': 120, 'question': 12}
+
+_STATS_KEY = 'search:stats:{}:{}'   # (kind, term or '*') -> document frequency / count
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further
+had has have having he her here hers herself him himself his how i if in into is it its itself
+just me more most my myself no nor not now of off on once only or other our ours ourselves out
+over own same she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up uh um very was we were what when where
+which while who whom why will with would you your yours yourself yourselves like yeah okay
+""".split())
+
+def tokenize(text):
+    """
+    Index terms of a text: lowercased words and numbers (keeping c++, c#),
+    without stopwords and one-letter tokens.
+    """
+    words = re.findall(r"[a-z0-9][a-z0-9+#]*", (text or "").lower())
+    return [w[:40] for w in words if len(w) > 1 and w not in STOPWORDS]
+
+def _postings(kind, object_id, text, role, created_at):
+    counts = Counter(tokenize(text))
+    length = sum(counts.values())
+    norm = _K1 * (1 - _B + _B * length / _TYPICAL_TERMS[kind])
+    return [
+        SearchPosting(term=term, kind=kind, object_id=object_id, role=role or '', created_at=created_at,
+                      weight=round(tf * (_K1 + 1) / (tf + norm), 4))
+        for term, tf in counts.items()
+    ]
+
+def _role_of(session):
+    profile = getattr(session.user, 'profile', None)
+    return profile.preferred_role if profile else ''
+
+def index_answer(answer):
+    """
+    (Re)indexes one answer's transcript; an empty transcript just clears it.
+    """
+    with transaction.atomic():
+        SearchPosting.objects.filter(kind='answer', object_id=answer.id).delete()
+        if answer.transcript:
+            SearchPosting.objects.bulk_create(_postings(
+                'answer', answer.id, answer.transcript, _role_of(answer.question.session), answer.responded_at))
+
+def index_question(question):
+    with transaction.atomic():
+        SearchPosting.objects.filter(kind='question', object_id=question.id).delete()
+        SearchPosting.objects.bulk_create(_postings(
+            'question', question.id, question.text, _role_of(question.session), question.created_at))
+
+def _indexed(kind):
+    """
+    The objects of `kind` that have postings: answers only once transcribed.
+    """
+    if kind == 'answer':
+        return Answer.objects.exclude(transcript__isnull=True).exclude(transcript='')
+    return Question.objects.all()
+
+def rebuild(kind, batch_size=1000, since=None):
+    """
+    Indexes every answer or question (from `since` on) in batches; returns the count.
+    """
+    qs = _indexed(kind)
+    text, stamp = ('transcript', 'responded_at') if kind == 'answer' else ('text', 'created_at')
+    if since is not None:
+        qs = qs.filter(**{f'{stamp}__gte': since})
+    prefix = 'question__session__user__profile' if kind == 'answer' else 'session__user__profile'
+    rows = qs.order_by('pk').values_list('pk', text, stamp, f'{prefix}__preferred_role')
+    done, last = 0, None
+    while True:
+        batch = list((rows.filter(pk__gt=last) if last else rows)[:batch_size])
+        if not batch:
+            return done
+        ids = [row[0] for row in batch]
+        with transaction.atomic():
+            SearchPosting.objects.filter(kind=kind, object_id__in=ids).delete()
+            SearchPosting.objects.bulk_create(
+                [p for pk, body, at, role in batch for p in _postings(kind, pk, body, role, at)],
+                batch_size=5000,
+            )
+        done += len(batch)
+        last = ids[-1]
+
+def _document_count(kind):
+    key = _STATS_KEY.format(kind, '*')
+    n = cache.get(key)
+    if n is None:
+        n = _indexed(kind).count()   # BM25's N: untranscribed answers would inflate every idf
+        cache.set(key, n, timeout=getattr(settings, 'SEARCH_STATS_CACHE_SECONDS', 600))
+    return n
+
+def _document_frequencies(kind, terms):
+    keys = {t: _STATS_KEY.format(kind, t) for t in terms}
+    cached = cache.get_many(list(keys.values()))
+    freqs = {t: cached[k] for t, k in keys.items() if k in cached}
+    missing = [t for t in terms if t not in freqs]
+    if missing:
+        counted = dict(
+            SearchPosting.objects.filter(kind=kind, term__in=missing)
+            .values('term').annotate(n=Count('id')).values_list('term', 'n')
+        )
+        fresh = {t: counted.get(t, 0) for t in missing}
+        cache.set_many({keys[t]: n for t, n in fresh.items()},
+                       timeout=getattr(settings, 'SEARCH_STATS_CACHE_SECONDS', 600))
+        freqs.update(fresh)
+    return freqs
+
+def search(query, kind='answer', role=None, since=None, until=None, limit=20):
+    """
+    Ranked (BM25) search over the postings. Terms found in more than
+    SEARCH_MAX_DF_RATIO of documents are skipped when rarer terms are
+    present, so common words never force a scan of a huge posting list.
+    Returns [(object_id, score)], best first.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+    n = max(_document_count(kind), 1)
+    df = _document_frequencies(kind, terms)
+    terms = [t for t in terms if df[t]]
+    selective = [t for t in terms if df[t] <= n * getattr(settings, 'SEARCH_MAX_DF_RATIO', 0.2)]
+    terms = selective or terms
+    if not terms:
+        return []
+    idf = {t: math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5)) for t in terms}
+
+    postings = SearchPosting.objects.filter(kind=kind, term__in=terms)
+    if role:
+        postings = postings.filter(role=role)
+    if since:
+        postings = postings.filter(created_at__gte=since)
+    if until:
+        postings = postings.filter(created_at__lt=until)
+    score = Sum(Case(*[When(term=t, then=F('weight') * Value(idf[t])) for t in terms],
+                     output_field=FloatField()))
+    ranked = postings.values('object_id').annotate(score=score).order_by('-score')[:limit]
+    return [(row['object_id'], round(row['score'], 4)) for row in ranked]
+
+def snippet(text, query, width=160):
+    """
+    About `width` characters of `text` around the first query term it contains.
+    """
+    text = text or ""
+    lowered = text.lower()
+    hits = [i for i in (lowered.find(t) for t in tokenize(query)) if i >= 0]
+    start = max(min(hits) - width // 3, 0) if hits else 0
+    piece = text[start:start + width].strip()
+    return ("..." if start else "") + piece + ("..." if start + width < len(text) else "")
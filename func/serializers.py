@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Resume, InterviewSession, Question, Answer, AnswerAnalysis, Notification
+from .storage import claim_upload
+from .models import Profile, Resume, InterviewSession, Question, Answer, AnswerAnalysis, Notification, DailyRollup
 
 User = get_user_model()
 
@@ -11,23 +12,41 @@ class UserSerializer(serializers.ModelSerializer):
         fields=['id', 'username', 'email', 'preferred_role']
         read_only_fields= ['id', 'username', 'email']
 
+def _claimed(attrs, serializer, kind, file_field, key_field):
+    # A presigned upload's key stands in for the multipart file
+    key = attrs.pop(key_field, None)
+    if key:
+        claimed = claim_upload(kind, serializer.context['request'].user.id, key)
+        if claimed is None:
+            raise serializers.ValidationError({key_field: 'No such upload.'})
+        attrs[file_field] = claimed
+    return attrs
+
 class ResumeSerializer(serializers.ModelSerializer):
+    skills = serializers.SlugRelatedField(slug_field='name', many=True, read_only=True)
+    resume_key = serializers.CharField(write_only=True, required=False)
     class Meta:
         model= Resume
-        fields= ['id', 'resume_file', 'parsed_text', 'uploaded_at']
-        read_only_fields= ['id', 'parsed_text', 'uploaded_at']
+        fields= ['id', 'resume_file', 'resume_key', 'parsed_data', 'skills', 'created_at']
+        read_only_fields= ['id', 'parsed_data', 'skills', 'created_at']
+        extra_kwargs = {'resume_file': {'required': False}}
+    def validate(self, attrs):
+        attrs = _claimed(attrs, self, 'resume', 'resume_file', 'resume_key')
+        if not attrs.get('resume_file'):
+            raise serializers.ValidationError({'resume_file': 'Upload a file or pass resume_key.'})
+        return attrs
 
 class InterviewSessionSerializer(serializers.ModelSerializer):
     class Meta:
         model= InterviewSession
-        fields= ['id', 'started_at', 'ended_at']
-        read_only_fields= ['id', 'started_at', 'ended_at']
+        fields= ['id', 'started_at', 'ended_at', 'adaptive']
+        read_only_fields= ['id', 'started_at', 'ended_at', 'adaptive']
 
 class QuestionSerializer(serializers.ModelSerializer):
     class Meta:
         model= Question
-        fields= ['id', 'session', 'text', 'created_at']
-        read_only_fields= ['id', 'session', 'text', 'created_at']
+        fields= ['id', 'session', 'text', 'follow_up_of', 'created_at']
+        read_only_fields= ['id', 'session', 'text', 'follow_up_of', 'created_at']
 
 class AnswerAnalysisSerializer(serializers.ModelSerializer):
     class Meta:
@@ -37,29 +56,46 @@ class AnswerAnalysisSerializer(serializers.ModelSerializer):
 
 class AnswerSerializer(serializers.ModelSerializer):
     analysis= AnswerAnalysisSerializer(read_only=True)
+    audio_key = serializers.CharField(write_only=True, required=False)
     class Meta:
         model= Answer
-        fields= ['id', 'audio_file', 'transcript', 'responded_at', 'analysis']
-        read_only_fields = ['id', 'transcript', 'responded_at', 'analysis']
+        fields= ['id', 'audio_file', 'audio_key', 'audio_tier', 'transcript', 'responded_at', 'analysis']
+        read_only_fields = ['id', 'audio_tier', 'transcript', 'responded_at', 'analysis']
+    def validate(self, attrs):
+        return _claimed(attrs, self, 'answer', 'audio_file', 'audio_key')
 
-class InterviewHistorySerializer(serializers.ModelSerializer):
-    total_questions     = serializers.SerializerMethodField()
-    answered_questions  = serializers.SerializerMethodField()
-    analysis_url        = serializers.SerializerMethodField()
-    pdf_report_url      = serializers.SerializerMethodField()
-    class Meta:
-        model= InterviewSession
-        fields= ['id', 'started_at', 'ended_at', 'total_questions', 'answered_questions', 'analysis_url', 'pdf_report_url']
-    def get_total_questions(self, obj):
-        return obj.questions.count()
-    def get_answered_questions(self, obj):
-        return sum(q.answers.count() for q in obj.questions.all())
-    def get_analysis_url(self, obj):
-        request = self.context.get('request')
-        return request.build_absolute_uri(f'/analysis/{obj.id}/')
-    def get_pdf_report_url(self, obj):
-        request = self.context.get('request')
-        return request.build_absolute_uri(f'/analysis-pdf/{obj.id}/')
+_datetime = serializers.DateTimeField()
+
+class _RowSerializer(serializers.Serializer):
+    """
+    Read-only serializer of `.values()` rows for polled list endpoints:
+    the declared fields document the output, to_representation builds it
+    directly instead of running every field.
+    """
+    def base_url(self):
+        if not hasattr(self, '_base_url'):
+            self._base_url = self.context['request'].build_absolute_uri('/').rstrip('/')
+        return self._base_url
+
+class InterviewHistorySerializer(_RowSerializer):
+    id                  = serializers.UUIDField(read_only=True)
+    started_at          = serializers.DateTimeField(read_only=True)
+    ended_at            = serializers.DateTimeField(read_only=True)
+    total_questions     = serializers.IntegerField(read_only=True)
+    answered_questions  = serializers.IntegerField(read_only=True)
+    analysis_url        = serializers.URLField(read_only=True)
+    pdf_report_url      = serializers.URLField(read_only=True)
+    def to_representation(self, row):
+        base = self.base_url()
+        return {
+            'id':                 str(row['id']),
+            'started_at':         _datetime.to_representation(row['started_at']),
+            'ended_at':           _datetime.to_representation(row['ended_at']) if row['ended_at'] else None,
+            'total_questions':    row['total_questions'],
+            'answered_questions': row['answered_questions'],
+            'analysis_url':       f"{base}/analysis/{row['id']}/",
+            'pdf_report_url':     f"{base}/analysis-pdf/{row['id']}/",
+        }
     
 class QuestionAdminSerializer(serializers.ModelSerializer):
     class Meta:
@@ -67,23 +103,52 @@ class QuestionAdminSerializer(serializers.ModelSerializer):
         fields = [ 'id', 'session', 'role', 'difficulty', 'category', 'text', 'created_at']
         read_only_fields = ['id', 'created_at']
 
-class NotificationSerializer(serializers.ModelSerializer):
-    analysis_url = serializers.SerializerMethodField()
-    pdf_url      = serializers.SerializerMethodField()
-    class Meta:
-        model  = Notification
-        fields = ['id', 'message', 'created_at', 'read', 'analysis_url', 'pdf_url']
-    def get_analysis_url(self, obj):
-        if not obj.session:
-            return None
-        req = self.context.get('request')
-        return req.build_absolute_uri(f'/analysis/{obj.session.id}/')
-    def get_pdf_url(self, obj):
-        if not obj.session:
-            return None
-        req = self.context.get('request')
-        return req.build_absolute_uri(f'/analysis-pdf/{obj.session.id}/')
+class NotificationSerializer(_RowSerializer):
+    id           = serializers.IntegerField(read_only=True)
+    message      = serializers.CharField(read_only=True)
+    created_at   = serializers.DateTimeField(read_only=True)
+    read         = serializers.BooleanField(read_only=True)
+    analysis_url = serializers.URLField(read_only=True)
+    pdf_url      = serializers.URLField(read_only=True)
+    def to_representation(self, row):
+        session_id = row['session_id']
+        return {
+            'id':           row['id'],
+            'message':      row['message'],
+            'created_at':   _datetime.to_representation(row['created_at']),
+            'read':         row['read'],
+            'analysis_url': f"{self.base_url()}/analysis/{session_id}/" if session_id else None,
+            'pdf_url':      f"{self.base_url()}/analysis-pdf/{session_id}/" if session_id else None,
+        }
     
+class DailyRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model  = DailyRollup
+        fields = [
+            'day', 'role', 'difficulty', 'category', 'sessions', 'completed_sessions', 'completion_rate',
+            'answers', 'avg_relevance', 'p50_relevance', 'p90_relevance', 'avg_pace_wpm',
+            'avg_pause_duration', 'avg_pause_frequency', 'updated_at',
+        ]
+        read_only_fields = fields
+
+class CohortCandidateSerializer(serializers.Serializer):
+    username       = serializers.CharField(max_length=150)
+    email          = serializers.EmailField()
+    preferred_role = serializers.ChoiceField(choices=Profile.ROLES, default='SDE')
+    difficulty     = serializers.ChoiceField(choices=Profile.DIFFICULTY_CHOICES, default='M')
+    category       = serializers.ChoiceField(choices=Profile.CATEGORY_CHOICES, default='technical')
+    resume         = serializers.CharField(required=False, help_text="name of the uploaded file field")
+
+class CohortCreateSerializer(serializers.Serializer):
+    name       = serializers.CharField(max_length=200)
+    candidates = serializers.JSONField()
+    def validate_candidates(self, value):
+        if not isinstance(value, list) or not value:
+            raise serializers.ValidationError("Expected a non-empty list of candidates.")
+        candidates = CohortCandidateSerializer(data=value, many=True)
+        candidates.is_valid(raise_exception=True)
+        return candidates.validated_data
+
 class UserSignupSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
     class Meta:
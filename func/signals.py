@@ -1,7 +1,11 @@
 from django.dispatch import receiver
+from django.db.models.signals import post_delete, post_save
 from allauth.account.signals import user_signed_up
+import time
+from celery.signals import task_prerun, task_postrun, worker_init, worker_process_init
 from django.core.mail import send_mail
-from .models import Notification
+from .models import Answer, Notification, Question, SearchPosting
+from . import metrics, scheduler, search, worker
 
 @receiver(user_signed_up)
 def on_user_signed_up(request, user, **kwargs):
@@ -15,3 +19,55 @@ def on_user_signed_up(request, user, **kwargs):
         user=user,
         message="Welcome to SmartInterviewer!"
     )
+
+_task_started = {}
+
+@task_prerun.connect
+def on_task_prerun(task_id=None, **kwargs):
+    """Mark the task as running for the scheduler's wait estimates"""
+    _task_started[task_id] = time.monotonic()
+    scheduler.task_started(task_id)
+
+
+@task_postrun.connect
+def on_task_postrun(task_id=None, **kwargs):
+    """Feed the scheduler's service time and publish the worker's pipeline metrics"""
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        scheduler.task_finished(task_id, time.monotonic() - started)
+    metrics.push()
+    worker.after_task()
+
+
+@worker_init.connect
+def on_worker_init(**kwargs):
+    """Load models in the parent so prefork children share the weights"""
+    worker.preload_models()
+
+
+@worker_process_init.connect
+def on_worker_process_init(**kwargs):
+    worker.configure_child()
+
+
+@receiver(post_save, sender=Question)
+def on_question_saved(instance, update_fields=None, **kwargs):
+    """Keep the question search index current"""
+    if update_fields is None or 'text' in update_fields:
+        search.index_question(instance)
+
+
+@receiver(post_save, sender=Answer)
+def on_answer_saved(instance, created=False, update_fields=None, **kwargs):
+    """Index transcripts as they are saved; a new answer has none yet"""
+    if created and not instance.transcript:
+        return
+    if update_fields is None or 'transcript' in update_fields:
+        search.index_answer(instance)
+
+
+@receiver(post_delete, sender=Question)
+@receiver(post_delete, sender=Answer)
+def on_searchable_deleted(sender, instance, **kwargs):
+    kind = 'question' if sender is Question else 'answer'
+    SearchPosting.objects.filter(kind=kind, object_id=instance.pk).delete()
@@ -0,0 +1,125 @@
+import os
+import shutil
+import time
+import uuid
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+# Key prefix per upload kind; the user id follows so keys can be checked for ownership
+UPLOAD_PREFIXES = {'resume': 'resumes/', 'answer': 'answers/'}
+_UPLOAD_SALT = 'func.storage.upload'
+
+def is_local(storage=None):
+    """
+    True when files live on this node's filesystem (FileSystemStorage).
+    """
+    storage = storage or default_storage
+    try:
+        storage.path('')
+    except NotImplementedError:
+        return False
+    return True
+
+def upload_key(kind, user_id, filename):
+    name = os.path.basename(filename or '') or 'upload'
+    return f"{UPLOAD_PREFIXES[kind]}{user_id}/{uuid.uuid4().hex}/{name}"
+
+def presign_upload(kind, user_id, filename, content_type=None):
+    """
+    Where a client sends a file itself, so the bytes skip Django.
+    S3: a presigned POST straight to the bucket. Local storage: a signed
+    one-off PUT URL of local_upload_view, the stand-in for development.
+    Returns {'key', 'method', 'url', 'fields'}; the key is then passed to
+    the resume upload or answer submit endpoint.
+    """
+    key = upload_key(kind, user_id, filename)
+    max_bytes = settings.MEDIA_UPLOAD_MAX_BYTES[kind]
+    expire = getattr(settings, 'MEDIA_UPLOAD_URL_EXPIRE', 900)
+    if is_local():
+        token = signing.dumps({'key': key, 'max_bytes': max_bytes}, salt=_UPLOAD_SALT)
+        return {'key': key, 'method': 'PUT', 'url': reverse('local-upload', args=[token]), 'fields': {}}
+
+    fields, conditions = {}, [['content-length-range', 1, max_bytes]]
+    if content_type:
+        fields['Content-Type'] = content_type
+        conditions.append({'Content-Type': content_type})
+    post = default_storage.connection.meta.client.generate_presigned_post(
+        default_storage.bucket_name, _object_key(key),
+        Fields=fields, Conditions=conditions, ExpiresIn=expire,
+    )
+    return {'key': key, 'method': 'POST', 'url': post['url'], 'fields': post['fields']}
+
+def _object_key(name):
+    location = getattr(default_storage, 'location', '') or ''
+    return f"{location.strip('/')}/{name}".lstrip('/')
+
+def read_upload_token(token):
+    """
+    (key, max_bytes) of a local upload token; raises signing.BadSignature
+    (or SignatureExpired) when it is forged or too old.
+    """
+    data = signing.loads(token, salt=_UPLOAD_SALT, max_age=getattr(settings, 'MEDIA_UPLOAD_URL_EXPIRE', 900))
+    return data['key'], data['max_bytes']
+
+def claim_upload(kind, user_id, key):
+    """
+    The stored key if `key` is an existing upload of this user and kind, else None.
+    """
+    prefix = f"{UPLOAD_PREFIXES[kind]}{user_id}/"
+    if not key or not key.startswith(prefix) or '..' in key:
+        return None
+    return key if default_storage.exists(key) else None
+
+def local_copy(field_file):
+    """
+    A filesystem path for code that needs one (ffmpeg, PDF/DOCX parsers).
+    Local storage returns the file's own path. Otherwise the object is
+    streamed once into MEDIA_SCRATCH_DIR and reused while it stays there;
+    stored names are never overwritten, so a cached copy cannot go stale.
+    """
+    storage = field_file.storage
+    if is_local(storage):
+        return field_file.path
+    path = os.path.join(settings.MEDIA_SCRATCH_DIR, field_file.name)
+    if os.path.exists(path):
+        os.utime(path)  # most recently used
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part = f"{path}.{os.getpid()}.part"
+    with storage.open(field_file.name, 'rb') as src, open(part, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    os.replace(part, path)
+    return path
+
+def evict_scratch():
+    """
+    Removes least recently used scratch files until the directory is under
+    MEDIA_SCRATCH_MAX_MB (Celery beat). Files used in the last
+    MEDIA_SCRATCH_MIN_AGE_SECONDS are kept even above the limit: local_copy()
+    touches what it hands out, so they may be open in a running task
+    (decoding, transcription, archiving). Returns the bytes freed.
+    """
+    limit = getattr(settings, 'MEDIA_SCRATCH_MAX_MB', 2048) * 2 ** 20
+    recent = time.time() - getattr(settings, 'MEDIA_SCRATCH_MIN_AGE_SECONDS', 3600)
+    files = []
+    for root, _, names in os.walk(settings.MEDIA_SCRATCH_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue  # removed by another process
+            files.append((st.st_mtime, st.st_size, path))
+    total, freed = sum(size for _, size, _ in files), 0
+    for mtime, size, path in sorted(files):   # oldest first; a stale .part is a dead download
+        if total <= limit or mtime >= recent:
+            break
+        try:
+            os.remove(path)
+            freed += size
+        except FileNotFoundError:
+            pass
+        total -= size
+    return freed
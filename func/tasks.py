@@ -1,44 +1,156 @@
+import time
 from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.core.mail import send_mail
-from .models import Answer, AnswerAnalysis, InterviewSession, Notification
-from .transcriber import transcribe   # your whisper logic
-from .analyzer import analyze         # your LLM logic
+from .models import Answer, AnswerAnalysis, InterviewSession, Notification, Question, Resume
+from .transcriber import transcribe, transcribe_batch, load_pcm, acoustic_metrics   # your whisper logic
+from .transcriber import claim as claim_transcriptions, defer as defer_transcription, release_claims
+from .analyzer import analyze, discard_state, generate_follow_up, respone_wps, MODEL_VERSION, PROMPT_VERSION   # your LLM logic
+from . import metrics as pipeline_metrics
+from . import percentiles, scheduler, search
+from .retention import recording_path
+from .storage import local_copy
 
-@shared_task
-def full_answer_analysis(answer_id):
+@shared_task(bind=True, acks_late=True)
+def full_answer_analysis(self, answer_id, enqueued_at=None):
     """
     1) Transcribe the saved audio with timestamps
     2) Run LLM analysis on those segments
     3) Persist transcript & analysis metrics
+    `enqueued_at` (epoch seconds) is used to record queue wait time.
     """
+    if enqueued_at is not None and not self.request.retries:
+        pipeline_metrics.observe('queue_wait', max(time.time() - enqueued_at, 0.0))
     answer = get_object_or_404(Answer, id=answer_id)
 
-    # 1) Transcription
-    segments = transcribe(answer.audio_file.path)
-    full_text = " ".join([seg.split("]")[-1].strip() for seg in segments])
-    answer.transcript = full_text
-    answer.save()
-
-    # 2) LLM Analysis
-    question_text = answer.question.text
-    metrics = analyze(segments, question_text)
-    # metrics => {"tone": str, "speed": str, "fluency": str, "relevance": float}
-
-    # 3) Persist into AnswerAnalysis
-    AnswerAnalysis.objects.update_or_create(
-        answer=answer,
-        defaults={
-            'tone_score':      None,               # convert if needed from metrics['tone']
-            'pace_wpm':        None,               # convert if needed from metrics['speed']
-            'fluency_score':   None,               # convert if needed from metrics['fluency']
-            'relevance_score': metrics.get('relevance'),
-            # add pause metrics here if you compute them
-        }
-    )
+    # 1) Transcription (decodes once; the PCM cache is reused below)
+    audio_path = recording_path(answer)   # restored from its bundle if archived, None once purged
+    if audio_path is None and answer.segments is None:
+        return {'status': 'no recording'}
+    if answer.segments is None and getattr(settings, 'TRANSCRIBE_BATCHING', False):
+        claimed = claim_transcriptions(str(answer.id), getattr(settings, 'TRANSCRIBE_BATCH_SIZE', 8))
+        if claimed:
+            _transcribe_in_batch(answer, claimed)
+        elif defer_transcription(str(answer.id)):
+            return {'status': 'batched'}   # in another worker's batch, which queues this task again
+    if answer.segments is None:
+        segments = transcribe(audio_path)
+        answer.transcript = _transcript_text(segments)
+        answer.segments = segments
+        with pipeline_metrics.timed('db_write'):
+            answer.save()
+    segments = answer.segments
+
+    try:
+        # 2) LLM Analysis
+        question = answer.question
+        question_text = question.text
+        wants_follow_up = _wants_follow_up(question)
+        metrics = analyze(segments, question_text, keep_state=wants_follow_up)
+        # metrics => {"tone": str, "speed": str, "fluency": str, "relevance": float}
+        # Without the recording (purged) the stored pause metrics are kept
+        acoustics = acoustic_metrics(load_pcm(audio_path)) if audio_path else {}
+        _, wps = respone_wps(segments)
+
+        # 3) Persist into AnswerAnalysis
+        with pipeline_metrics.timed('db_write'), transaction.atomic():
+            percentiles.lock()   # a concurrent sketch rebuild sees the analysis and its record() together
+            analysis, created = AnswerAnalysis.objects.update_or_create(
+                answer=answer,
+                defaults={
+                    'tone_score':      None,               # convert if needed from metrics['tone']
+                    'pace_wpm':        round(wps * 60, 1),
+                    'fluency_score':   None,               # convert if needed from metrics['fluency']
+                    'relevance_score': metrics.get('relevance'),
+                    **acoustics,                           # average_pause_duration, pause_frequency
+                    'model_version':          MODEL_VERSION,
+                    'prompt_version':         PROMPT_VERSION,
+                }
+            )
+            if created:   # re-analyses would count the same answer twice (reanalyze rebuilds instead)
+                percentiles.record(analysis, getattr(question.session.user, 'profile', None))
+
+        # 4) Adaptive sessions: a follow-up, only if it is ready before the deadline
+        if wants_follow_up and segments:
+            _add_follow_up(answer, segments, metrics.get('relevance'))
+    finally:
+        discard_state()   # kept by analyze(keep_state=True) even when no follow-up is generated
     return {'status': 'ok', 'metrics': metrics}
 
 
+def _transcript_text(segments):
+    return " ".join([seg.split("]")[-1].strip() for seg in segments])
+
+
+def _transcribe_in_batch(answer, claimed):
+    """
+    Transcribes the `claimed` answers (`answer` among them) in one Whisper
+    batch. Tasks that already ran for the other answers deferred to this
+    batch; they are queued again when it ends, and find their segments
+    saved or, after a failure, transcribe on their own.
+    """
+    try:
+        batch, paths = [], []
+        for item in Answer.objects.filter(id__in=claimed):
+            path = recording_path(item)
+            if path:
+                batch.append(item)
+                paths.append(path)
+        for item, segments in zip(batch, transcribe_batch(paths)):
+            item.segments = segments
+            item.transcript = _transcript_text(segments)
+            if item.id == answer.id:
+                answer.segments, answer.transcript = item.segments, item.transcript
+        with pipeline_metrics.timed('db_write'):
+            Answer.objects.bulk_update(batch, ['segments', 'transcript'])
+            for item in batch:   # bulk_update sends no post_save
+                search.index_answer(item)
+    finally:
+        deferred = release_claims(claimed)
+        for answer_id, user_id in Answer.objects.filter(id__in=deferred).values_list('id', 'question__session__user_id'):
+            scheduler.dispatch(full_answer_analysis, args=[str(answer_id)], user_id=user_id,
+                               klass=scheduler.INTERACTIVE)
+
+
+def _wants_follow_up(question):
+    """
+    Follow-ups are generated for original questions of adaptive sessions,
+    up to FOLLOW_UP_MAX_PER_SESSION per session.
+    """
+    session = question.session
+    if not session.adaptive or question.follow_up_of_id is not None:
+        return False
+    limit = getattr(settings, 'FOLLOW_UP_MAX_PER_SESSION', 3)
+    return session.questions.filter(follow_up_of__isnull=False).count() < limit
+
+
+def _add_follow_up(answer, segments, relevance):
+    """
+    Generates a follow-up within what is left of FOLLOW_UP_DEADLINE_SECONDS
+    after the answer was submitted. If it misses the deadline or the answer
+    was already strong, the session just continues with its pre-generated queue.
+    """
+    if relevance is not None and relevance >= getattr(settings, 'FOLLOW_UP_MAX_RELEVANCE', 0.85):
+        return None
+    deadline = getattr(settings, 'FOLLOW_UP_DEADLINE_SECONDS', 20)
+    remaining = deadline - (timezone.now() - answer.responded_at).total_seconds()
+    if remaining <= 1:
+        return None
+    text = generate_follow_up(
+        segments, answer.question.text, relevance,
+        max_new_tokens=getattr(settings, 'FOLLOW_UP_MAX_NEW_TOKENS', 48),
+        max_time=remaining,
+    )
+    if not text or (timezone.now() - answer.responded_at).total_seconds() > deadline:
+        return None
+    if Answer.objects.filter(question__session=answer.question.session_id, responded_at__gt=answer.responded_at).exists():
+        return None   # the candidate already answered the next question; the follow-up would be stale
+    return Question.objects.create(session=answer.question.session, text=text, follow_up_of=answer.question)
+
+
 @shared_task
 def send_report_ready_alert(session_id):
     """
@@ -62,3 +174,65 @@ def send_report_ready_alert(session_id):
         session=session,
         message=f"Your interview report for session {session_id} is ready."
     )
+
+
+@shared_task(acks_late=True)
+def warm_fit_embeddings(resume_id):
+    """
+    Embed a freshly parsed resume's phrases so fit ranking never encodes on the request path.
+    """
+    from .scoring import embed_texts, resume_items
+    resume = Resume.objects.get(id=resume_id)
+    items = resume_items(resume.parsed_data)
+    embed_texts(items)
+    return len(items)
+
+
+@shared_task(acks_late=True)
+def refresh_daily_rollups(full=False):
+    """
+    Periodic (Celery beat): rebuild analytics rollups for days touched since the last run.
+    """
+    from .analytics import refresh_rollups
+    days = refresh_rollups(full=full)
+    return {'days': [d.isoformat() for d in days]}
+
+
+@shared_task
+def apply_audio_retention():
+    """
+    Periodic (Celery beat): compress, archive and purge answer recordings per the retention policy.
+    """
+    from .retention import run
+    record = run()
+    if record is None:
+        return {'status': 'busy'}   # the previous pass is still running
+    return {'transcoded': record.transcoded, 'archived': record.archived, 'purged': record.purged,
+            'failed': record.failed, 'bytes_reclaimed': record.bytes_reclaimed}
+
+
+@shared_task
+def evict_media_scratch():
+    """
+    Periodic (Celery beat): trims this node's MEDIA_SCRATCH_DIR to MEDIA_SCRATCH_MAX_MB.
+    """
+    from .storage import evict_scratch
+    return {'bytes_freed': evict_scratch()}
+
+
+@shared_task(acks_late=True, rate_limit=getattr(settings, 'COHORT_GENERATION_RATE_LIMIT', '30/m'))
+def generate_session_questions(session_id):
+    """
+    Bulk (cohort) question generation: parse the candidate's resume and
+    pre-generate the session's questions. Routed to the low-priority queue.
+    """
+    from .parser import execute, parse_resume_file
+    session = InterviewSession.objects.select_related('user').get(id=session_id)
+    if session.questions.exists():
+        return 0  # the candidate already started and generated inline
+    resume = session.user.resumes.order_by('-created_at').first()
+    parsed = resume.parsed_data
+    if not parsed or 'error' in parsed:
+        parsed = parse_resume_file(local_copy(resume.resume_file))
+        resume.set_parsed_data(parsed)
+    return execute(session, local_copy(resume.resume_file), resume_data=parsed)
@@ -1,3 +1,311 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .models import Answer, InterviewSession, Notification, Question
 
-# Create your tests here.
+User = get_user_model()
+
+# Tests never touch the shared Redis cache
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class NextQuestionTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('candidate', 'candidate@example.com', 'pw')
+        self.session = InterviewSession.objects.create(user=user, adaptive=True)
+        self.q1 = Question.objects.create(session=self.session, text="Tell me about a project?")
+        self.q2 = Question.objects.create(session=self.session, text="How do you test code?")
+        self.q3 = Question.objects.create(session=self.session, text="Describe a conflict?")
+
+    def answer(self, question, seconds_ago=0):
+        answer = Answer.objects.create(question=question)
+        Answer.objects.filter(pk=answer.pk).update(responded_at=timezone.now() - timedelta(seconds=seconds_ago))
+        return answer
+
+    def test_originals_in_creation_order(self):
+        self.assertEqual(self.session.next_question(), self.q1)
+        self.answer(self.q1)
+        self.assertEqual(self.session.next_question(), self.q2)
+
+    def test_follow_up_of_last_answer_comes_first(self):
+        self.answer(self.q1)
+        follow_up = Question.objects.create(session=self.session, text="Why that design?", follow_up_of=self.q1)
+        self.assertEqual(self.session.next_question(), follow_up)
+
+    def test_stale_follow_up_is_skipped(self):
+        self.answer(self.q1, seconds_ago=30)
+        self.answer(self.q2)   # the candidate moved on before the follow-up arrived
+        Question.objects.create(session=self.session, text="Why that design?", follow_up_of=self.q1)
+        self.assertEqual(self.session.next_question(), self.q3)
+
+
+class QuestionFilterTests(SimpleTestCase):
+    def test_minhash_is_deterministic_and_tracks_similarity(self):
+        from .parser import minhash
+        a = minhash("How do you design a rate limiter for a public API?")
+        self.assertTrue((a == minhash("How do you design a rate limiter for a public API?")).all())
+        near = (a == minhash("How would you design a rate limiter for a public API?")).mean()
+        far = (a == minhash("Describe a time you disagreed with your manager.")).mean()
+        self.assertGreater(near, 0.4)   # true Jaccard 8/12
+        self.assertLess(far, 0.2)
+
+    def test_filter_questions(self):
+        from .parser import filter_questions, minhash
+        bank = np.stack([minhash("How do you size a Redis cluster for a read-heavy workload?")])
+        accepted = ["How do you review a pull request for a critical service?"]
+        kept, seen_before = filter_questions([
+            "How do you review a pull request for a critical service?",          # already accepted
+            "How do you size a Redis cluster for a read-heavy workload?",        # asked in another session
+            "Can you explain the difference between Docker volume and bind mount?",  # echo of a prompt example
+            "Resume: Python, Django",                                           # prompt artifact
+            "What is",                                                          # truncated
+            "Describe how you would shard a Postgres table by tenant.",
+            "Describe how you would shard a Postgres table by tenant id.",      # near-duplicate
+        ], accepted, bank)
+        self.assertEqual(kept, ["Describe how you would shard a Postgres table by tenant."])
+        self.assertEqual(seen_before, ["How do you size a Redis cluster for a read-heavy workload?"])
+        self.assertEqual(len(accepted), 2)
+
+    def test_fallback_questions_fill_a_session(self):
+        from .parser import _fallback_questions, is_usable_question
+        for role in ('SDE', 'PM', 'HR'):
+            questions = _fallback_questions(role)
+            self.assertGreaterEqual(len(set(questions)), 10)
+            self.assertTrue(all(is_usable_question(q) for q in questions))
+
+def _tone(seconds, sample_rate=16000):
+    return (0.1 * np.random.default_rng(0).standard_normal(int(seconds * sample_rate))).astype(np.float32)
+
+def _silence(seconds, sample_rate=16000):
+    return np.zeros(int(seconds * sample_rate), dtype=np.float32)
+
+
+class AudioTests(SimpleTestCase):
+    def test_trim_silence(self):
+        from .transcriber import trim_silence
+        trimmed, offset = trim_silence(np.concatenate([_silence(1), _tone(1), _silence(1)]))
+        self.assertAlmostEqual(offset, 0.8, delta=0.05)          # voiced start minus the 0.2 s pad
+        self.assertAlmostEqual(len(trimmed) / 16000, 1.4, delta=0.1)
+
+    def test_trim_silence_shorter_than_a_frame(self):
+        from .transcriber import trim_silence
+        trimmed, offset = trim_silence(_tone(0.01))
+        self.assertEqual((len(trimmed), offset), (0, 0.0))
+
+    def test_acoustic_metrics_counts_only_long_pauses(self):
+        from .transcriber import acoustic_metrics
+        pcm = np.concatenate([_silence(0.5), _tone(1), _silence(0.6), _tone(1), _silence(0.1), _tone(1)])
+        result = acoustic_metrics(pcm)
+        self.assertEqual(result['pause_frequency'], 1)           # leading silence and the 0.1 s gap do not count
+        self.assertAlmostEqual(result['average_pause_duration'], 0.6, delta=0.06)
+
+    def test_window_bounds_cut_at_silence(self):
+        from .transcriber import _window_bounds
+        pcm = np.concatenate([_tone(27), _silence(1), _tone(10)])
+        (start, cut), (resume, end) = _window_bounds(pcm)
+        self.assertEqual((start, resume, end), (0, cut, len(pcm)))
+        self.assertTrue(27 <= cut / 16000 <= 28)                 # inside the pause, not at 30 s
+
+    def test_window_segments(self):
+        from .transcriber import _window_segments
+        begin = 1000   # timestamp tokens are begin + seconds / 0.02
+        self.assertEqual(_window_segments([1000, 5, 6, 1050, 1050, 7, 1100], begin, 30.0),
+                         [(0.0, 1.0, [5, 6]), (1.0, 2.0, [7])])
+        self.assertEqual(_window_segments([1100, 5], begin, 12.5), [(2.0, 12.5, [5])])
+
+
+class _WordTokenizer:
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+    def decode(self, ids):
+        return " ".join(ids)
+
+
+class PromptingTests(SimpleTestCase):
+    def test_fit_text_keeps_head_and_tail(self):
+        from .prompting import fit_text
+        tokenizer = _WordTokenizer()
+        self.assertEqual(fit_text(tokenizer, "a b c", 6), "a b c")
+        self.assertEqual(fit_text(tokenizer, "a b c d e f g h i", 6), "a b c d [...] h i")
+
+    def test_fit_items(self):
+        from .prompting import fit_items
+        tokenizer = _WordTokenizer()
+        self.assertEqual(fit_items(tokenizer, ["python", "django rest", "sql"], 5), "python, django rest (+1 more)")
+        self.assertEqual(fit_items(tokenizer, ["python", "sql"], 10), "python, sql")
+        self.assertEqual(fit_items(tokenizer, "one two three four five six", 3), "one two [...] six")
+
+
+class ScorePoolTests(SimpleTestCase):
+    VECTORS = {
+        "python": [1, 0, 0], "python developer": [1, 0, 0],
+        "sql": [0, 1, 0], "sql tuning": [0, 0.6, 0.8],
+        "cooking": [0, 0, 1],
+    }
+
+    def embed(self, texts):
+        return np.array([self.VECTORS[t] for t in texts], dtype=np.float32)
+
+    def test_scores_best_match_per_requirement(self):
+        from . import scoring
+        with mock.patch.object(scoring, 'embed_texts', self.embed):
+            scores, best, sims, spans = scoring.score_pool(
+                [["python developer", "sql tuning"], ["cooking"], []], ["python", "sql"])
+        self.assertEqual(spans, [(0, 2), (2, 3), (3, 3)])
+        self.assertEqual(sims.shape, (2, 3))
+        np.testing.assert_allclose(best, [[1, 0, 0], [0.6, 0, 0]], atol=1e-6)
+        np.testing.assert_allclose(scores, [0.8, 0, 0], atol=1e-6)
+
+    def test_empty_pool(self):
+        from .scoring import score_pool
+        scores, best, sims, spans = score_pool([[], []], ["python"])
+        self.assertEqual((scores.tolist(), best.shape, sims.shape, spans), ([0, 0], (1, 2), (1, 0), [(0, 0), (0, 0)]))
+
+
+@override_settings(CACHES=LOCMEM_CACHE, SCHEDULER_FAIR_SHARE=2, SCHEDULER_WORKER_SLOTS=2,
+                   SCHEDULER_DEFAULT_SERVICE_SECONDS=30)
+class SchedulerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.task = mock.Mock()
+
+    def test_counters_never_go_negative(self):
+        from .scheduler import _incr
+        self.assertEqual(_incr('counter'), 1)
+        self.assertEqual(_incr('counter', -1), 0)
+        self.assertEqual(_incr('counter', -1), 0)
+        self.assertEqual(_incr('counter'), 1)
+
+    def test_heavy_user_moves_down_the_band(self):
+        from . import scheduler
+        for _ in range(4):
+            scheduler.dispatch(self.task, args=['x'], user_id=7)
+        scheduler.dispatch(self.task, args=['y'], user_id=8)
+        priorities = [c.kwargs['priority'] for c in self.task.apply_async.call_args_list]
+        self.assertEqual(priorities, [0, 0, 1, 2, 0])
+        bulk = scheduler.dispatch(self.task, user_id=7, klass=scheduler.BULK)
+        self.assertEqual(self.task.apply_async.call_args.kwargs['queue'], 'bulk')
+        self.assertEqual(self.task.apply_async.call_args.kwargs['priority'], 5)   # bulk has its own pending count
+        self.assertIs(bulk, self.task.apply_async.return_value)
+
+    def test_finished_task_releases_the_slot(self):
+        from . import scheduler
+        scheduler.dispatch(self.task, user_id=7)
+        task_id = self.task.apply_async.call_args.kwargs['task_id']
+        scheduler.task_started(task_id)
+        scheduler.task_finished(task_id, 10.0)
+        scheduler.task_finished(task_id, 10.0)   # a second postrun (retry) finds nothing to release
+        self.assertEqual(cache.get('sched:pending:interactive:7'), 0)
+        self.assertEqual(cache.get('sched:running:interactive'), 0)
+        self.assertEqual(cache.get('sched:service:interactive'), 10.0)
+
+    def test_estimated_wait(self):
+        from . import scheduler
+        with mock.patch.object(scheduler, 'queue_depth', return_value=4):
+            self.assertEqual(scheduler.estimated_wait(scheduler.INTERACTIVE), 60.0)   # 4 tasks x 30 s / 2 slots
+            self.assertEqual(scheduler.estimated_wait(scheduler.BULK), 120.0)         # behind interactive too
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('candidate', 'candidate@example.com', 'pw')
+        session = InterviewSession.objects.create(user=user)
+        question = Question.objects.create(session=session, text="Which tools do you deploy with?")
+        self.often = Answer.objects.create(question=question, transcript="Kubernetes mostly, kubernetes operators")
+        self.once = Answer.objects.create(question=question, transcript=(
+            "I wrote a kubernetes manifest once for a small personal project at home last year"))
+        Answer.objects.create(question=question, transcript="I mostly cook pasta and bake bread")
+        Answer.objects.create(question=question)   # not transcribed yet: not a document
+
+    def test_tokenize(self):
+        from .search import tokenize
+        self.assertEqual(tokenize("The C++ and C# devs, uh, used Python3 a lot"),
+                         ['c++', 'c#', 'devs', 'used', 'python3', 'lot'])
+
+    def test_bm25_ranks_by_term_frequency_and_length(self):
+        from .search import _document_count, search
+        ranked = search("kubernetes", 'answer')
+        self.assertEqual([pk for pk, _ in ranked], [self.often.id, self.once.id])
+        self.assertGreater(ranked[0][1], ranked[1][1])
+        self.assertEqual(_document_count('answer'), 3)
+        self.assertEqual(search("the and of", 'answer'), [])
+
+    def test_rare_term_wins(self):
+        from .search import search
+        self.assertEqual([pk for pk, _ in search("kubernetes pasta", 'answer', limit=1)],
+                         [Answer.objects.get(transcript__startswith="I mostly").id])
+
+
+class TDigestTests(SimpleTestCase):
+    def test_quantiles_and_ranks(self):
+        from .percentiles import TDigest
+        digest = TDigest(compression=100)
+        values = np.random.default_rng(1).uniform(0, 100, 20000)
+        for value in values:
+            digest.add(value)
+        self.assertEqual(digest.count, 20000)
+        self.assertLess(len(digest.centroids), 200)
+        for q in (0.01, 0.25, 0.5, 0.9, 0.99):
+            self.assertAlmostEqual(digest.quantile(q), np.quantile(values, q), delta=1.0)
+        self.assertAlmostEqual(digest.cdf(90), 0.9, delta=0.01)
+        self.assertEqual((digest.cdf(-1), digest.cdf(101)), (0.0, 1.0))
+
+    def test_round_trip_and_empty(self):
+        from .percentiles import TDigest
+        self.assertIsNone(TDigest().quantile(0.5))
+        self.assertIsNone(TDigest().cdf(1))
+        digest = TDigest()
+        for value in range(1, 101):
+            digest.add(value)
+        copy = TDigest.from_dict(digest.to_dict())
+        self.assertEqual(copy.count, 100)
+        self.assertAlmostEqual(copy.quantile(0.5), digest.quantile(0.5), places=3)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, DATABASE_ROUTERS=[])   # reads stay on the test database
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('candidate', 'candidate@example.com', 'pw')
+        self.session = InterviewSession.objects.create(user=self.user)
+        Notification.objects.create(user=self.user, session=self.session, message="Welcome")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_revalidates(self, url, change):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        change()
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], etag)
+
+    def test_notifications(self):
+        self.assert_revalidates(reverse('notifications'),
+                                lambda: Notification.objects.filter(user=self.user).update(read=True))
+
+    def test_history(self):
+        self.assert_revalidates(reverse('interview-history'),
+                                lambda: Question.objects.create(session=self.session, text="A new question?"))
+
+    def test_history_etag_depends_on_query(self):
+        plain = self.client.get(reverse('interview-history'))['ETag']
+        ordered = self.client.get(reverse('interview-history'), {'ordering': 'started_at'})['ETag']
+        self.assertNotEqual(plain, ordered)
+
+    def test_session_report(self):
+        def end_session():
+            InterviewSession.objects.filter(pk=self.session.pk).update(ended_at=timezone.now())
+        self.assert_revalidates(reverse('session-analysis', args=[self.session.id]), end_session)
@@ -1,4 +1,34 @@
+import os
+import time
+import numpy as np
+import torch
 import whisper
+from whisper.audio import HOP_LENGTH, N_SAMPLES, SAMPLE_RATE, load_audio
+from whisper.timing import add_word_timestamps
+from whisper.tokenizer import get_tokenizer
+from django.conf import settings
+from django.core.cache import cache
+from . import metrics
+from .locks import cache_lock
+
+# Energy-based VAD parameters
+_FRAME_SECONDS      = 0.03    # analysis frame length
+_SILENCE_DB         = -40.0   # frames this far below the loudest frame are silence
+_PAD_SECONDS        = 0.2     # context kept around the voiced region
+_MIN_PAUSE_SECONDS  = 0.3     # shorter gaps are not counted as pauses
+_CUT_SEARCH_SECONDS = 5.0     # batch windows end at a silent frame in their last seconds
+
+# Decoding fallback, as in whisper.transcribe() with its default thresholds
+_TEMPERATURES        = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+_COMPRESSION_RATIO   = 2.4    # more repetitive output is decoded again, hotter
+_LOGPROB_THRESHOLD   = -1.0   # less likely output is decoded again, hotter
+_NO_SPEECH_THRESHOLD = 0.6    # ... unless the window is probably silence
+
+# Answers waiting for a batched transcription, shared by all worker processes
+_PENDING_KEY  = 'transcribe:pending'
+_LOCK_KEY     = 'transcribe:pending:lock'
+_CLAIM_KEY    = 'transcribe:claimed:{}'    # answer id -> in a batch being transcribed
+_DEFERRED_KEY = 'transcribe:deferred:{}'   # answer id -> its task handed over to the batch
 
 # Lazy‑load Whisper model
 _whisper_model = None
@@ -9,15 +39,263 @@ def _get_whisper():
         _whisper_model = whisper.load_model("small")
     return _whisper_model
 
+def pcm_cache_path(audio_path):
+    """
+    Location of the decoded PCM cache stored next to the audio file.
+    """
+    root, _ = os.path.splitext(audio_path)
+    return root + ".pcm.npy"
+
+def load_pcm(audio_path):
+    """
+    Decodes the audio once to 16 kHz mono float32 and caches it as .npy
+    next to the file. Later calls memory-map the cached array instead of
+    spawning ffmpeg again. The cache is written under a per-process name
+    and renamed, so concurrent decoders never mix their bytes.
+    """
+    cache_path = pcm_cache_path(audio_path)
+    if not (os.path.exists(cache_path)
+            and os.path.getmtime(cache_path) >= os.path.getmtime(audio_path)):
+        pcm = load_audio(audio_path)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as fh:
+            np.save(fh, pcm)
+        os.replace(tmp_path, cache_path)
+    return np.load(cache_path, mmap_mode="r")
+
+def _voiced_frames(pcm):
+    """
+    Flags each analysis frame as voiced (True) or silent (False).
+    """
+    frame = int(_FRAME_SECONDS * SAMPLE_RATE)
+    n_frames = len(pcm) // frame
+    if n_frames == 0:
+        return np.zeros(0, dtype=bool)
+    frames = np.asarray(pcm[:n_frames * frame], dtype=np.float32).reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    energy_db = 20 * np.log10(rms + 1e-10)
+    return energy_db > energy_db.max() + _SILENCE_DB
+
+def trim_silence(pcm):
+    """
+    Drops leading and trailing silence.
+    Returns (trimmed_pcm, offset_seconds) where offset is the start of the kept region.
+    """
+    voiced = _voiced_frames(pcm)
+    if not voiced.any():
+        return pcm[:0], 0.0
+    frame = int(_FRAME_SECONDS * SAMPLE_RATE)
+    pad = int(_PAD_SECONDS * SAMPLE_RATE)
+    idx = np.flatnonzero(voiced)
+    start = max(idx[0] * frame - pad, 0)
+    end = min((idx[-1] + 1) * frame + pad, len(pcm))
+    return pcm[start:end], start / SAMPLE_RATE
+
+def acoustic_metrics(pcm):
+    """
+    Pause statistics from the energy VAD over the voiced region.
+    Returns a dict: {"average_pause_duration":..., "pause_frequency":...}
+    """
+    voiced = _voiced_frames(pcm)
+    idx = np.flatnonzero(voiced)
+    if len(idx) == 0:
+        return {"average_pause_duration": 0.0, "pause_frequency": 0}
+    inner = voiced[idx[0]:idx[-1] + 1]
+    # Lengths of silent runs between voiced frames
+    edges = np.diff(np.concatenate(([1], inner.astype(np.int8), [1])))
+    run_starts = np.flatnonzero(edges == -1)
+    run_ends = np.flatnonzero(edges == 1)
+    pauses = (run_ends - run_starts) * _FRAME_SECONDS
+    pauses = pauses[pauses >= _MIN_PAUSE_SECONDS]
+    return {
+        "average_pause_duration": round(float(pauses.mean()), 2) if len(pauses) else 0.0,
+        "pause_frequency": int(len(pauses)),
+    }
+
 def transcribe(audio_path):
     """
     Transcribes the audio file using Whisper,
     returns a list of timestamped strings "[start - end] text".
     """
     model = _get_whisper()
-    transcription = model.transcribe(audio_path, word_timestamps=True)
+    pcm, offset = trim_silence(load_pcm(audio_path))
+    if len(pcm) == 0:
+        return []
+    started = time.perf_counter()
+    transcription = model.transcribe(np.array(pcm), word_timestamps=True)
+    elapsed = time.perf_counter() - started
+    metrics.observe('transcribe', elapsed)
+    metrics.record_tokens('transcribe', sum(len(seg['tokens']) for seg in transcription["segments"]), elapsed)
     transcript = []
     for segment in transcription["segments"]:
-        item = f"[{segment['start']} - {segment['end']}] {segment['text']}"
+        start = round(segment['start'] + offset, 2)
+        end = round(segment['end'] + offset, 2)
+        item = f"[{start} - {end}] {segment['text']}"
         transcript.append(item)
     return transcript
+
+def _window_segments(tokens, timestamp_begin, window_seconds):
+    """
+    Splits the tokens decoded for one 30-second window into
+    (start, end, text tokens) at its timestamp tokens.
+    """
+    segments, start, text = [], None, []
+    for token in tokens:
+        if token < timestamp_begin:
+            text.append(token)
+            continue
+        t = (token - timestamp_begin) * 0.02
+        if start is not None and text:
+            segments.append((start, t, text))
+            start, text = None, []
+        else:
+            start = t
+    if text:  # no closing timestamp: the segment runs to the end of the window
+        segments.append((start or 0.0, window_seconds, text))
+    return segments
+
+def _window_bounds(pcm):
+    """
+    Splits the PCM into windows of at most 30 seconds. A window that has to
+    be cut ends at the last silent frame (energy VAD) of its final
+    _CUT_SEARCH_SECONDS, so no word is split between two windows; with no
+    silence there it is cut at 30 seconds. Returns (start, end) sample pairs.
+    """
+    frame = int(_FRAME_SECONDS * SAMPLE_RATE)
+    search = int(_CUT_SEARCH_SECONDS / _FRAME_SECONDS)
+    voiced = _voiced_frames(pcm)
+    bounds, start = [], 0
+    while len(pcm) - start > N_SAMPLES:
+        last = (start + N_SAMPLES) // frame   # first frame past the longest window
+        silent = np.flatnonzero(~voiced[last - search:last])
+        end = (last - search + silent[-1]) * frame if len(silent) else start + N_SAMPLES
+        bounds.append((start, end))
+        start = end
+    if start < len(pcm):
+        bounds.append((start, len(pcm)))
+    return bounds
+
+def _needs_fallback(result):
+    if result.no_speech_prob > _NO_SPEECH_THRESHOLD:
+        return False
+    return result.compression_ratio > _COMPRESSION_RATIO or result.avg_logprob < _LOGPROB_THRESHOLD
+
+def _is_silence(result):
+    return result.no_speech_prob > _NO_SPEECH_THRESHOLD and result.avg_logprob <= _LOGPROB_THRESHOLD
+
+def _decode_with_fallback(model, windows, fp16):
+    """
+    Decodes log-mel windows in batches of TRANSCRIBE_BATCH_SIZE. Windows whose
+    result is too repetitive or unlikely are decoded again at the next
+    temperature, as whisper.transcribe() does. Returns one result per window.
+    """
+    batch_size = getattr(settings, 'TRANSCRIBE_BATCH_SIZE', 8)
+    decoded, todo = [None] * len(windows), list(range(len(windows)))
+    for temperature in _TEMPERATURES:
+        options = whisper.DecodingOptions(without_timestamps=False, fp16=fp16, temperature=temperature)
+        for b in range(0, len(todo), batch_size):
+            idx = todo[b:b + batch_size]
+            mel = torch.stack([windows[j] for j in idx]).to(model.device)
+            for j, result in zip(idx, whisper.decode(model, mel.half() if fp16 else mel, options)):
+                decoded[j] = result
+        todo = [j for j in todo if _needs_fallback(decoded[j])]
+        if not todo:
+            break
+    return decoded
+
+def transcribe_batch(audio_paths):
+    """
+    Transcribes several files at once: the windows of every file go through
+    the Whisper encoder and decoder in shared batches of TRANSCRIBE_BATCH_SIZE,
+    with the temperature fallback of transcribe(). Windows are cut at silence
+    and segment boundaries are refined with word timestamps one window at a
+    time. Unlike transcribe(), a window is not conditioned on the text of the
+    previous one, so long answers may come out slightly less consistent.
+    Returns one "[start - end] text" list per path, in order, like transcribe().
+    """
+    model = _get_whisper()
+    tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages)
+    fp16 = model.device.type == "cuda"
+    windows, owners = [], []   # log-mel windows and (path index, offset, length) per window
+    for i, path in enumerate(audio_paths):
+        pcm, offset = trim_silence(load_pcm(path))
+        for start, end in _window_bounds(pcm):
+            chunk = np.array(pcm[start:end])
+            windows.append(whisper.log_mel_spectrogram(whisper.pad_or_trim(chunk), model.dims.n_mels))
+            owners.append((i, offset + start / SAMPLE_RATE, len(chunk) / SAMPLE_RATE))
+
+    results = [[] for _ in audio_paths]
+    if not windows:
+        return results
+    started = time.perf_counter()
+    decoded = _decode_with_fallback(model, windows, fp16)
+
+    last_end = {}   # path index -> end of its last segment so far, in seconds from the file start
+    for mel, (i, offset, length), result in zip(windows, owners, decoded):
+        if _is_silence(result):
+            continue
+        segments = [{'seek': 0, 'start': start, 'end': min(end, length), 'tokens': text}
+                    for start, end, text in _window_segments(result.tokens, tokenizer.timestamp_begin, length)]
+        mel = mel.to(model.device)
+        add_word_timestamps(segments=segments, model=model, tokenizer=tokenizer, mel=mel.half() if fp16 else mel,
+                            num_frames=int(length * SAMPLE_RATE) // HOP_LENGTH,
+                            last_speech_timestamp=last_end.get(i, offset) - offset)
+        for segment in segments:
+            start, end = round(segment['start'] + offset, 2), round(segment['end'] + offset, 2)
+            results[i].append(f"[{start} - {end}] {tokenizer.decode(segment['tokens'])}")
+        if segments:
+            last_end[i] = segments[-1]['end'] + offset
+    elapsed = time.perf_counter() - started
+    metrics.observe('transcribe_batch', elapsed)
+    metrics.record_tokens('transcribe_batch', sum(len(d.tokens) for d in decoded), elapsed)
+    return results
+
+def enqueue(answer_id):
+    """
+    Adds an answer to the shared list awaiting batched transcription.
+    """
+    with cache_lock(_LOCK_KEY):
+        pending = cache.get(_PENDING_KEY) or []
+        if answer_id not in pending:
+            pending.append(answer_id)
+        cache.set(_PENDING_KEY, pending, timeout=3600)
+
+def claim(answer_id, limit):
+    """
+    Takes `answer_id` and up to `limit - 1` other pending answers, oldest
+    first, and marks them claimed until release_claims() or
+    TRANSCRIBE_CLAIM_SECONDS. Returns [] if `answer_id` is not pending.
+    """
+    with cache_lock(_LOCK_KEY):
+        pending = cache.get(_PENDING_KEY) or []
+        if answer_id not in pending:
+            return []
+        others = [a for a in pending if a != answer_id][:limit - 1]
+        claimed = [answer_id] + others
+        cache.set(_PENDING_KEY, [a for a in pending if a not in claimed], timeout=3600)
+        cache.set_many({_CLAIM_KEY.format(a): 1 for a in claimed},
+                       timeout=getattr(settings, 'TRANSCRIBE_CLAIM_SECONDS', 600))
+    return claimed
+
+def defer(answer_id):
+    """
+    If `answer_id` is in a batch another worker is still transcribing, notes
+    that its task handed over to that worker and returns True; the batch
+    owner re-queues it from release_claims().
+    """
+    with cache_lock(_LOCK_KEY):
+        if cache.get(_CLAIM_KEY.format(answer_id)) is None:
+            return False
+        cache.set(_DEFERRED_KEY.format(answer_id), 1, timeout=getattr(settings, 'TRANSCRIBE_CLAIM_SECONDS', 600))
+    return True
+
+def release_claims(answer_ids):
+    """
+    Ends a batch. Returns the claimed answers whose tasks were deferred to
+    it, so the caller can queue them again.
+    """
+    with cache_lock(_LOCK_KEY):
+        deferred = cache.get_many([_DEFERRED_KEY.format(a) for a in answer_ids])
+        cache.delete_many([_CLAIM_KEY.format(a) for a in answer_ids]
+                          + [_DEFERRED_KEY.format(a) for a in answer_ids])
+    return [a for a in answer_ids if _DEFERRED_KEY.format(a) in deferred]
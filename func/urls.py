@@ -14,4 +14,15 @@ urlpatterns = [
     path('notifications/', views.NotificationListView.as_view(), name='notifications'),
     path('notifications/<int:notification_id>/read/', views.NotificationMarkReadView.as_view(), name='mark-read'),
     path('signup/', views.SignupView.as_view(), name='signup'),
+    path('cohorts/', views.CohortCreateView.as_view(), name='cohort-create'),
+    path('cohorts/<int:cohort_id>/', views.CohortStatusView.as_view(), name='cohort-status'),
+    path('fit/ranking/', views.RoleFitRankingView.as_view(), name='fit-ranking'),
+    path('analytics/rollups/', views.AnalyticsRollupListView.as_view(), name='analytics-rollups'),
+    path('analytics/summary/', views.AnalyticsSummaryView.as_view(), name='analytics-summary'),
+    path('queue/status/', views.QueueStatusView.as_view(), name='queue-status'),
+    path('search/', views.SearchView.as_view(), name='search'),
+    path('uploads/presign/', views.UploadPresignView.as_view(), name='upload-presign'),
+    path('uploads/local/<str:token>/', views.local_upload_view, name='local-upload'),
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('health/workers/', views.WorkerHealthView.as_view(), name='worker-health'),
 ]
@@ -1,58 +1,121 @@
-import json
+import hashlib
+import time
+from datetime import timedelta
+from django.conf import settings
 from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.utils.decorators import method_decorator
 from rest_framework import status, permissions, viewsets, generics
 from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.generics import CreateAPIView, RetrieveUpdateAPIView, ListAPIView
-from rest_framework.parsers import MultiPartParser, FormParser
-from .models import InterviewSession, Notification, Question
-from .serializers import NotificationSerializer, QuestionAdminSerializer, UserSerializer, ResumeSerializer, InterviewSessionSerializer, QuestionSerializer, AnswerSerializer, InterviewHistorySerializer, UserSignupSerializer
-from .tasks import full_answer_analysis
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from .models import Answer, AnswerAnalysis, Cohort, InterviewSession, Notification, Question, Profile, Resume, DailyRollup
+from .serializers import CohortCreateSerializer, DailyRollupSerializer, NotificationSerializer, QuestionAdminSerializer, UserSerializer, ResumeSerializer, InterviewSessionSerializer, QuestionSerializer, AnswerSerializer, InterviewHistorySerializer, UserSignupSerializer
+from .tasks import full_answer_analysis, warm_fit_embeddings
 from .parser import parse_resume_file, execute
 from django.template.loader import render_to_string
-from django.http import HttpResponse
+from django.http import HttpResponse, Http404, JsonResponse
+from django.core import signing
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_http_methods
 from weasyprint import HTML
+from . import metrics, worker
+from .scoring import rank_resumes
+from .analytics import summarize
+from .cohorts import create_cohort
+from . import percentiles, routing, scheduler, search
+from .storage import UPLOAD_PREFIXES, local_copy, presign_upload, read_upload_token
+from .transcriber import enqueue as enqueue_transcription
 
 class UserProfileView(RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
     def get_object(self):
-        return self.request.user
+        if self.request.method in permissions.SAFE_METHODS:
+            return self.request.user
+        # Updates start from the current row, not the cached principal
+        return type(self.request.user).objects.select_related('profile').get(pk=self.request.user.pk)
+
+class ReplicaReadMixin:
+    """
+    Serves safe requests from the read replica, except for users who wrote
+    within the last REPLICA_PIN_SECONDS (read-your-writes).
+    """
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)   # authenticates the user first
+        if request.method in permissions.SAFE_METHODS and not routing.is_pinned(request.user.id):
+            self._replica_token = routing.use_replica()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            routing.release(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+def _over_capacity(wait):
+    """
+    503 telling the client when to retry because live queues are over their SLO.
+    """
+    resp = Response(
+        {'detail': 'Interview capacity is full, please retry shortly.', 'estimated_wait_seconds': wait},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    resp['Retry-After'] = str(scheduler.retry_after(wait))
+    return resp
 
 class ResumeUploadView(CreateAPIView):
     serializer_class = ResumeSerializer
     permission_classes = [permissions.IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [MultiPartParser, FormParser, JSONParser]
     def perform_create(self, serializer):
         resume = serializer.save(user=self.request.user)
+        routing.pin_primary(self.request.user.id)
         try:
-            parsed = parse_resume_file(resume.resume_file.path)
-            resume.parsed_text = json.dumps(parsed)
-            resume.save()
+            resume.set_parsed_data(parse_resume_file(local_copy(resume.resume_file)))
         except Exception as e:
-            resume.parsed_text = json.dumps({'error': str(e)})
-            resume.save()
+            resume.set_parsed_data({'error': str(e)})
+        scheduler.dispatch(warm_fit_embeddings, args=[resume.id], klass=scheduler.BULK)
         session = InterviewSession.objects.create(user=self.request.user)
         self.session_id = session.id
     def create(self, request, *args, **kwargs):
+        admitted, wait = scheduler.admit()
+        if not admitted:
+            return _over_capacity(wait)
         resp = super().create(request, *args, **kwargs)
         resp.data['session_id'] = str(self.session_id)
+        resp.data['estimated_wait_seconds'] = wait
         return resp
 
 class StartInterviewSessionView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     def post(self, request, session_id):
         session = get_object_or_404(InterviewSession, id=session_id, user=request.user)
+        session.user = request.user   # the cached principal, profile included
+        # Sessions already under way are never turned away, only new starts
+        if not session.questions.exists():
+            admitted, wait = scheduler.admit()
+            if not admitted:
+                return _over_capacity(wait)
+        if 'adaptive' in request.data and not session.questions.exists():
+            session.adaptive = str(request.data['adaptive']).lower() in ('1', 'true', 'yes')
+            session.save(update_fields=['adaptive'])
         resume = request.user.resumes.order_by('-created_at').first()
         
-        # Parse and save resume data
-        parsed = parse_resume_file(resume.resume_file.path)
-        resume.parsed_text = json.dumps(parsed)
-        resume.save()
+        # Reuse the structured data stored at upload; parse only if it is missing
+        parsed = resume.parsed_data
+        if not parsed or 'error' in parsed:
+            parsed = parse_resume_file(local_copy(resume.resume_file))
+            resume.set_parsed_data(parsed)
         
         # Generate questions if none exist
         if not session.questions.exists():
-            execute(session, resume.resume_file.path)  # Fixed function call
+            execute(session, local_copy(resume.resume_file), resume_data=parsed)
         
         session_data = InterviewSessionSerializer(session).data
         first_q = session.questions.order_by('created_at').first()
@@ -63,92 +126,201 @@ class NextQuestionView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request, session_id):
         session = get_object_or_404(InterviewSession, id=session_id, user=request.user)
-        next_qs = session.questions.exclude(answers__isnull=False).order_by('created_at')
-        if not next_qs.exists():
+        q = session.next_question()
+        if q is None:
             return Response({'detail': 'No more questions.'}, status=status.HTTP_204_NO_CONTENT)
-        q = next_qs.first()
         return Response(QuestionSerializer(q).data, status=status.HTTP_200_OK)
 
 class SubmitAnswerView(CreateAPIView):
     serializer_class = AnswerSerializer
-    parser_classes   = [MultiPartParser, FormParser]
+    parser_classes   = [MultiPartParser, FormParser, JSONParser]
     permission_classes = [permissions.IsAuthenticated]
     def perform_create(self, serializer):
         question = get_object_or_404(Question, id=self.kwargs['question_id'], session__user=self.request.user)
         answer   = serializer.save(question=question)
+        routing.pin_primary(self.request.user.id)
         # **kick off** the full pipeline
-        full_answer_analysis.delay(str(answer.id))
+        self.estimated_wait = scheduler.estimated_wait(scheduler.INTERACTIVE)
+        if getattr(settings, 'TRANSCRIBE_BATCHING', False):
+            enqueue_transcription(str(answer.id))   # the first worker to start takes it with the others
+        scheduler.dispatch(full_answer_analysis, args=[str(answer.id)], kwargs={'enqueued_at': time.time()},
+                           user_id=self.request.user.id, klass=scheduler.INTERACTIVE)
         Notification.objects.create(
             user    = self.request.user,
             session = question.session,
             message = f"Your answer for question '{question.text[:30]}…' was submitted and is being analyzed."
         )
+    def create(self, request, *args, **kwargs):
+        resp = super().create(request, *args, **kwargs)
+        resp.data['estimated_wait_seconds'] = self.estimated_wait
+        return resp
+
+def _answer_suggestions(question, analysis, ranks, role):
+    """
+    Suggestions for one answer from its percentile ranks among peers; the
+    fixed relevance threshold applies until the peer group has enough data.
+    """
+    band = getattr(settings, 'SCORE_SUGGEST_PERCENTILE', 25)
+    topic = f"Question '{question.text[:30]}...'"
+    tips = []
+    relevance = ranks.get('relevance')
+    if relevance is None:
+        if analysis.relevance_score is not None and analysis.relevance_score < 0.7:
+            tips.append(f"{topic} could use more relevance.")
+    elif relevance < band:
+        tips.append(f"{topic}: {100 - relevance:.0f}% of {role} candidates gave more relevant answers.")
+    pace = ranks.get('pace')
+    if pace is not None and pace < band:
+        tips.append(f"{topic}: you spoke slower than {100 - pace:.0f}% of {role} candidates.")
+    elif pace is not None and pace > 100 - band:
+        tips.append(f"{topic}: you spoke faster than {pace:.0f}% of {role} candidates.")
+    pause = ranks.get('pause')
+    if pause is not None and pause > 100 - band:
+        tips.append(f"{topic}: your pauses were longer than {pause:.0f}% of {role} candidates'.")
+    return tips
+
+def build_session_report(session, user):
+    """
+    Collects per-answer analysis, overall score and suggestions for a session.
+    Each answer is ranked against the candidate's role/difficulty/category
+    peers using the streaming score sketches (func.percentiles).
+    """
+    detailed = []
+    scores = []
+    suggestions = []
+
+    # Fixed profile access with error handling
+    role = 'Unknown'
+    profile = getattr(user, 'profile', None)
+    if profile:
+        role = profile.get_preferred_role_display()
+    peers = percentiles.peer_digests(profile)
+
+    for question in session.questions.prefetch_related('answers__analysis'):
+        for answer in question.answers.all():
+            if hasattr(answer, 'analysis'):
+                a = answer.analysis
+                ranks = percentiles.percentile_ranks(peers, {
+                    metric: getattr(a, field) for metric, field in percentiles.METRICS.items()
+                })
+                detailed.append({
+                    "question_id":        str(question.id),
+                    "question_text":      question.text,
+                    "answer_id":          str(answer.id),
+                    "transcript":         answer.transcript,
+                    "tone_score":         a.tone_score,
+                    "pace_wpm":           a.pace_wpm,
+                    "fluency_score":      a.fluency_score,
+                    "relevance_score":    a.relevance_score,
+                    "percentiles":        ranks,
+                })
+                if a.relevance_score is not None:
+                    scores.append(a.relevance_score)
+                suggestions.extend(_answer_suggestions(question, a, ranks, role))
+    overall = sum(scores) / len(scores) if scores else 0
+
+    return {
+        'session_id':   session.id,
+        'role':         role,
+        'started_at':   session.started_at,
+        'ended_at':     session.ended_at,  # Fixed field name
+        'questions':    detailed,
+        'overall_score': overall,
+        'benchmarked':   bool(peers),
+        'suggestions':   suggestions or ["Great job! Keep it up."],
+    }
+
+def render_report_pdf(report):
+    """
+    Renders a session report to PDF bytes.
+    """
+    with metrics.timed('render_pdf'):
+        html_string = render_to_string('report_template.html', { 'report': report })
+        return HTML(string=html_string).write_pdf()
+
+def _etag(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+def _memoized(request, name, compute):
+    # etag_func and last_modified_func share one aggregate query per request
+    if not hasattr(request, name):
+        setattr(request, name, compute())
+    return getattr(request, name)
+
+def _report_state(request, session_id):
+    # The peer group (profile) and ended_at change the report without touching an analysis
+    return _memoized(request, '_report_state', lambda: InterviewSession.objects.filter(
+        id=session_id, user=request.user,
+    ).values(
+        'ended_at', 'user__profile__preferred_role', 'user__profile__difficulty', 'user__profile__category',
+    ).annotate(
+        n=Count('questions__answers__analysis'), latest=Max('questions__answers__analysis__updated_at'),
+    ).first() or {})
+
+def _report_etag(request, session_id):
+    # Peer percentile ranks move without this session changing; they refresh per period
+    period = int(time.time() // getattr(settings, 'REPORT_PEER_REFRESH_SECONDS', 3600))
+    return _etag(str(session_id), *_report_state(request, session_id).values(), period)
+
+def _report_last_modified(request, session_id):
+    state = _report_state(request, session_id)
+    return max([v for v in (state.get('latest'), state.get('ended_at')) if v], default=None)
 
-class SessionAnalysisView(APIView):
+_report_conditional = method_decorator(
+    condition(etag_func=_report_etag, last_modified_func=_report_last_modified), name='get')
+
+@_report_conditional
+class SessionAnalysisView(ReplicaReadMixin, APIView):
+    """
+    The session report; polls get 304 until an analysis of the session lands.
+    """
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request, session_id):
         session = get_object_or_404(InterviewSession, id=session_id, user=request.user)
-        detailed = []
-        scores = []
-        suggestions = []
-        for question in session.questions.prefetch_related('answers__analysis'):
-            for answer in question.answers.all():
-                if hasattr(answer, 'analysis'):
-                    a = answer.analysis
-                    detailed.append({
-                        "question_id":        str(question.id),
-                        "question_text":      question.text,
-                        "answer_id":          str(answer.id),
-                        "transcript":         answer.transcript,
-                        "tone_score":         a.tone_score,
-                        "pace_wpm":           a.pace_wpm,
-                        "fluency_score":      a.fluency_score,
-                        "relevance_score":    a.relevance_score,
-                    })
-                    if a.relevance_score is not None:
-                        scores.append(a.relevance_score)
-                        if a.relevance_score < 0.7:
-                            suggestions.append(
-                                f"Question '{question.text[:30]}...' could use more relevance."
-                            )
-        overall = sum(scores) / len(scores) if scores else 0
-        
-        # Fixed profile access with error handling
-        role = 'Unknown'
-        if hasattr(request.user, 'profile') and request.user.profile:
-            role = request.user.profile.get_preferred_role_display()
-        
-        report_payload = {
-            'session_id':   session.id,
-            'role':         role,
-            'started_at':   session.started_at,
-            'ended_at':     session.ended_at,  # Fixed field name
-            'questions':    detailed,
-            'overall_score': overall,
-            'suggestions':   suggestions or ["Great job! Keep it up."],
-        }
-        serializer = InterviewSessionSerializer(report_payload)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
-class SessionAnalysisPDFView(APIView):
+        return Response(build_session_report(session, request.user), status=status.HTTP_200_OK)
+
+@_report_conditional
+class SessionAnalysisPDFView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request, session_id):
-        analysis_data = SessionAnalysisView().get(request, session_id).data
-        html_string = render_to_string('report_template.html', { 'report': analysis_data })
-        pdf_file = HTML(string=html_string).write_pdf()
+        session = get_object_or_404(InterviewSession, id=session_id, user=request.user)
+        pdf_file = render_report_pdf(build_session_report(session, request.user))
         response = HttpResponse(pdf_file, content_type='application/pdf')
         response['Content-Disposition'] = f'attachment; filename="report_{session_id}.pdf"'
         return response
-    
-class InterviewHistoryView(ListAPIView):
+
+def _history_state(request):
+    return _memoized(request, '_history_state', lambda: InterviewSession.objects.filter(user=request.user).aggregate(
+        sessions=Count('id', distinct=True), answers=Count('questions__answers', distinct=True),
+        started=Max('started_at'), ended=Max('ended_at'),
+        asked=Max('questions__created_at'), answered=Max('questions__answers__responded_at'),
+    ))
+
+def _history_etag(request):
+    return _etag(request.get_full_path(), *_history_state(request).values())
+
+def _history_last_modified(request):
+    stamps = [v for k, v in _history_state(request).items() if k not in ('sessions', 'answers') and v]
+    return max(stamps, default=None)
+
+@method_decorator(condition(etag_func=_history_etag, last_modified_func=_history_last_modified), name='get')
+class InterviewHistoryView(ReplicaReadMixin, ListAPIView):
     """
     List all past interview sessions for the current user.
     """
     serializer_class = InterviewHistorySerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Rows are .values(): only real columns and annotations can be ordered on
+    ordering_fields = ['started_at', 'ended_at', 'total_questions', 'answered_questions']
 
     def get_queryset(self):
-        return InterviewSession.objects.filter(user=self.request.user).order_by('-started_at')
+        return (
+            InterviewSession.objects.filter(user=self.request.user)
+            .annotate(total_questions=Count('questions', distinct=True),
+                      answered_questions=Count('questions__answers', distinct=True))
+            .order_by('-started_at')
+            .values('id', 'started_at', 'ended_at', 'total_questions', 'answered_questions')
+        )
     
 class QuestionAdminViewSet(viewsets.ModelViewSet):
     """
@@ -170,11 +342,22 @@ class QuestionAdminViewSet(viewsets.ModelViewSet):
             qs = qs.filter(category=cat)
         return qs
     
-class NotificationListView(generics.ListAPIView):
+def _notifications_etag(request):
+    # ETag only: marking one read changes the list without a newer timestamp
+    state = Notification.objects.filter(user=request.user).aggregate(
+        n=Count('id'), unread=Count('id', filter=Q(read=False)), latest=Max('created_at'))
+    return _etag(request.get_full_path(), state['n'], state['unread'], state['latest'])
+
+@method_decorator(condition(etag_func=_notifications_etag), name='get')
+class NotificationListView(ReplicaReadMixin, generics.ListAPIView):
     serializer_class   = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    ordering_fields    = ['created_at', 'read']
     def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user).order_by('-created_at')
+        return (
+            Notification.objects.filter(user=self.request.user).order_by('-created_at')
+            .values('id', 'message', 'created_at', 'read', 'session_id')
+        )
         
 class NotificationMarkReadView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -189,4 +372,219 @@ class SignupView(generics.CreateAPIView):
     User registration endpoint
     """
     serializer_class = UserSignupSerializer
-    permission_classes = [permissions.AllowAny]
\ No newline at end of file
+    permission_classes = [permissions.AllowAny]
+
+def _limit_param(params, default, maximum):
+    try:
+        limit = int(params.get('limit', default))
+    except (TypeError, ValueError):
+        limit = 0
+    if limit < 1:
+        raise ValidationError({'limit': 'Must be a positive integer.'})
+    return min(limit, maximum)
+
+class RoleFitRankingView(ReplicaReadMixin, APIView):
+    """
+    Ranks candidates' latest resumes by embedding fit for a role.
+    GET ?role=SDE&limit=50, or POST the same fields plus `job_description`.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    def get(self, request):
+        return self._rank(request.query_params)
+    def post(self, request):
+        return self._rank(request.data)
+    def _rank(self, params):
+        role = params.get('role')
+        if role not in dict(Profile.ROLES):
+            return Response({'detail': 'Unknown role.'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = _limit_param(params, 50, 500)
+        newest = Resume.objects.filter(user=OuterRef('user')).order_by('-created_at', '-id').values('id')[:1]
+        latest = list(
+            Resume.objects.filter(user__profile__preferred_role=role, id=Subquery(newest))
+            .select_related('user')
+            .only('id', 'parsed_data', 'user', 'user__username')
+            .order_by('user_id')
+        )
+        ranked = rank_resumes(latest, role, params.get('job_description'), limit)
+        return Response({'role': role, 'pool_size': len(latest), 'results': ranked})
+
+class CohortCreateView(APIView):
+    """
+    Recruiter endpoint: invite a cohort of candidates in one request.
+    Multipart body: `name`, `candidates` (JSON list of {username, email,
+    preferred_role, difficulty, category, resume}) and one resume file per
+    candidate, in the field named by `resume` (default `resume_<index>`).
+    """
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser, FormParser]
+    def post(self, request):
+        serializer = CohortCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        candidates = serializer.validated_data['candidates']
+        usernames = [c['username'] for c in candidates]
+        if len(set(usernames)) != len(usernames):
+            return Response({'detail': 'Duplicate usernames in cohort.'}, status=status.HTTP_400_BAD_REQUEST)
+        missing = [c['username'] for i, c in enumerate(candidates)
+                   if (c.get('resume') or f'resume_{i}') not in request.FILES]
+        if missing:
+            return Response({'detail': 'Missing resume files.', 'candidates': missing},
+                            status=status.HTTP_400_BAD_REQUEST)
+        cohort, sessions = create_cohort(serializer.validated_data['name'], request.user, candidates, request.FILES)
+        return Response({
+            'cohort_id': cohort.id,
+            'sessions':  [{'username': u, 'session_id': str(sid)} for u, sid in sessions],
+        }, status=status.HTTP_201_CREATED)
+
+class CohortStatusView(ReplicaReadMixin, APIView):
+    """
+    Progress of a cohort: how many sessions already have questions ready.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    def get(self, request, cohort_id):
+        cohort = get_object_or_404(Cohort, id=cohort_id)
+        sessions = cohort.sessions.all()
+        ready = sessions.filter(questions__isnull=False).distinct().count()
+        return Response({'cohort_id': cohort.id, 'name': cohort.name,
+                         'sessions': sessions.count(), 'ready': ready})
+
+class QueueStatusView(APIView):
+    """
+    Estimated wait per priority class, for clients to show before starting.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    def get(self, request):
+        admitted, wait = scheduler.admit()
+        return Response({
+            'accepting_sessions': admitted,
+            'estimated_wait_seconds': {
+                scheduler.INTERACTIVE: wait,
+                scheduler.BULK: scheduler.estimated_wait(scheduler.BULK),
+            },
+        })
+
+def _date_param(params, name):
+    if not params.get(name):
+        return None
+    try:
+        value = parse_date(params[name])
+    except ValueError:   # well formed but not a real date
+        value = None
+    if value is None:
+        raise ValidationError({name: 'Dates must be YYYY-MM-DD.'})
+    return value
+
+def _filter_rollups(qs, params):
+    for field in ('role', 'difficulty', 'category'):
+        if params.get(field):
+            qs = qs.filter(**{field: params[field]})
+    since, until = _date_param(params, 'since'), _date_param(params, 'until')
+    if since:
+        qs = qs.filter(day__gte=since)
+    if until:
+        qs = qs.filter(day__lte=until)
+    return qs
+
+class AnalyticsRollupListView(ReplicaReadMixin, ListAPIView):
+    """
+    Read-only daily rollups; filter with ?role=&difficulty=&category=&since=&until=.
+    """
+    serializer_class   = DailyRollupSerializer
+    permission_classes = [permissions.IsAdminUser]
+    def get_queryset(self):
+        qs = DailyRollup.objects.order_by('-day', 'role', 'difficulty', 'category')
+        return _filter_rollups(qs, self.request.query_params)
+
+class AnalyticsSummaryView(ReplicaReadMixin, APIView):
+    """
+    Per-role totals over a date range, combined from the daily rollups.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    def get(self, request):
+        rollups = _filter_rollups(DailyRollup.objects.all(), request.query_params)
+        return Response({'results': summarize(rollups)})
+
+class SearchView(ReplicaReadMixin, APIView):
+    """
+    Ranked full-text search over answer transcripts or question texts.
+    GET ?q=&kind=answer|question&role=&since=&until=&limit=
+    """
+    permission_classes = [permissions.IsAdminUser]
+    def get(self, request):
+        params = request.query_params
+        kind = params.get('kind', 'answer')
+        if kind not in ('answer', 'question'):
+            return Response({'detail': 'Unknown kind.'}, status=status.HTTP_400_BAD_REQUEST)
+        since = parse_date(params['since']) if params.get('since') else None
+        until = parse_date(params['until']) if params.get('until') else None
+        if (params.get('since') and since is None) or (params.get('until') and until is None):
+            return Response({'detail': 'Dates must be YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = _limit_param(params, 20, 100)
+        ranked = search.search(params.get('q', ''), kind, role=params.get('role'), since=since,
+                               until=until + timedelta(days=1) if until else None, limit=limit)
+        if kind == 'answer':
+            rows = Answer.objects.filter(id__in=[pk for pk, _ in ranked]).select_related('question')
+            found = {a.id: {'id': str(a.id), 'question_id': str(a.question_id), 'question': a.question.text,
+                            'responded_at': a.responded_at, 'text': a.transcript} for a in rows}
+        else:
+            rows = Question.objects.filter(id__in=[pk for pk, _ in ranked])
+            found = {q.id: {'id': str(q.id), 'session_id': str(q.session_id),
+                            'created_at': q.created_at, 'text': q.text} for q in rows}
+        results = []
+        for pk, score in ranked:
+            if pk in found:   # deleted since it was indexed
+                item = found[pk]
+                item['snippet'] = search.snippet(item.pop('text'), params.get('q', ''))
+                results.append(dict(item, score=score))
+        return Response({'kind': kind, 'results': results})
+
+class UploadPresignView(APIView):
+    """
+    Presigned upload for a resume or answer audio. The client sends the file
+    to the returned URL, then passes the key as `resume_key` / `audio_key`.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    def post(self, request):
+        kind = request.data.get('kind')
+        if kind not in UPLOAD_PREFIXES:
+            return Response({'kind': f"Must be one of: {', '.join(UPLOAD_PREFIXES)}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(presign_upload(kind, request.user.id, request.data.get('filename'),
+                                       request.data.get('content_type')), status=status.HTTP_201_CREATED)
+
+@csrf_exempt
+@require_http_methods(['PUT'])
+def local_upload_view(request, token):
+    """
+    Local stand-in for a presigned S3 upload: the signed token names the key.
+    """
+    try:
+        key, max_bytes = read_upload_token(token)
+    except signing.BadSignature:
+        return JsonResponse({'detail': 'Invalid or expired upload URL.'}, status=403)
+    length = int(request.META.get('CONTENT_LENGTH') or 0)
+    if not 0 < length <= max_bytes:
+        return JsonResponse({'detail': f'Upload must be 1 to {max_bytes} bytes.'}, status=400)
+    if default_storage.exists(key):
+        return JsonResponse({'detail': 'Already uploaded.'}, status=409)
+    default_storage.save(key, File(request, name=key))
+    return JsonResponse({'key': key}, status=201)
+
+class WorkerHealthView(APIView):
+    """
+    Worker health: per process, the models loaded and warm (loaded and used
+    by a finished task), memory and whether it is being recycled.
+    503 while no worker has a warm model.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    def get(self, request):
+        reports = worker.collect_memory()
+        healthy = any(r['warm'] and not r['recycling'] for r in reports)
+        return Response({'healthy': healthy, 'workers': reports},
+                        status=status.HTTP_200_OK if healthy else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint for pipeline stage metrics.
+    """
+    if not metrics.ENABLED:
+        raise Http404("Pipeline metrics are disabled")
+    return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4')
@@ -0,0 +1,206 @@
+import ctypes
+import gc
+import logging
+import os
+import sys
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('func.worker')
+
+_MEMORY_KEY       = 'worker:memory:{}'     # pid -> memory report of one worker process
+_MEMORY_PIDS_KEY  = 'worker:memory:pids'
+
+# Loader per WORKER_PRELOAD_MODELS name; imported lazily so the web process never loads torch
+def _load_whisper():
+    from .transcriber import _get_whisper
+    return _get_whisper()
+
+def _load_analyzer():
+    from .analyzer import _load_model
+    return _load_model()
+
+def _load_generator():
+    from .parser import _load_generator
+    return _load_generator()
+
+LOADERS = {
+    'whisper':   _load_whisper,
+    'analyzer':  _load_analyzer,
+    'generator': _load_generator,
+}
+
+# Where each model lives once loaded: name -> (module, global)
+_MODEL_GLOBALS = {
+    'whisper':   ('func.transcriber', '_whisper_model'),
+    'analyzer':  ('func.analyzer', '_analyzer_model'),
+    'generator': ('func.parser', '_model'),
+    'ner':       ('func.parser', 'nlp'),
+    'embedder':  ('func.scoring', '_embedder'),
+}
+
+_tasks_served      = 0
+_warm              = set()    # models loaded when this process finished a task
+_recycle_requested = False
+
+def preload_models(names=None):
+    """
+    Loads models in the worker's parent process before the prefork pool
+    starts. Children inherit the weights copy-on-write; since inference
+    never writes to them, the pages stay shared across all children.
+    Objects are then frozen out of the garbage collector so collections in
+    the children do not touch (and so copy) the inherited pages.
+    """
+    import torch
+    names = getattr(settings, 'WORKER_PRELOAD_MODELS', ()) if names is None else names
+    if not names:
+        return []
+    if torch.cuda.is_available():
+        # CUDA cannot be initialised before fork; GPU workers load per child
+        logger.warning("Skipping model preload: CUDA is available and does not survive fork")
+        return []
+    loaded = []
+    for name in names:
+        start = time.perf_counter()
+        LOADERS[name]()
+        loaded.append(name)
+        logger.info("Preloaded %s in %.1fs", name, time.perf_counter() - start)
+    gc.collect()
+    gc.freeze()
+    return loaded
+
+def configure_child():
+    """
+    Per-child setup after fork: caps torch intra-op threads so N children
+    do not each start one thread per core, and lets the watchdog recycle
+    the child through billiard's memory check.
+    """
+    threads = getattr(settings, 'WORKER_TORCH_THREADS', None)
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    _install_recycle_hook()
+
+def _install_recycle_hook():
+    """
+    billiard replaces a child gracefully -- after its current result is sent
+    -- when mem_rss() exceeds CELERY_WORKER_MAX_MEMORY_PER_CHILD. The check
+    is made on private memory instead of RSS, which counts the preloaded
+    model pages every child shares; reporting an oversized value once the
+    watchdog asks for a recycle reuses the same path.
+    """
+    from billiard import pool
+    real_mem_rss = pool.mem_rss
+
+    def mem_rss():
+        if _recycle_requested:
+            return 1 << 62
+        private = memory_usage()['private']
+        return private // 1024 if private else real_mem_rss()   # KiB, like billiard's
+    pool.mem_rss = mem_rss
+
+def loaded_models():
+    return sorted(
+        name for name, (module, attr) in _MODEL_GLOBALS.items()
+        if getattr(sys.modules.get(module), attr, None) is not None
+    )
+
+def torch_memory():
+    """
+    Bytes allocated and reserved by torch's CUDA caching allocator (0 on CPU).
+    """
+    torch = sys.modules.get('torch')
+    if torch is None or not torch.cuda.is_available() or not torch.cuda.is_initialized():
+        return {'torch_allocated': 0, 'torch_reserved': 0}
+    return {'torch_allocated': torch.cuda.memory_allocated(), 'torch_reserved': torch.cuda.memory_reserved()}
+
+def _malloc_trim():
+    # Hands freed heap pages back to the OS (glibc only)
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+def free_caches():
+    """
+    Drops per-task state and cached allocations between tasks: the kept
+    analysis KV cache, Python garbage, torch's CUDA cache and free malloc
+    arenas.
+    """
+    analyzer = sys.modules.get('func.analyzer')
+    if analyzer is not None:
+        analyzer.discard_state()
+    gc.collect()
+    torch = sys.modules.get('torch')
+    if torch is not None and torch.cuda.is_available() and torch.cuda.is_initialized():
+        torch.cuda.empty_cache()
+    _malloc_trim()
+
+def after_task():
+    """
+    Watchdog run after every task: frees caches, measures memory and asks
+    for a graceful recycle once WORKER_RECYCLE_PRIVATE_MB (memory not shared
+    with other children) or WORKER_RECYCLE_TORCH_MB is still exceeded.
+    """
+    global _tasks_served, _recycle_requested
+    _tasks_served += 1
+    _warm.update(loaded_models())
+    free_caches()
+    report = publish_memory()
+    private_limit = getattr(settings, 'WORKER_RECYCLE_PRIVATE_MB', None)
+    torch_limit = getattr(settings, 'WORKER_RECYCLE_TORCH_MB', None)
+    over = []
+    if private_limit and report['private'] > private_limit * 2 ** 20:
+        over.append(f"private {report['private'] >> 20} MiB")
+    if torch_limit and report['torch_reserved'] > torch_limit * 2 ** 20:
+        over.append(f"torch {report['torch_reserved'] >> 20} MiB")
+    if over and not _recycle_requested:
+        _recycle_requested = True
+        logger.warning("Recycling worker %s after this task: %s", os.getpid(), ", ".join(over))
+        publish_memory()
+    return report
+
+def memory_usage(pid='self'):
+    """
+    Memory of a process in bytes from /proc: rss, pss (shared pages split
+    between the processes mapping them), shared and private.
+    """
+    fields = {'Rss': 'rss', 'Pss': 'pss', 'Shared_Clean': 'shared', 'Shared_Dirty': 'shared',
+              'Private_Clean': 'private', 'Private_Dirty': 'private'}
+    usage = {'rss': 0, 'pss': 0, 'shared': 0, 'private': 0}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as fh:
+            for line in fh:
+                key, _, rest = line.partition(':')
+                if key in fields:
+                    usage[fields[key]] += int(rest.split()[0]) * 1024
+    except OSError:
+        # No smaps_rollup (non-Linux or old kernel): RSS only
+        import resource
+        usage['rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return usage
+
+def publish_memory():
+    """
+    Stores this process's memory and model report in the shared cache.
+    """
+    pid = os.getpid()
+    models = loaded_models()
+    report = dict(memory_usage(), **torch_memory(), pid=pid, at=time.time(), models=models,
+                  warm=sorted(_warm & set(models)), tasks=_tasks_served, recycling=_recycle_requested)
+    cache.set(_MEMORY_KEY.format(pid), report, timeout=getattr(settings, 'WORKER_REPORT_TIMEOUT', 300))
+    pids = cache.get(_MEMORY_PIDS_KEY) or []
+    if pid not in pids:
+        cache.set(_MEMORY_PIDS_KEY, pids + [pid], timeout=None)
+    return report
+
+def collect_memory():
+    """
+    Reports of every worker process that published one recently.
+    """
+    pids = cache.get(_MEMORY_PIDS_KEY) or []
+    reports = cache.get_many([_MEMORY_KEY.format(pid) for pid in pids])
+    if len(reports) != len(pids):
+        cache.set(_MEMORY_PIDS_KEY, [r['pid'] for r in reports.values()], timeout=None)
+    return sorted(reports.values(), key=lambda r: r['pid'])
@@ -1,8 +1,12 @@
-# smartinterviewer/celery.py
+# smartinterviewer_ai/celery.py
 import os
 from celery import Celery
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smartinterviewer.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smartinterviewer_ai.settings')
 app = Celery('smartinterviewer')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
+
+# Run workers with `-Q celery,bulk`: interactive work (func.scheduler.INTERACTIVE)
+# lives on the default queue, bulk work on `bulk`, and message priorities
+# order tasks inside each queue.
@@ -24,6 +24,53 @@ MODEL_DIR = BASE_DIR / 'model-best'
 # A “sandbox” folder for your standalone parser tests
 RESUME_DIR = BASE_DIR / 'resume'
 
+# Resume text extraction: 'auto' picks pypdfium2, then PyMuPDF, then pdfminer
+RESUME_PDF_BACKEND = 'auto'
+RESUME_MAX_PAGES = 5              # pages beyond this are ignored
+RESUME_EXTRACT_WORKERS = 1        # >1 enables a long-lived pool for page-parallel extraction
+RESUME_PARALLEL_MIN_PAGES = 8     # shorter PDFs are always extracted in-process
+
+# Resume NER: 'full' (model-best as trained), 'fast' (model-best on text truncated
+# to RESUME_NER_MAX_TOKENS) or 'distilled' (tok2vec student from `manage.py
+# distill_ner`, also truncated; model-best is used if it fails to load)
+RESUME_NER_MODE = 'full'
+RESUME_NER_MAX_TOKENS = 1500
+RESUME_NER_DISTILLED_DIR = BASE_DIR / 'model-fast' / 'model-best'
+
+# Batched Whisper (opt-in): answers waiting in the queue are transcribed in one batch.
+# Lower fidelity than one at a time: windows are not conditioned on the previous text.
+TRANSCRIBE_BATCHING = False
+TRANSCRIBE_BATCH_SIZE = 8               # windows (up to 30 s) per encoder/decoder pass
+TRANSCRIBE_CLAIM_SECONDS = 600          # a batch claim expires if its worker dies
+
+# Prompt token budgets, counted with each model's own tokenizer
+PROMPT_FIELD_TOKEN_BUDGETS = {'name': 16, 'role': 32, 'skills': 128, 'experience': 192, 'education': 64}
+ANALYZER_ANSWER_TOKEN_BUDGET = 768
+PROMPT_LENGTH_BUCKETS = (256, 512, 768, 1024, 1536, 2048)   # batch padding targets
+
+# Assisted (speculative) decoding: a small draft model proposes tokens that the
+# main model verifies, so outputs keep the main model's distribution.
+# None turns it off; a draft with a different vocabulary is ignored (with a warning).
+QUESTION_ASSISTANT_MODEL = None     # draft for phi-2, e.g. 'microsoft/phi-1_5' (same tokenizer)
+ANALYZER_ASSISTANT_MODEL = None     # draft for OpenChat-3.5; must share its (Mistral) tokenizer
+
+# Generated question filtering (near-duplicate MinHash similarity on word bigrams)
+QUESTION_DEDUP_THRESHOLD = 0.5
+QUESTION_BANK_SIZE = 2000           # recent same-role questions compared against
+QUESTION_BANK_CACHE_SIZE = 12000    # question signatures kept per process
+QUESTION_MAX_REGENERATIONS = 3      # extra generations for the missing count
+
+# Adaptive interviews: follow-up questions generated from the last answer
+FOLLOW_UP_DEADLINE_SECONDS = 20     # after submission; later follow-ups are dropped
+FOLLOW_UP_MAX_NEW_TOKENS = 48
+FOLLOW_UP_MAX_RELEVANCE = 0.85      # answers scoring at least this get no follow-up
+FOLLOW_UP_MAX_PER_SESSION = 3
+
+# Resume-to-role fit scoring
+FIT_EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+FIT_EMBEDDING_CACHE_TIMEOUT = 30 * 86400   # seconds embeddings stay in the shared cache
+FIT_EMBEDDING_LOCAL_CACHE_SIZE = 50000     # embeddings kept per process (LRU)
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
@@ -100,7 +147,7 @@ AUTHENTICATION_BACKENDS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'func.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -113,7 +160,7 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'func.renderers.ORJSONRenderer',     # falls back to DRF's JSONRenderer without orjson
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
@@ -126,6 +173,7 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
     'UPDATE_LAST_LOGIN': False,
 }
+PRINCIPAL_CACHE_SECONDS = 60        # authenticated user + profile, dropped on any save
 
 """
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -187,8 +235,19 @@ DATABASES = {
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
         },
+        'CONN_MAX_AGE': 600,                # persistent connections, reused across requests and tasks
+        'CONN_HEALTH_CHECKS': True,         # ...and checked before reuse
     }
 }
+# Read replica for read-heavy views, analytics and admin change lists (func.routing);
+# point HOST at the replica. Without a 'replica' alias every read uses `default`.
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'HOST': 'localhost',
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_ROUTERS = ['func.routing.ReplicaRouter']
+REPLICA_PIN_SECONDS = 10            # reads stay on the primary this long after a user writes
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -210,6 +269,116 @@ AUTH_PASSWORD_VALIDATORS = [
 
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+# Bulk work (cohort question generation) goes to its own queue. Workers consume
+# `-Q celery,bulk` so live tasks on the default queue are always taken first,
+# and prefetch one task at a time so bulk jobs are never hoarded.
+CELERY_TASK_ROUTES = {
+    'func.tasks.generate_session_questions': {'queue': 'bulk'},
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Idempotent tasks set acks_late themselves so a lost worker's task is redelivered;
+# the visibility timeout must exceed the longest of them or Redis redelivers it
+# while it still runs
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps':       list(range(10)),
+    'sep':                  ':',
+    'queue_order_strategy': 'priority',
+    'visibility_timeout':   4 * 3600,
+}
+COHORT_GENERATION_RATE_LIMIT = '30/m'   # per worker
+
+# Scheduler / admission control (func.scheduler)
+SCHEDULER_WORKER_SLOTS = 4                  # total worker processes serving the queues
+SCHEDULER_INTERACTIVE_SLO_SECONDS = 60      # new sessions are refused above this estimated wait
+SCHEDULER_DEFAULT_SERVICE_SECONDS = 30      # task duration assumed before any is measured
+SCHEDULER_FAIR_SHARE = 2                    # pending tasks per user before they are deprioritised
+SCHEDULER_DEPTH_CACHE_SECONDS = 2
+SCHEDULER_COUNTER_TTL_SECONDS = 3600      # pending/running counts expire this long after their last change
+# Models loaded in the worker parent and shared copy-on-write by its prefork
+# children (CPU workers only): any of 'whisper', 'analyzer', 'generator'
+WORKER_PRELOAD_MODELS = ()
+WORKER_TORCH_THREADS = None         # torch threads per child; None keeps torch's default
+WORKER_REPORT_TIMEOUT = 300         # per-process memory reports older than this are dropped
+
+# Worker watchdog: after each task caches are freed; a child still above these
+# limits finishes its task and is replaced by a fresh one (None disables a limit).
+# Preloaded models are shared, not private; models a child loads itself (GPU
+# workers, or names missing from WORKER_PRELOAD_MODELS) are private, so size the
+# private limits above them there.
+WORKER_RECYCLE_PRIVATE_MB = 6144    # memory not shared with other children
+WORKER_RECYCLE_TORCH_MB = None      # CUDA memory reserved by torch
+# Hard backstop in KiB, checked by billiard after each task on the child's private
+# memory (func.worker patches billiard's RSS reading); also required for the
+# watchdog's graceful recycling to take effect
+CELERY_WORKER_MAX_MEMORY_PER_CHILD = 32 * 1024 * 1024
+
+# Transcript / question search (func.search): terms in more than this share of
+# documents are ignored when the query has rarer ones; document counts are cached
+SEARCH_MAX_DF_RATIO = 0.2
+SEARCH_STATS_CACHE_SECONDS = 600
+
+CELERY_BEAT_SCHEDULE = {
+    'refresh-daily-rollups': {
+        'task':     'func.tasks.refresh_daily_rollups',
+        'schedule': 600.0,   # seconds
+    },
+    'apply-audio-retention': {
+        'task':     'func.tasks.apply_audio_retention',
+        'schedule': 3600.0,
+    },
+    'evict-media-scratch': {
+        'task':     'func.tasks.evict_media_scratch',
+        'schedule': 600.0,
+    },
+}
+
+# Peer benchmarks (func.percentiles): one t-digest per role/difficulty/category
+# and metric, updated as each analysis lands
+SCORE_SKETCH_COMPRESSION = 100          # ~centroids per sketch; higher is more precise
+SCORE_BENCHMARK_MIN_SAMPLES = 50        # peers needed before ranks replace the fixed threshold
+SCORE_SUGGEST_PERCENTILE = 25           # suggest when an answer falls in the bottom (or top) band
+REPORT_PEER_REFRESH_SECONDS = 3600      # unchanged reports are re-sent at most this often for fresh ranks
+
+# Answer recording retention (func.retention), in days after the answer; None
+# disables a step. Transcripts, segments and analyses are always kept.
+RETENTION_TRANSCODE_AFTER_DAYS = 1     # analysed recordings -> mono Opus
+RETENTION_OPUS_BITRATE = '24k'
+RETENTION_ARCHIVE_AFTER_DAYS = 90      # -> one tar.gz bundle per day under archives/answers/
+RETENTION_PURGE_AFTER_DAYS = 365       # bundles and files deleted, analysed or not
+RETENTION_BATCH_SIZE = 500             # answers per step and pass
+
+# Shared cache, also used to aggregate metrics across web and Celery processes
+CACHES = {
+    'default': {
+        'BACKEND':  'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/1',
+    }
+}
+
+# Pipeline instrumentation: per-stage latency histograms, token throughput
+# and queue wait, scraped from /metrics/ and logged to METRICS_LOG_FILE
+PIPELINE_METRICS_ENABLED = False
+PIPELINE_METRICS_PUSH_INTERVAL = 5   # seconds between snapshot pushes to the cache
+METRICS_LOG_FILE = BASE_DIR / 'metrics.log'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'metrics_file': {
+            'class':    'logging.FileHandler',
+            'filename': METRICS_LOG_FILE,
+            'delay':    True,
+        },
+    },
+    'loggers': {
+        'func.metrics': {
+            'handlers':  ['metrics_file'],
+            'level':     'INFO',
+            'propagate': False,
+        },
+    },
+}
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -230,6 +399,33 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Media storage: 'local' (MEDIA_ROOT, needs a shared filesystem across nodes) or
+# 's3' (any S3-compatible store such as MinIO, via django-storages and boto3).
+# Clients upload through presigned URLs (uploads/presign/), workers stream
+# objects into MEDIA_SCRATCH_DIR instead of reading them from MEDIA_ROOT.
+MEDIA_STORAGE = 'local'
+AWS_STORAGE_BUCKET_NAME = 'smartinterviewer-media'
+AWS_S3_ENDPOINT_URL = None          # e.g. 'http://localhost:9000' for MinIO
+AWS_S3_REGION_NAME = None
+AWS_ACCESS_KEY_ID = 'YOUR_S3_ACCESS_KEY'
+AWS_SECRET_ACCESS_KEY = 'YOUR_S3_SECRET_KEY'
+AWS_S3_FILE_OVERWRITE = False       # stored names never change content (scratch copies rely on it)
+AWS_QUERYSTRING_AUTH = True         # file URLs are presigned downloads
+AWS_QUERYSTRING_EXPIRE = 900
+MEDIA_UPLOAD_URL_EXPIRE = 900
+MEDIA_UPLOAD_MAX_BYTES = {'resume': 10 * 2 ** 20, 'answer': 50 * 2 ** 20}
+# Scratch is trimmed by the evict-media-scratch beat task; with several worker
+# hosts, put MEDIA_SCRATCH_DIR on a volume they share or the task only trims one
+MEDIA_SCRATCH_DIR = BASE_DIR / 'scratch'
+MEDIA_SCRATCH_MAX_MB = 2048
+MEDIA_SCRATCH_MIN_AGE_SECONDS = 3600  # files used more recently may be open in a task
+
+if MEDIA_STORAGE == 's3':
+    STORAGES = {
+        'default':     {'BACKEND': 'storages.backends.s3.S3Storage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 